@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the stdio MCP servers.
+
+Spawns each server as a fresh process (the way the chatbot does), sends the
+JSON-RPC `initialize` request and measures the wall time until the response
+arrives. Every server is measured with lazy imports on and off
+(MCP_LAZY_IMPORTS), after one discarded warm-up start so bytecode caches
+and the OS page cache are in the same state for every measured run.
+
+    python benchmark_cold_start.py --runs 20
+    python benchmark_cold_start.py weather_mcp_server.py --mode lazy
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SERVERS = ["weather_mcp_server.py", "pilot_mcp_server.py", "news_search_server.py"]
+
+INITIALIZE_REQUEST = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "cold-start-benchmark", "version": "1.0.0"}
+    }
+}
+
+
+def time_to_initialize(server: str, lazy: bool, timeout: float = 30.0) -> float:
+    """
+    Start a server process and time how long it takes to answer `initialize`.
+
+    Args:
+        server: Path to the server script
+        lazy: Whether to run the server with lazy imports enabled
+        timeout: Seconds to wait for the response
+
+    Returns:
+        Seconds from process spawn to the initialize response
+    """
+    env = dict(os.environ, MCP_LAZY_IMPORTS="true" if lazy else "false", WEATHER_PREFETCH_ENABLED="false")
+    directory = os.path.dirname(os.path.abspath(__file__))
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, server],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        cwd=directory,
+        env=env
+    )
+    try:
+        process.stdin.write(json.dumps(INITIALIZE_REQUEST) + "\n")
+        process.stdin.flush()
+        line = process.stdout.readline()
+        elapsed = time.perf_counter() - started
+        if not line or json.loads(line).get("id") != 1:
+            raise RuntimeError(f"{server} did not answer initialize")
+        return elapsed
+    finally:
+        process.kill()
+        process.wait(timeout=timeout)
+
+
+def benchmark(server: str, lazy: bool, runs: int) -> dict:
+    """
+    Measure time-to-initialize for one server over several cold starts.
+
+    Returns:
+        Dictionary with min, median, p90 and max in milliseconds
+    """
+    time_to_initialize(server, lazy)  # warm-up, not measured
+    samples = sorted(time_to_initialize(server, lazy) * 1000 for _ in range(runs))
+    return {
+        "min": samples[0],
+        "median": statistics.median(samples),
+        "p90": samples[min(len(samples) - 1, int(0.9 * len(samples)))],
+        "max": samples[-1]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure time-to-initialize for the stdio MCP servers.")
+    parser.add_argument("servers", nargs="*", default=SERVERS, help="Server scripts (default: all)")
+    parser.add_argument("--runs", type=int, default=10, help="Measured starts per server and mode (default: 10)")
+    parser.add_argument("--mode", choices=["lazy", "eager", "both"], default="both", help="Import mode (default: both)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    modes = {"lazy": [True], "eager": [False], "both": [False, True]}[args.mode]
+    results = []
+    for server in args.servers:
+        for lazy in modes:
+            try:
+                stats = benchmark(server, lazy, args.runs)
+            except Exception as e:
+                print(f"{server} ({'lazy' if lazy else 'eager'}): failed: {e}", file=sys.stderr)
+                continue
+            results.append(dict(server=server, mode="lazy" if lazy else "eager", runs=args.runs, **stats))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'server':<24} {'mode':<6} {'min ms':>8} {'median ms':>10} {'p90 ms':>8} {'max ms':>8}")
+        for result in results:
+            print(f"{result['server']:<24} {result['mode']:<6} {result['min']:>8.1f} {result['median']:>10.1f} "
+                  f"{result['p90']:>8.1f} {result['max']:>8.1f}")
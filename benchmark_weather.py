@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the CPU cost of get_weather_data.
+
+Times each step in isolation, for several forecast lengths and variable counts:
+
+    parse   length-prefixed flatbuffer bytes -> WeatherApiResponse
+    decode  decode_weather_response (the unified weather JSON structure)
+    encode  encode_weather_json (orjson if installed, and the stdlib fallback)
+    total   all of the above
+
+and reports per-call latency, bytes allocated per call (tracemalloc) and
+throughput. Responses come from fixtures in data/weather_fixtures/, captured
+from the live API with --capture; cases without a fixture fall back to
+synthetic responses of the same shape.
+
+    python benchmark_weather.py --capture           # needs network, refreshes the fixtures
+    python benchmark_weather.py --save baseline.json
+    python benchmark_weather.py --baseline baseline.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import timeit
+import tracemalloc
+
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+import weather_mcp_server
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "weather_fixtures")
+FORECAST_HOURS = (24, 168, 384)
+VARIABLE_COUNTS = (1, 6, 24)
+# Hourly variables, the server's defaults first
+ALL_HOURLY_VARIABLES = weather_mcp_server.HOURLY_VARIABLES + [
+    "dew_point_2m", "apparent_temperature", "precipitation", "showers", "snow_depth", "weather_code",
+    "pressure_msl", "surface_pressure", "cloud_cover", "cloud_cover_low", "cloud_cover_mid", "cloud_cover_high",
+    "visibility", "evapotranspiration", "vapour_pressure_deficit", "wind_speed_10m", "wind_direction_10m",
+    "wind_gusts_10m"
+]
+CAPTURE_LOCATION = {"latitude": 45.4112, "longitude": -75.6981}
+
+
+def case_name(hours: int, variable_count: int) -> str:
+    return f"{hours}h_{variable_count}var"
+
+
+def case_variables(variable_count: int) -> list:
+    return ALL_HOURLY_VARIABLES[:variable_count]
+
+
+def capture_fixtures() -> None:
+    """Fetch one raw flatbuffer response per case from Open-Meteo and store it under FIXTURE_DIR."""
+    import requests
+
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for hours in FORECAST_HOURS:
+        for variable_count in VARIABLE_COUNTS:
+            params = weather_mcp_server.build_weather_params(
+                [CAPTURE_LOCATION], case_variables(variable_count),
+                weather_mcp_server.DAILY_VARIABLES, weather_mcp_server.CURRENT_VARIABLES
+            )
+            params.update(forecast_days=hours // 24, format="flatbuffers")
+            response = requests.get(weather_mcp_server.OPEN_METEO_URL, params=params, timeout=30)
+            response.raise_for_status()
+            path = os.path.join(FIXTURE_DIR, f"{case_name(hours, variable_count)}.bin")
+            with open(path, "wb") as fixture:
+                fixture.write(response.content)
+            print(f"Captured {path} ({len(response.content)} bytes)")
+
+
+def load_payload(hours: int, variable_count: int) -> tuple:
+    """
+    Return the raw response bytes for a case and where they came from.
+
+    Returns:
+        (payload bytes, "fixture" or "synthetic")
+    """
+    path = os.path.join(FIXTURE_DIR, f"{case_name(hours, variable_count)}.bin")
+    if os.path.exists(path):
+        with open(path, "rb") as fixture:
+            return fixture.read(), "fixture"
+    from synthetic_weather import build_weather_payload
+    return build_weather_payload(hours=hours, days=hours // 24, hourly=case_variables(variable_count)), "synthetic"
+
+
+def parse_payload(payload: bytes) -> list:
+    """Split a length-prefixed Open-Meteo message into responses, as the client does."""
+    responses = []
+    position = 0
+    while position < len(payload):
+        length = int.from_bytes(payload[position:position + 4], "little")
+        responses.append(WeatherApiResponse.GetRootAs(payload, position + 4))
+        position += length + 4
+    return responses
+
+
+def measure(function, repeat: int = 5, min_time: float = 0.05) -> dict:
+    """
+    Time a zero-argument function and count what it allocates.
+
+    Args:
+        function: The call to measure
+        repeat: Number of timed batches
+        min_time: Target duration of one batch in seconds
+
+    Returns:
+        Dictionary with median and best microseconds per call, calls per second and allocated bytes per call
+    """
+    timer = timeit.Timer(function)
+    # One untimed warm-up call, then size the batches from a single timed call
+    timer.timeit(number=1)
+    loops = max(1, int(min_time / max(timer.timeit(number=1), 1e-7)))
+    per_call = [elapsed / loops for elapsed in timer.repeat(repeat=repeat, number=loops)]
+
+    tracemalloc.start()
+    function()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "median_us": statistics.median(per_call) * 1e6,
+        "best_us": min(per_call) * 1e6,
+        "calls_per_second": 1 / statistics.median(per_call),
+        "peak_alloc_bytes": peak - before,
+        "retained_bytes": current - before
+    }
+
+
+def benchmark_case(hours: int, variable_count: int, repeat: int = 5, min_time: float = 0.05) -> list:
+    """Benchmark every step for one forecast length and variable count."""
+    payload, source = load_payload(hours, variable_count)
+    hourly = case_variables(variable_count)
+    daily, current = weather_mcp_server.DAILY_VARIABLES, weather_mcp_server.CURRENT_VARIABLES
+    response = parse_payload(payload)[0]
+    weather = weather_mcp_server.decode_weather_response(response, hourly, daily, current)
+    orjson = weather_mcp_server.orjson
+
+    def stdlib_encode():
+        weather_mcp_server.orjson = None
+        try:
+            return weather_mcp_server.encode_weather_json(weather)
+        finally:
+            weather_mcp_server.orjson = orjson
+
+    steps = {
+        "parse": lambda: parse_payload(payload),
+        "decode": lambda: weather_mcp_server.decode_weather_response(response, hourly, daily, current),
+        "encode": lambda: weather_mcp_server.encode_weather_json(weather),
+        "total": lambda: weather_mcp_server.encode_weather_json(
+            weather_mcp_server.decode_weather_response(parse_payload(payload)[0], hourly, daily, current))
+    }
+    if orjson is not None:
+        steps["encode_stdlib"] = stdlib_encode
+
+    output_bytes = len(weather_mcp_server.encode_weather_json(weather).encode("utf-8"))
+    results = []
+    for step, function in steps.items():
+        stats = measure(function, repeat, min_time)
+        stats["input_mb_per_second"] = len(payload) * stats["calls_per_second"] / 1e6
+        results.append(dict(case=case_name(hours, variable_count), source=source, step=step,
+                            payload_bytes=len(payload), output_bytes=output_bytes, **stats))
+    return results
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """Return descriptions of steps whose median latency regressed by more than tolerance."""
+    previous = {(entry["case"], entry["step"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry["case"], entry["step"]))
+        if before and entry["median_us"] > before["median_us"] * (1 + tolerance):
+            regressions.append(f"{entry['case']} {entry['step']}: {before['median_us']:.1f}us -> "
+                               f"{entry['median_us']:.1f}us")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark weather decoding and JSON encoding.")
+    parser.add_argument("--capture", action="store_true", help="Refresh the fixtures from the live API first")
+    parser.add_argument("--hours", type=int, nargs="+", default=FORECAST_HOURS, help="Forecast lengths in hours")
+    parser.add_argument("--variables", type=int, nargs="+", default=VARIABLE_COUNTS, help="Hourly variable counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats per step (default: 5)")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per timed batch (default: 0.05)")
+    parser.add_argument("--save", help="Write the results to a JSON file")
+    parser.add_argument("--baseline", help="Compare against results saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs. baseline (default: 0.25)")
+    args = parser.parse_args()
+
+    if args.capture:
+        capture_fixtures()
+
+    results = []
+    print(f"{'case':<14} {'source':<9} {'step':<13} {'median us':>10} {'best us':>9} {'calls/s':>9} "
+          f"{'MB/s in':>8} {'peak alloc':>11}")
+    for hours in args.hours:
+        for variable_count in args.variables:
+            for entry in benchmark_case(hours, variable_count, args.repeat, args.min_time):
+                results.append(entry)
+                print(f"{entry['case']:<14} {entry['source']:<9} {entry['step']:<13} {entry['median_us']:>10.1f} "
+                      f"{entry['best_us']:>9.1f} {entry['calls_per_second']:>9.0f} "
+                      f"{entry['input_mb_per_second']:>8.1f} {entry['peak_alloc_bytes']:>11}")
+
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump(results, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
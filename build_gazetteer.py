@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Build the bundled offline gazetteer (data/gazetteer.tsv.gz) from GeoNames dumps.
+
+Download one or more dumps from https://download.geonames.org/export/dump/
+(for example cities15000.zip for the world plus CA.zip for small Canadian
+places), unzip them and run:
+
+    python build_gazetteer.py cities15000.txt CA.txt --min-population 1000
+
+GeoNames data is licensed under CC BY 4.0 (https://www.geonames.org).
+"""
+
+import argparse
+import gzip
+import os
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.tsv.gz")
+
+# Column positions in the GeoNames "geoname" table dump
+GEONAMEID, NAME, LATITUDE, LONGITUDE, FEATURE_CLASS, COUNTRY_CODE, ADMIN1_CODE, POPULATION = 0, 1, 4, 5, 6, 8, 10, 14
+
+
+def read_places(paths, min_population: int = 0) -> list:
+    """
+    Read populated places from GeoNames dump files, dropping duplicates.
+
+    Args:
+        paths: GeoNames dump files (tab separated, one place per line)
+        min_population: Skip places with a smaller population
+
+    Returns:
+        List of (name, country_code, admin1_code, latitude, longitude, population) tuples
+    """
+    places = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as dump:
+            for line in dump:
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) <= POPULATION or columns[FEATURE_CLASS] != "P":
+                    continue
+                population = int(columns[POPULATION] or 0)
+                if population < min_population:
+                    continue
+                places[columns[GEONAMEID]] = (
+                    columns[NAME],
+                    columns[COUNTRY_CODE],
+                    columns[ADMIN1_CODE],
+                    round(float(columns[LATITUDE]), 4),
+                    round(float(columns[LONGITUDE]), 4),
+                    population,
+                )
+    # Largest places first, so ties in name lookups favour them
+    return sorted(places.values(), key=lambda place: (-place[5], place[0]))
+
+
+def write_gazetteer(places, path: str = GAZETTEER_PATH) -> None:
+    """Write places as a gzipped, tab separated file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # mtime=0 keeps rebuilds of the same data byte-identical
+    with open(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as compressed:
+        for place in places:
+            compressed.write(("\t".join(str(value) for value in place) + "\n").encode("utf-8"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer from GeoNames dumps.")
+    parser.add_argument("dumps", nargs="+", help="GeoNames dump files, e.g. cities15000.txt CA.txt")
+    parser.add_argument("--min-population", type=int, default=1000, help="Skip smaller places (default: 1000)")
+    parser.add_argument("--output", default=GAZETTEER_PATH, help="Output path (default: data/gazetteer.tsv.gz)")
+    args = parser.parse_args()
+
+    places = read_places(args.dumps, args.min_population)
+    write_gazetteer(places, args.output)
+    print(f"Wrote {len(places)} places to {args.output}")
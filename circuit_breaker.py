@@ -0,0 +1,107 @@
+"""
+Circuit breaker for calls to flaky upstream services.
+
+After a number of consecutive failures the circuit opens and calls are
+refused immediately instead of waiting on timeouts and retry backoff. Once
+the reset timeout has passed a single trial call is let through
+(half-open): success closes the circuit again, failure re-opens it. A trial
+that never reports back (cancelled or lost) is given up on after the trial
+timeout, so it cannot keep the circuit half-open for good.
+"""
+
+import threading
+import time
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream service whose circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable after repeated failures; retrying in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open trial call."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 trial_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = trial_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Return whether a call may go through now; in half-open state only one trial call is allowed."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight and time.monotonic() - self._trial_started < self.trial_timeout:
+                return False
+            self._trial_in_flight = True
+            self._trial_started = time.monotonic()
+            return True
+
+    def check(self) -> None:
+        """
+        Like allow(), but raise when the call may not go through.
+
+        Raises:
+            CircuitOpenError: If the circuit is open (or its trial call is already running)
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def retry_after(self) -> float:
+        """Seconds until the next trial call is allowed (0 if calls are allowed now)."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def release(self) -> None:
+        """Give up a call without an outcome (e.g. it was cancelled), freeing the half-open trial slot."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """Return the state and failure count."""
+        state = self.state
+        with self._lock:
+            return {"state": state, "consecutive_failures": self._failures}
@@ -180,11 +180,6 @@ def create_working_example():
     print("-" * 30)
     
     try:
-        # Create a mock papers directory with sample data
-        papers_dir = "papers"
-        topic_dir = os.path.join(papers_dir, "mixture_of_experts")
-        os.makedirs(topic_dir, exist_ok=True)
-        
         # Sample paper data
         sample_data = {
             "2024.01234": {
@@ -204,14 +199,13 @@ def create_working_example():
         }
         
         # Save sample data
-        json_file = os.path.join(topic_dir, "papers_info.json")
-        with open(json_file, 'w') as f:
-            json.dump(sample_data, f, indent=2)
+        from pilot_mcp_server import extract_info, get_paper_store
+        store = get_paper_store()
+        store.add_papers("mixture_of_experts", sample_data)
         
-        print(f"✅ Created sample data: {json_file}")
+        print(f"✅ Created sample data: {store.path}")
         
         # Test the extract_info function with sample data
-        from pilot_mcp_server import extract_info
         
         result = extract_info("2024.01234")
         print(f"✅ extract_info test successful")
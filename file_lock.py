@@ -0,0 +1,36 @@
+"""
+Exclusive advisory file locks shared between server processes.
+
+    with file_lock(os.path.join(directory, ".lock")):
+        ...
+
+Uses fcntl.flock on POSIX and msvcrt.locking on Windows. The lock file is
+created if needed and left in place.
+"""
+
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextlib.contextmanager
+def file_lock(path: str):
+    """Hold an exclusive lock on path for the duration of the block, waiting for other holders."""
+    with open(path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
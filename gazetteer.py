@@ -0,0 +1,320 @@
+"""
+Offline gazetteer for resolving place names and coordinates without network calls.
+
+Places come from data/gazetteer.tsv.gz (built from GeoNames, CC BY 4.0, see
+build_gazetteer.py). Nothing is read at import time: the file is parsed into
+flat numpy arrays on the first lookup, and the fuzzy name index and the
+KD-tree for reverse lookups are built the first time they are needed.
+"""
+
+import difflib
+import gzip
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from build_gazetteer import GAZETTEER_PATH
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+EARTH_RADIUS_KM = 6371.0
+LEAF_SIZE = 16
+FUZZY_CANDIDATES = 32
+FUZZY_MIN_SCORE = 0.75
+
+_COORDINATES_PATTERN = re.compile(r"^\s*([-+]?\d+(?:\.\d+)?)\s*[,\s]\s*([-+]?\d+(?:\.\d+)?)\s*$")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase a place name and strip accents and punctuation ("St. John's" -> "st johns")."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+    stripped = re.sub(r"[.'’]", "", stripped)
+    return " ".join(re.sub(r"[^\w]+", " ", stripped).split())
+
+
+def parse_coordinates(text: str):
+    """
+    Parse "latitude, longitude" text.
+
+    Returns:
+        (latitude, longitude) tuple, or None if the text is not a valid coordinate pair
+    """
+    match = _COORDINATES_PATTERN.match(text)
+    if not match:
+        return None
+    latitude, longitude = float(match.group(1)), float(match.group(2))
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def _unit_vectors(latitude, longitude) -> "np.ndarray":
+    """Project latitude/longitude degrees onto the unit sphere."""
+    lat, lon = np.radians(latitude), np.radians(longitude)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    """Array-backed place index with exact, prefix, fuzzy and nearest-place lookups."""
+
+    def __init__(self, path: str = GAZETTEER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._trigram_index = None
+        self._tree = None
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.names)
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            names, countries, admin1_codes, latitudes, longitudes, populations = [], [], [], [], [], []
+            with gzip.open(self.path, "rt", encoding="utf-8") as source:
+                for line in source:
+                    name, country, admin1, latitude, longitude, population = line.rstrip("\n").split("\t")
+                    names.append(name)
+                    countries.append(country)
+                    admin1_codes.append(admin1)
+                    latitudes.append(float(latitude))
+                    longitudes.append(float(longitude))
+                    populations.append(int(population))
+
+            self.names = names
+            self.countries = np.array(countries, dtype="U2")
+            self.admin1_codes = admin1_codes
+            self.latitudes = np.array(latitudes, dtype=np.float32)
+            self.longitudes = np.array(longitudes, dtype=np.float32)
+            self.populations = np.array(populations, dtype=np.int64)
+
+            # Rows are stored largest place first, so within one key the first row wins ties
+            pairs = sorted((normalize_name(name), row) for row, name in enumerate(names))
+            self._keys = [key for key, _ in pairs]
+            self._key_rows = np.array([row for _, row in pairs], dtype=np.int32)
+            self._loaded = True
+
+    def place(self, row: int) -> dict:
+        """Return the place stored at a row as a dictionary."""
+        return {
+            "name": self.names[row],
+            "country_code": str(self.countries[row]),
+            "admin1_code": self.admin1_codes[row],
+            "latitude": float(self.latitudes[row]),
+            "longitude": float(self.longitudes[row]),
+            "population": int(self.populations[row])
+        }
+
+    def _split_query(self, query: str):
+        """Split an optional trailing two-letter code: "Paris, FR" -> ("paris", "FR")."""
+        name, _, qualifier = query.rpartition(",")
+        qualifier = qualifier.strip()
+        if name and len(qualifier) == 2 and qualifier.isalpha():
+            return normalize_name(name), qualifier.upper()
+        return normalize_name(query), None
+
+    def _rows_in_range(self, lower: int, upper: int, qualifier: str = None) -> list:
+        """
+        Rows of the keys in [lower, upper), largest place first.
+
+        A qualifier is matched as a country code, then as a first-level
+        division code ("Portland, ME" is Maine, as no Portland is in
+        Montenegro); if neither matches, the qualifier is ignored.
+        """
+        rows = sorted(set(self._key_rows[lower:upper].tolist()))
+        if qualifier:
+            for codes in (self.countries, self.admin1_codes):
+                qualified = [row for row in rows if codes[row] == qualifier]
+                if qualified:
+                    return qualified
+        return rows
+
+    def lookup(self, query: str):
+        """
+        Find a place by exact (normalized) name, optionally qualified by a country or division code.
+
+        Args:
+            query: Place name such as "Kelowna", "Paris, FR" or "Portland, ME"
+
+        Returns:
+            The largest matching place as a dictionary, or None
+        """
+        self._ensure_loaded()
+        key, country = self._split_query(query)
+        lower = bisect_left(self._keys, key)
+        upper = bisect_left(self._keys, key + "\0", lower)
+        rows = self._rows_in_range(lower, upper, country)
+        return self.place(rows[0]) if rows else None
+
+    def search_prefix(self, prefix: str, limit: int = 10) -> list:
+        """
+        Find places whose name starts with a prefix, largest first.
+
+        Args:
+            prefix: Beginning of a place name, optionally qualified by a country or division code
+            limit: Maximum number of places to return
+
+        Returns:
+            List of place dictionaries
+        """
+        self._ensure_loaded()
+        key, country = self._split_query(prefix)
+        lower = bisect_left(self._keys, key)
+        upper = bisect_left(self._keys, key + "\uffff", lower)
+        return [self.place(row) for row in self._rows_in_range(lower, upper, country)[:limit]]
+
+    def _ensure_trigram_index(self) -> None:
+        if self._trigram_index is not None:
+            return
+        with self._lock:
+            if self._trigram_index is not None:
+                return
+            unique_keys = list(dict.fromkeys(self._keys))
+            postings = {}
+            for index, key in enumerate(unique_keys):
+                for trigram in _trigrams(key):
+                    postings.setdefault(trigram, []).append(index)
+            self._unique_keys = unique_keys
+            self._trigram_index = {trigram: np.array(ids, dtype=np.int32) for trigram, ids in postings.items()}
+
+    def fuzzy(self, query: str, limit: int = 5) -> list:
+        """
+        Find places whose name is close to a possibly misspelled query.
+
+        Candidates sharing the most trigrams with the query are re-ranked by
+        edit similarity; ties go to the larger place.
+
+        Args:
+            query: Place name, optionally qualified by a country or division code
+            limit: Maximum number of places to return
+
+        Returns:
+            List of place dictionaries with a "score" between 0 and 1, best first
+        """
+        self._ensure_loaded()
+        self._ensure_trigram_index()
+        key, country = self._split_query(query)
+        postings = [self._trigram_index[t] for t in _trigrams(key) if t in self._trigram_index]
+        if not postings:
+            return []
+        counts = np.bincount(np.concatenate(postings), minlength=len(self._unique_keys))
+        top = min(FUZZY_CANDIDATES, len(counts))
+        candidates = np.argpartition(counts, -top)[-top:]
+
+        matches = []
+        for index in candidates[counts[candidates] > 0]:
+            candidate = self._unique_keys[index]
+            score = difflib.SequenceMatcher(None, key, candidate).ratio()
+            if score < FUZZY_MIN_SCORE:
+                continue
+            lower = bisect_left(self._keys, candidate)
+            upper = bisect_left(self._keys, candidate + "\0", lower)
+            for row in self._rows_in_range(lower, upper, country):
+                matches.append((-score, row))
+        matches.sort()
+        return [dict(self.place(row), score=round(-negative_score, 3)) for negative_score, row in matches[:limit]]
+
+    def _ensure_tree(self) -> None:
+        if self._tree is not None:
+            return
+        self._ensure_loaded()
+        with self._lock:
+            if self._tree is not None:
+                return
+            points = _unit_vectors(self.latitudes.astype(np.float64), self.longitudes.astype(np.float64))
+            order = np.arange(len(points))
+            nodes = []
+
+            def build(lower, upper):
+                node = len(nodes)
+                nodes.append(None)
+                if upper - lower <= LEAF_SIZE:
+                    nodes[node] = (lower, upper, -1, 0.0, -1, -1)
+                    return node
+                segment = order[lower:upper]
+                coords = points[segment]
+                dim = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+                middle = (upper - lower) // 2
+                order[lower:upper] = segment[np.argpartition(coords[:, dim], middle)]
+                split = float(points[order[lower + middle], dim])
+                left = build(lower, lower + middle)
+                right = build(lower + middle, upper)
+                nodes[node] = (lower, upper, dim, split, left, right)
+                return node
+
+            build(0, len(points))
+            self._points = points
+            self._order = order
+            self._tree = nodes
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> list:
+        """
+        Find the places nearest to a coordinate.
+
+        Args:
+            latitude: Latitude in degrees
+            longitude: Longitude in degrees
+            k: Number of places to return
+
+        Returns:
+            List of place dictionaries with a "distance_km" field, nearest first
+        """
+        if k < 1:
+            return []
+        self._ensure_tree()
+        query = _unit_vectors(latitude, longitude)
+        best = []  # max-heap of (-squared chord distance, row)
+        stack = [(0, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if len(best) == k and bound >= -best[0][0]:
+                continue
+            lower, upper, dim, split, left, right = self._tree[node]
+            if dim < 0:
+                rows = self._order[lower:upper]
+                distances = ((self._points[rows] - query) ** 2).sum(axis=1)
+                for distance, row in zip(distances.tolist(), rows.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, row))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, row))
+                continue
+            difference = query[dim] - split
+            near, far = (left, right) if difference < 0 else (right, left)
+            stack.append((far, difference * difference))
+            stack.append((near, 0.0))
+
+        results = []
+        for negative_distance, row in sorted(best, reverse=True):
+            chord = math.sqrt(-negative_distance)
+            distance_km = 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+            results.append(dict(self.place(row), distance_km=round(distance_km, 2)))
+        return results
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Return the process-wide gazetteer; its data is loaded on first lookup."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+    return _gazetteer
@@ -0,0 +1,48 @@
+"""
+Deferred imports for the MCP servers and the chatbot client.
+
+Every stdio server is spawned fresh for each chatbot session, and importing
+the HTTP clients, numpy, arxiv or the langchain stack dominates the time
+until the server can answer `initialize`. lazy_import() returns a module
+whose code runs the first time one of its attributes is used, so those
+costs move to the first tool call that needs them.
+
+Set MCP_LAZY_IMPORTS=false to import everything eagerly again (useful when
+debugging import errors, and as the baseline for benchmark_cold_start.py).
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+
+LAZY_IMPORTS = os.getenv("MCP_LAZY_IMPORTS", "true").lower() in ("1", "true", "yes")
+
+
+def lazy_import(name: str):
+    """
+    Import a module, deferring its execution until first attribute access.
+
+    Args:
+        name: Absolute module name, e.g. "numpy" or "langchain_core.messages"
+
+    Returns:
+        The module (already loaded if it was imported before or lazy imports are disabled)
+
+    Raises:
+        ModuleNotFoundError: If the module is not installed (checked immediately)
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if not LAZY_IMPORTS:
+        return importlib.import_module(name)
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
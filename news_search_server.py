@@ -1,9 +1,12 @@
 from dotenv import load_dotenv
 import os
 import json
-import requests
 from typing import List
 from mcp.server.fastmcp import FastMCP
+from lazy_imports import lazy_import
+
+# requests loads on the first search, not while the server starts
+requests = lazy_import("requests")
 
 load_dotenv()
 
@@ -0,0 +1,112 @@
+"""
+Streaming, resumable file downloads.
+
+download_file() streams a response to <path>.part in fixed-size chunks and
+renames it into place once complete, so memory use does not grow with the
+file and an interrupted download never leaves a truncated file under the
+final name. An existing .part file is resumed with an HTTP Range request;
+if the server ignores the range the download starts over.
+
+TokenBucket spaces out requests shared by several download threads.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+CHUNK_SIZE = 64 * 1024
+
+
+class TokenBucket:
+    """Thread-safe token bucket: rate tokens per second, at most capacity saved up for bursts."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until one is available.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class IncompleteDownloadError(IOError):
+    """Raised when the connection ends before the advertised length was received."""
+
+
+def file_sha256(path: str, chunk_size: int = CHUNK_SIZE) -> str:
+    """Return the hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_file(session, url: str, path: str, chunk_size: int = CHUNK_SIZE, timeout: float = 60) -> dict:
+    """
+    Download a URL to a file, resuming a previous partial download.
+
+    Args:
+        session: requests-compatible session, reused across downloads
+        url: URL to download
+        path: Final file path
+        chunk_size: Bytes read and written at a time
+        timeout: Connect and read timeout in seconds
+
+    Returns:
+        Dictionary with the path, size in bytes, hex SHA-256 and the offset the download resumed from
+
+    Raises:
+        requests.RequestException: If the request fails (the partial file is kept for the next attempt)
+        IncompleteDownloadError: If fewer bytes arrived than the server announced
+    """
+    part_path = path + ".part"
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if offset and response.status_code == 416:
+            # The partial file does not fit the current resource: start over
+            os.remove(part_path)
+            return download_file(session, url, path, chunk_size, timeout)
+        response.raise_for_status()
+        if response.status_code != 206:
+            offset = 0
+
+        digest = hashlib.sha256()
+        if offset:
+            with open(part_path, "rb") as existing:
+                for chunk in iter(lambda: existing.read(chunk_size), b""):
+                    digest.update(chunk)
+        expected = response.headers.get("Content-Length")
+        received = 0
+        with open(part_path, "ab" if offset else "wb") as output:
+            for chunk in response.iter_content(chunk_size):
+                output.write(chunk)
+                digest.update(chunk)
+                received += len(chunk)
+
+    if expected is not None and received != int(expected):
+        raise IncompleteDownloadError(f"Received {received} of {expected} bytes from {url}")
+    os.replace(part_path, path)
+    return {"path": path, "bytes": offset + received, "sha256": digest.hexdigest(), "resumed_from": offset}
@@ -0,0 +1,484 @@
+"""
+Embedded SQLite store for saved arXiv paper metadata.
+
+Replaces the per-topic papers/<topic>/papers_info.json files: papers are
+stored once, keyed by paper ID, and linked to every topic they were found
+under. The database runs in WAL mode so readers never block the writer,
+and is indexed by paper ID, topic and published date.
+
+The same database holds an inverted index over each paper's title, authors
+and summary (term -> paper ID, term frequency) for BM25 full-text search.
+It is updated in the transaction that saves a paper, so it never needs a
+rebuild.
+
+With a WalCompactor running (start_compactor), commits only append to the
+write-ahead log and a background thread checkpoints the log into the main
+database file once enough rows have been written, so saving papers never
+pays for a checkpoint inline. Reads
+see the main file merged with the log, as usual in WAL mode.
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    paper_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    pdf_url TEXT,
+    published TEXT
+);
+CREATE TABLE IF NOT EXISTS paper_topics (
+    topic TEXT NOT NULL,
+    paper_id TEXT NOT NULL REFERENCES papers(paper_id),
+    PRIMARY KEY (topic, paper_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS paper_topics_paper_id ON paper_topics(paper_id);
+CREATE INDEX IF NOT EXISTS papers_published ON papers(published);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS json_imports (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS downloads (
+    path TEXT PRIMARY KEY,
+    paper_id TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    downloaded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS search_cache (
+    query TEXT NOT NULL,
+    sort TEXT NOT NULL,
+    max_results INTEGER NOT NULL,
+    paper_ids TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (query, sort)
+);
+CREATE INDEX IF NOT EXISTS search_cache_fetched_at ON search_cache(fetched_at);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    paper_id TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, paper_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_paper_id ON postings(paper_id);
+CREATE TABLE IF NOT EXISTS doc_lengths (
+    paper_id TEXT PRIMARY KEY,
+    length INTEGER NOT NULL
+);
+"""
+
+# Bytes of write-ahead log kept on disk after a checkpoint
+WAL_SIZE_LIMIT = 4 << 20
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the this to we with our which".split()
+)
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    """Split text into lowercase alphanumeric terms, dropping stopwords."""
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _paper_terms(info: dict) -> list:
+    return tokenize(" ".join([info["title"], " ".join(info["authors"]), info["summary"]]))
+
+def _row_to_info(row) -> dict:
+    return {
+        "title": row[0],
+        "authors": json.loads(row[1]),
+        "summary": row[2],
+        "pdf_url": row[3],
+        "published": row[4]
+    }
+
+
+class PaperStore:
+    """Paper metadata indexed by paper ID, topic and published date."""
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        """
+        Open (or create) the database.
+
+        Args:
+            path: Database file
+            busy_timeout: Seconds to wait for another process's write to finish before failing
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._compactor = None
+        # One connection shared by the server's threads, serialized by a lock
+        self._connection = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            # Shrink the log back to this size after it has been checkpointed
+            self._connection.execute(f"PRAGMA journal_size_limit={WAL_SIZE_LIMIT}")
+            self._connection.executescript(SCHEMA)
+            # Databases created before the search index existed
+            rows = self._connection.execute(
+                "SELECT paper_id, title, authors, summary FROM papers "
+                "WHERE paper_id NOT IN (SELECT paper_id FROM doc_lengths)"
+            ).fetchall()
+            for paper_id, title, authors, summary in rows:
+                self._index_paper(paper_id, {"title": title, "authors": json.loads(authors), "summary": summary})
+
+    def close(self) -> None:
+        if self._compactor is not None:
+            self._compactor.stop()
+            self._compactor = None
+        with self._lock:
+            self._connection.close()
+
+    def start_compactor(self, interval: float = 30.0, min_changes: int = 1000) -> "WalCompactor":
+        """
+        Move checkpointing off the write path into a background thread.
+
+        Args:
+            interval: Seconds between checks of the rows written
+            min_changes: Checkpoint once this many rows have been written since the last checkpoint
+        """
+        if self._compactor is None:
+            with self._lock:
+                self._connection.execute("PRAGMA wal_autocheckpoint=0")
+            self._compactor = WalCompactor(self.path, self.changes, interval, min_changes)
+            self._compactor.start()
+        return self._compactor
+
+    def changes(self) -> int:
+        """Rows inserted, updated or deleted through this store since it was opened."""
+        with self._lock:
+            return self._connection.total_changes
+
+    def add_papers(self, topic: str, papers: dict) -> int:
+        """
+        Insert or update papers and link them to a topic.
+
+        Args:
+            topic: Topic key the papers were found under
+            papers: Mapping of paper ID to its info (title, authors, summary, pdf_url, published)
+
+        Returns:
+            Number of papers written
+        """
+        rows = [(paper_id, info["title"], json.dumps(info["authors"]), info["summary"], info.get("pdf_url"),
+                 info.get("published")) for paper_id, info in papers.items()]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO papers (paper_id, title, authors, summary, pdf_url, published) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(paper_id) DO UPDATE SET title = excluded.title, authors = excluded.authors, "
+                "summary = excluded.summary, pdf_url = excluded.pdf_url, published = excluded.published",
+                rows
+            )
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO paper_topics (topic, paper_id) VALUES (?, ?)",
+                [(topic, paper_id) for paper_id in papers]
+            )
+            for paper_id, info in papers.items():
+                self._index_paper(paper_id, info)
+        return len(rows)
+
+    def _index_paper(self, paper_id: str, info: dict) -> None:
+        """Replace a paper's postings; the caller holds the lock and the transaction."""
+        terms = _paper_terms(info)
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        self._connection.execute("DELETE FROM postings WHERE paper_id = ?", (paper_id,))
+        self._connection.executemany(
+            "INSERT INTO postings (term, paper_id, tf) VALUES (?, ?, ?)",
+            [(term, paper_id, tf) for term, tf in counts.items()]
+        )
+        self._connection.execute(
+            "INSERT OR REPLACE INTO doc_lengths (paper_id, length) VALUES (?, ?)", (paper_id, len(terms))
+        )
+
+    def search(self, query: str, k: int = 10) -> list:
+        """
+        Rank saved papers against a free-text query with BM25.
+
+        Args:
+            query: Words to look for in titles, authors and summaries
+            k: Number of results to return
+
+        Returns:
+            Up to k (paper_id, score) pairs, best first
+        """
+        terms = set(tokenize(query))
+        if not terms or k < 1:
+            return []
+        scores = {}
+        with self._lock:
+            total, average_length = self._connection.execute(
+                "SELECT COUNT(*), AVG(length) FROM doc_lengths"
+            ).fetchone()
+            if not total:
+                return []
+            average_length = average_length or 1.0
+            for term in terms:
+                postings = self._connection.execute(
+                    "SELECT p.paper_id, p.tf, d.length FROM postings p JOIN doc_lengths d ON d.paper_id = p.paper_id "
+                    "WHERE p.term = ?", (term,)
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for paper_id, tf, length in postings:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[paper_id] = scores.get(paper_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def get(self, paper_id: str):
+        """Return the info saved for a paper, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT title, authors, summary, pdf_url, published FROM papers WHERE paper_id = ?", (paper_id,)
+            ).fetchone()
+        return None if row is None else _row_to_info(row)
+
+    def get_many(self, paper_ids: list) -> dict:
+        """Return the info saved for each known paper ID."""
+        found = {}
+        with self._lock:
+            # Stay below SQLite's bound parameter limit
+            for offset in range(0, len(paper_ids), 500):
+                chunk = paper_ids[offset:offset + 500]
+                rows = self._connection.execute(
+                    "SELECT paper_id, title, authors, summary, pdf_url, published FROM papers "
+                    f"WHERE paper_id IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((row[0], _row_to_info(row[1:])) for row in rows)
+        return found
+
+    def topic_papers(self, topic: str) -> dict:
+        """Return the papers saved under a topic, newest first."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT p.paper_id, p.title, p.authors, p.summary, p.pdf_url, p.published FROM paper_topics t "
+                "JOIN papers p ON p.paper_id = t.paper_id WHERE t.topic = ? ORDER BY p.published DESC", (topic,)
+            ).fetchall()
+        return {row[0]: _row_to_info(row[1:]) for row in rows}
+
+    def topics(self) -> list:
+        """Return every topic with saved papers."""
+        with self._lock:
+            return [row[0] for row in self._connection.execute("SELECT DISTINCT topic FROM paper_topics ORDER BY topic")]
+
+    def paper_ids_since(self, rowid: int = 0) -> tuple:
+        """
+        Return the IDs of papers first saved after a row, oldest first.
+
+        Args:
+            rowid: High-water mark returned by the previous call (0 for every paper)
+
+        Returns:
+            (paper IDs, new high-water mark)
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT rowid, paper_id FROM papers WHERE rowid > ? ORDER BY rowid", (rowid,)
+            ).fetchall()
+        return [paper_id for _, paper_id in rows], rows[-1][0] if rows else rowid
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def link_topic(self, topic: str, paper_ids: list) -> None:
+        """Link already saved papers to a topic."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO paper_topics (topic, paper_id) SELECT ?, paper_id FROM papers WHERE paper_id = ?",
+                [(topic, paper_id) for paper_id in paper_ids]
+            )
+
+    def cached_search(self, query: str, sort: str, max_results: int, ttl: float):
+        """
+        Return the paper IDs of a recent identical search, or None.
+
+        A search cached with a larger max_results serves smaller requests with
+        a prefix of its results; one that came back short (arXiv had no more
+        results) serves any max_results.
+
+        Args:
+            query: Normalized search query
+            sort: Sort criterion of the search
+            max_results: Number of results wanted
+            ttl: Maximum age of the cached results in seconds
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT max_results, paper_ids FROM search_cache WHERE query = ? AND sort = ? AND fetched_at >= ?",
+                (query, sort, time.time() - ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        cached_max_results, paper_ids = row[0], json.loads(row[1])
+        if cached_max_results < max_results and len(paper_ids) >= cached_max_results:
+            return None
+        return paper_ids[:max_results]
+
+    def cache_search(self, query: str, sort: str, max_results: int, paper_ids: list, max_entries: int) -> None:
+        """Cache the result of a search, evicting the oldest searches beyond max_entries."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO search_cache (query, sort, max_results, paper_ids, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)", (query, sort, max_results, json.dumps(paper_ids), time.time())
+            )
+            self._connection.execute(
+                "DELETE FROM search_cache WHERE rowid NOT IN "
+                "(SELECT rowid FROM search_cache ORDER BY fetched_at DESC LIMIT ?)", (max_entries,)
+            )
+
+    def record_download(self, paper_id: str, path: str, size: int, sha256: str) -> None:
+        """Remember a completed PDF download so it can be skipped next time."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO downloads (path, paper_id, size, sha256, downloaded_at) VALUES (?, ?, ?, ?, ?)",
+                (path, paper_id, size, sha256, time.time())
+            )
+
+    def download_record(self, path: str):
+        """Return the recorded paper_id, size and sha256 of a downloaded file, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT paper_id, size, sha256 FROM downloads WHERE path = ?", (path,)
+            ).fetchone()
+        return None if row is None else {"paper_id": row[0], "size": row[1], "sha256": row[2]}
+
+    def sync_json(self, paper_dir: str) -> int:
+        """
+        Import <paper_dir>/<topic>/papers_info.json files written by older versions or other tools.
+
+        Only files whose modification time or size changed since they were
+        last imported are read, so repeated calls cost one stat per topic.
+        The JSON files are left in place.
+
+        Returns:
+            Number of papers imported
+        """
+        if not os.path.isdir(paper_dir):
+            return 0
+        with self._lock:
+            seen = {path: (mtime_ns, size) for path, mtime_ns, size
+                    in self._connection.execute("SELECT path, mtime_ns, size FROM json_imports")}
+
+        imported = 0
+        for topic in sorted(os.listdir(paper_dir)):
+            file_path = os.path.join(paper_dir, topic, "papers_info.json")
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            if seen.get(file_path) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            try:
+                with open(file_path, "r") as json_file:
+                    papers_info = json.load(json_file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Skipping {file_path} during import: {e}", file=sys.stderr)
+                continue
+            papers = {paper_id: info for paper_id, info in papers_info.items()
+                      if isinstance(info, dict) and all(field in info for field in ("title", "authors", "summary"))}
+            imported += self.add_papers(topic, papers)
+            with self._lock, self._connection:
+                self._connection.execute("INSERT OR REPLACE INTO json_imports (path, mtime_ns, size) VALUES (?, ?, ?)",
+                                         (file_path, stat.st_mtime_ns, stat.st_size))
+        return imported
+
+
+class WalCompactor:
+    """
+    Background thread checkpointing a WAL-mode database once enough rows have been written.
+
+    The trigger counts writes rather than measuring the log file, which
+    keeps its size (up to journal_size_limit) after being checkpointed.
+    """
+
+    def __init__(self, path: str, changes, interval: float = 30.0, min_changes: int = 1000):
+        """
+        Args:
+            path: Database file
+            changes: Callable returning the running count of rows written by the store
+            interval: Seconds between checks
+            min_changes: Rows written since the last checkpoint that trigger the next one
+        """
+        self.path = path
+        self.changes = changes
+        self.interval = interval
+        self.min_changes = min_changes
+        self.checkpoints = 0
+        self._checkpointed_changes = 0
+        self._pending_frames = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="paper-store-compactor", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def checkpoint(self, connection) -> tuple:
+        """
+        Copy the logged pages into the main database file.
+
+        PASSIVE mode never waits for readers or writers; pages it cannot
+        copy yet are picked up by the next run.
+
+        Returns:
+            (frames in the log, frames checkpointed)
+        """
+        _, logged, checkpointed = connection.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        self.checkpoints += 1
+        # Frames a busy reader kept us from copying are retried on the next run
+        self._pending_frames = max(logged - checkpointed, 0)
+        return logged, checkpointed
+
+    def due(self) -> bool:
+        """Whether enough rows were written, or frames left behind, since the last checkpoint."""
+        return self._pending_frames > 0 or self.changes() - self._checkpointed_changes >= self.min_changes
+
+    def _run(self) -> None:
+        # A connection of its own, so checkpoints never hold the writers' lock
+        connection = sqlite3.connect(self.path, timeout=0)
+        try:
+            while True:
+                # On stop, fold in whatever was written last
+                stopping = self._stop.wait(self.interval)
+                if stopping or self.due():
+                    changes = self.changes()
+                    try:
+                        self.checkpoint(connection)
+                        self._checkpointed_changes = changes
+                    except sqlite3.Error as e:
+                        print(f"Paper store checkpoint failed: {e}", file=sys.stderr)
+                if stopping:
+                    break
+        finally:
+            connection.close()
@@ -0,0 +1,303 @@
+"""
+Hashed TF-IDF vectors of saved papers for offline similarity search.
+
+Each paper's title and summary are tokenized, and the log-scaled term counts
+are hashed (CRC32 of the term) into a fixed number of dimensions. Rows are
+kept in a float32 memory-mapped matrix (vectors.f32) next to an append-only
+list of paper IDs (ids.txt), so adding a paper writes one row and one line.
+
+IDF weights are applied at query time from document frequencies kept in
+memory, so stored rows never need rewriting as the corpus grows. A query is
+one weighted matrix-vector product over the memmap, in chunks. Above a
+corpus size threshold, random-hyperplane LSH tables narrow the candidates
+first, and only those rows are scored exactly.
+
+Several server processes may share the directory: rows are assigned under
+a file lock after catching up with the IDs other processes appended, and
+queries pick up those rows too. Replacing an existing paper's vector in
+another process is seen on the next open.
+"""
+
+import os
+import threading
+import zlib
+
+from file_lock import file_lock
+from lazy_imports import lazy_import
+from paper_store import tokenize
+
+np = lazy_import("numpy")
+
+DEFAULT_DIM = 2048
+# Rows scored per matrix-vector product
+CHUNK_ROWS = 8192
+# Random-hyperplane LSH: bits per signature and number of tables
+LSH_BITS = 10
+LSH_TABLES = 8
+
+
+def hash_terms(terms: list, dim: int) -> "np.ndarray":
+    """Return the log-scaled counts of terms hashed into a float32 vector of length dim."""
+    if not terms:
+        return np.zeros(dim, dtype=np.float32)
+    buckets = np.fromiter((zlib.crc32(term.encode("utf-8")) % dim for term in terms), dtype=np.int64,
+                          count=len(terms))
+    return np.log1p(np.bincount(buckets, minlength=dim)).astype(np.float32)
+
+
+def paper_text(info: dict) -> str:
+    return f"{info['title']} {info['summary']}"
+
+
+class HyperplaneLSH:
+    """Buckets vectors by the signs of random projections; similar vectors tend to share buckets."""
+
+    def __init__(self, dim: int, bits: int = LSH_BITS, tables: int = LSH_TABLES, seed: int = 0):
+        self._planes = np.random.default_rng(seed).standard_normal((tables, dim, bits)).astype(np.float32)
+        self._weights = 1 << np.arange(bits, dtype=np.int64)
+        self._buckets = [{} for _ in range(tables)]
+
+    def signatures(self, vectors) -> "np.ndarray":
+        """Return one bucket key per table for each row: shape (rows, tables)."""
+        projected = np.einsum("nd,tdb->ntb", np.atleast_2d(vectors), self._planes) > 0
+        return projected.astype(np.int64) @ self._weights
+
+    def add(self, first_row: int, vectors) -> None:
+        for offset, keys in enumerate(self.signatures(vectors)):
+            for table, key in zip(self._buckets, keys.tolist()):
+                table.setdefault(key, set()).add(first_row + offset)
+
+    def remove(self, row: int, vector) -> None:
+        for table, key in zip(self._buckets, self.signatures(vector)[0].tolist()):
+            table.get(key, set()).discard(row)
+
+    def candidates(self, vector) -> set:
+        rows = set()
+        for table, key in zip(self._buckets, self.signatures(vector)[0].tolist()):
+            rows.update(table.get(key, ()))
+        return rows
+
+
+class PaperVectors:
+    """Memory-mapped hashed TF-IDF matrix of saved papers."""
+
+    def __init__(self, directory: str, dim: int = DEFAULT_DIM, ann_threshold: int = 20000):
+        """
+        Open (or create) the vectors stored in a directory.
+
+        Args:
+            directory: Where vectors.f32 and ids.txt live
+            dim: Hashed dimensions; must match the existing files
+            ann_threshold: Corpus size from which queries go through the LSH index (0 disables it)
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.dim = dim
+        self.ann_threshold = ann_threshold
+        self._matrix_path = os.path.join(directory, "vectors.f32")
+        self._ids_path = os.path.join(directory, "ids.txt")
+        self._lock_path = os.path.join(directory, "vectors.lock")
+        self._lock = threading.Lock()
+
+        self._ids = []
+        self._rows = {}
+        self._ids_read = 0  # bytes of ids.txt already loaded
+        self._df = np.zeros(dim, dtype=np.float64)
+        self._norms = None
+        self._lsh = None
+        self._matrix = None
+        with self._lock, file_lock(self._lock_path):
+            capacity = os.path.getsize(self._matrix_path) // (dim * 4) if os.path.exists(self._matrix_path) else 0
+            self._open_matrix(capacity)
+            self._load_new_ids()
+            # IDs are written after their rows; any past the end of the matrix are from an interrupted add
+            if len(self._ids) > capacity:
+                for paper_id in self._ids[capacity:]:
+                    del self._rows[paper_id]
+                del self._ids[capacity:]
+                with open(self._ids_path, "w") as ids_file:
+                    ids_file.write("".join(f"{paper_id}\n" for paper_id in self._ids))
+                self._ids_read = os.path.getsize(self._ids_path)
+                self._df[:] = 0
+                self._count_rows(0)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, paper_id: str) -> bool:
+        return paper_id in self._rows
+
+    def _open_matrix(self, capacity: int) -> None:
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+" if capacity else "w+",
+                                 shape=(max(capacity, 1), self.dim))
+
+    def _load_new_ids(self) -> None:
+        """
+        Load IDs appended to ids.txt since the last call, by this or another process.
+
+        The caller holds the file lock.
+        """
+        size = os.path.getsize(self._ids_path) if os.path.exists(self._ids_path) else 0
+        if size <= self._ids_read:
+            return
+        with open(self._ids_path, "rb") as ids_file:
+            ids_file.seek(self._ids_read)
+            data = ids_file.read(size - self._ids_read)
+        data = data[:data.rfind(b"\n") + 1]
+        self._ids_read += len(data)
+        first = len(self._ids)
+        for paper_id in data.decode("utf-8").split():
+            self._rows[paper_id] = len(self._ids)
+            self._ids.append(paper_id)
+        if len(self._ids) > first:
+            capacity = os.path.getsize(self._matrix_path) // (self.dim * 4)
+            if capacity > len(self._matrix):
+                self._open_matrix(capacity)
+            self._count_rows(first)
+
+    def _count_rows(self, first: int) -> None:
+        """Add rows from first onwards to the document frequencies and the LSH index."""
+        for start in range(first, len(self._ids), CHUNK_ROWS):
+            stop = min(start + CHUNK_ROWS, len(self._ids), len(self._matrix))
+            self._df += (self._matrix[start:stop] > 0).sum(axis=0)
+            if self._lsh is not None:
+                self._lsh.add(start, self._matrix[start:stop])
+        self._norms = None
+
+    def _refresh(self) -> None:
+        """Pick up papers other processes added, if ids.txt has grown."""
+        size = os.path.getsize(self._ids_path) if os.path.exists(self._ids_path) else 0
+        if size > self._ids_read:
+            with file_lock(self._lock_path):
+                self._load_new_ids()
+
+    def _ensure_capacity(self, rows: int) -> None:
+        capacity = os.path.getsize(self._matrix_path) // (self.dim * 4)
+        if rows <= capacity:
+            return
+        capacity = max(rows, capacity * 2, 64)
+        with open(self._matrix_path, "r+b") as matrix_file:
+            matrix_file.truncate(capacity * self.dim * 4)
+        self._open_matrix(capacity)
+
+    def vectorize(self, text: str) -> "np.ndarray":
+        return hash_terms(tokenize(text), self.dim)
+
+    def add(self, papers: dict) -> int:
+        """
+        Add or replace the vectors of papers.
+
+        Args:
+            papers: Mapping of paper ID to its info (title and summary are used)
+
+        Returns:
+            Number of papers written
+        """
+        if not papers:
+            return 0
+        with self._lock, file_lock(self._lock_path):
+            # Rows other processes assigned since we last looked are taken
+            self._load_new_ids()
+            new_ids = [paper_id for paper_id in papers if paper_id not in self._rows]
+            self._ensure_capacity(len(self._ids) + len(new_ids))
+            for paper_id, info in papers.items():
+                vector = self.vectorize(paper_text(info))
+                row = self._rows.get(paper_id)
+                if row is None:
+                    row = self._rows[paper_id] = len(self._ids)
+                    self._ids.append(paper_id)
+                else:
+                    self._df -= self._matrix[row] > 0
+                    if self._lsh is not None:
+                        self._lsh.remove(row, self._matrix[row])
+                self._matrix[row] = vector
+                self._df += vector > 0
+                if self._lsh is not None:
+                    self._lsh.add(row, vector)
+            self._matrix.flush()
+            if new_ids:
+                with open(self._ids_path, "ab") as ids_file:
+                    ids_file.write("".join(f"{paper_id}\n" for paper_id in new_ids).encode("utf-8"))
+                self._ids_read = os.path.getsize(self._ids_path)
+            self._norms = None
+        return len(papers)
+
+    def _idf(self) -> "np.ndarray":
+        return (np.log((1 + len(self._ids)) / (1 + self._df)) + 1).astype(np.float32)
+
+    def _row_norms(self, idf_squared) -> "np.ndarray":
+        """Norms of every TF-IDF row, cached until the next add."""
+        if self._norms is None or len(self._norms) != len(self._ids):
+            norms = np.empty(len(self._ids), dtype=np.float32)
+            for start in range(0, len(self._ids), CHUNK_ROWS):
+                stop = min(start + CHUNK_ROWS, len(self._ids))
+                norms[start:stop] = np.sqrt(np.square(self._matrix[start:stop]) @ idf_squared)
+            self._norms = norms
+        return self._norms
+
+    def _ensure_lsh(self) -> "HyperplaneLSH":
+        if self._lsh is None:
+            self._lsh = HyperplaneLSH(self.dim)
+            for start in range(0, len(self._ids), CHUNK_ROWS):
+                self._lsh.add(start, self._matrix[start:min(start + CHUNK_ROWS, len(self._ids))])
+        return self._lsh
+
+    def similar(self, paper_id: str = None, text: str = None, k: int = 5) -> list:
+        """
+        Find the saved papers closest to a saved paper or to a piece of text.
+
+        Args:
+            paper_id: A saved paper to find neighbours of (it is left out of the results)
+            text: Free text to match instead
+            k: Number of results
+
+        Returns:
+            Up to k (paper_id, cosine similarity) pairs, best first
+
+        Raises:
+            KeyError: If paper_id has no vector
+        """
+        with self._lock:
+            self._refresh()
+            if paper_id is not None:
+                exclude = self._rows[paper_id]
+                query = np.array(self._matrix[exclude])
+            else:
+                exclude = None
+                query = self.vectorize(text or "")
+            if not len(self._ids) or not query.any() or k < 1:
+                return []
+
+            idf = self._idf()
+            idf_squared = idf * idf
+            weights = query * idf_squared
+            query_norm = float(np.sqrt(np.square(query) @ idf_squared))
+
+            if self.ann_threshold and len(self._ids) >= self.ann_threshold:
+                rows = self._ensure_lsh().candidates(query)
+                rows.discard(exclude)
+            else:
+                rows = None
+            if rows is not None and len(rows) >= k:
+                rows = np.sort(np.fromiter(rows, dtype=np.int64, count=len(rows)))
+                vectors = self._matrix[rows]
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    scores = (vectors @ weights) / (np.sqrt(np.square(vectors) @ idf_squared) * query_norm)
+            else:
+                norms = self._row_norms(idf_squared)
+                scores = np.empty(len(self._ids), dtype=np.float32)
+                for start in range(0, len(self._ids), CHUNK_ROWS):
+                    stop = min(start + CHUNK_ROWS, len(self._ids))
+                    scores[start:stop] = self._matrix[start:stop] @ weights
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    scores = scores / (norms * query_norm)
+                if exclude is not None:
+                    scores[exclude] = -np.inf
+                rows = np.arange(len(self._ids))
+
+            scores = np.nan_to_num(scores, nan=-np.inf)
+            count = min(k, len(scores))
+            top = np.argpartition(-scores, count - 1)[:count]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self._ids[rows[index]], float(scores[index])) for index in top.tolist() if scores[index] > 0]
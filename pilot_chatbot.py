@@ -1,7 +1,4 @@
 from dotenv import load_dotenv
-from langchain_openai import AzureChatOpenAI
-from langchain.memory import ConversationBufferMemory
-from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, SystemMessage
 from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
 from typing import List, Dict, TypedDict
@@ -11,8 +8,14 @@ import asyncio
 import nest_asyncio
 import os
 import base64
-import requests
 import asyncio
+from lazy_imports import lazy_import
+
+# The langchain stack loads when the first query needs the model, after the servers are connected
+langchain_openai = lazy_import("langchain_openai")
+langchain_memory = lazy_import("langchain.memory")
+langchain_messages = lazy_import("langchain_core.messages")
+requests = lazy_import("requests")
 
 load_dotenv()
 
@@ -29,10 +32,24 @@ class MCP_ChatBot:
         self.exit_stack = AsyncExitStack() # new
         self.available_tools: List[ToolDefinition] = [] # new
         self.tool_to_session: Dict[str, ClientSession] = {} # new
-        self.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-        self.llm = self.get_llm()
+        self._memory = None
+        self._llm = None
         self.custom_system_prompt = custom_system_prompt
 
+    @property
+    def memory(self):
+        """Conversation memory, created on first use."""
+        if self._memory is None:
+            self._memory = langchain_memory.ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+        return self._memory
+
+    @property
+    def llm(self):
+        """Chat model, created (and authenticated) on first use."""
+        if self._llm is None:
+            self._llm = self.get_llm()
+        return self._llm
+
     def get_system_prompt(self) -> str:
         """Generate system prompt instructing the LLM to use tools appropriately."""
         tool_descriptions = []
@@ -99,7 +116,7 @@ Be efficient, helpful, and only use tools when they add real value to your respo
 
         # Extract and return access token
         self.access_token = token_response.json().get("access_token")
-        llm = AzureChatOpenAI(
+        llm = langchain_openai.AzureChatOpenAI(
                 deployment_name="gpt-4o-mini",
                 azure_endpoint='https://chat-ai.cisco.com',
                 api_key=self.access_token,
@@ -169,8 +186,8 @@ Be efficient, helpful, and only use tools when they add real value to your respo
 
         # Create messages for the LLM
         messages = [
-            SystemMessage(content=self.get_system_prompt()),
-            HumanMessage(content=query)
+            langchain_messages.SystemMessage(content=self.get_system_prompt()),
+            langchain_messages.HumanMessage(content=query)
         ]
         # Bind tools to the model
         if tools_for_openai:
@@ -209,14 +226,14 @@ Be efficient, helpful, and only use tools when they add real value to your respo
                         tool_result = str(result.content) if result.content else "Tool executed successfully"
                         
                         # Add tool result to messages
-                        messages.append(ToolMessage(
+                        messages.append(langchain_messages.ToolMessage(
                             content=tool_result,
                             tool_call_id=tool_call_id
                         ))
                         
                     except Exception as e:
                         print(f"Error calling tool {tool_name}: {str(e)}")
-                        messages.append(ToolMessage(
+                        messages.append(langchain_messages.ToolMessage(
                             content=f"Error: {str(e)}",
                             tool_call_id=tool_call_id
                         ))
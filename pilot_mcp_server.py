@@ -1,40 +1,339 @@
-import arxiv
+import asyncio
 import json
 import os
-import ssl
-import certifi
-import urllib3
-import requests
-from urllib3.util.ssl_ import create_urllib3_context
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from circuit_breaker import CircuitBreaker
+from lazy_imports import lazy_import
+from paper_downloads import TokenBucket, download_file, file_sha256
+from paper_store import PaperStore
+from paper_vectors import PaperVectors
 
-# Disable SSL warnings for arXiv SSL issues
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# arxiv, requests and the SSL setup load on first tool use, not while the server starts
+arxiv = lazy_import("arxiv")
+certifi = lazy_import("certifi")
+requests = lazy_import("requests")
+urllib3 = lazy_import("urllib3")
 
-# Set SSL environment variables
-os.environ['SSL_CERT_FILE'] = certifi.where()
-os.environ['REQUESTS_CA_BUNDLE'] = certifi.where()
+_session = None
+_session_lock = threading.Lock()
+_ssl_configured = False
 
-# Configure requests session with custom SSL settings
-session = requests.Session()
-session.verify = certifi.where()
 
-# Configure urllib3 SSL context
-ctx = create_urllib3_context()
-ctx.check_hostname = False
-ctx.verify_mode = ssl.CERT_NONE
+def configure_ssl() -> None:
+    """
+    Point the SSL environment variables at the certifi bundle, once.
+
+    Also silences the insecure request warnings raised for arXiv SSL issues.
+    Must run before clients that read the environment (like arxiv.Client's
+    own session) make their first request.
+    """
+    global _ssl_configured
+    if not _ssl_configured:
+        # Disable SSL warnings for arXiv SSL issues
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+        # Set SSL environment variables
+        os.environ['SSL_CERT_FILE'] = certifi.where()
+        os.environ['REQUESTS_CA_BUNDLE'] = certifi.where()
+        _ssl_configured = True
+
+
+def get_session() -> "requests.Session":
+    """Return the shared HTTP session, configuring SSL on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                configure_ssl()
+
+                # Configure requests session with custom SSL settings
+                session = requests.Session()
+                session.verify = certifi.where()
+                _session = session
+    return _session
 
 PAPER_DIR = "papers"
+# Paper metadata database (defaults to papers.db inside PAPER_DIR)
+PAPER_DB_PATH = os.getenv("PAPER_DB_PATH")
+# Seconds a write waits for another server process writing the same database
+PAPER_DB_BUSY_TIMEOUT = float(os.getenv("PAPER_DB_BUSY_TIMEOUT", "10"))
+# The write-ahead log is checked every interval and checkpointed in the background once this many rows were written
+PAPER_DB_CHECKPOINT_INTERVAL = float(os.getenv("PAPER_DB_CHECKPOINT_INTERVAL", "30"))
+PAPER_DB_CHECKPOINT_ROWS = int(os.getenv("PAPER_DB_CHECKPOINT_ROWS", "1000"))
+
+# Results requested from arXiv per page; each page is saved and reported as it arrives
+ARXIV_PAGE_SIZE = int(os.getenv("ARXIV_PAGE_SIZE", "100"))
+
+# Seconds to wait for a progress notification to be sent before giving up on notifying
+PROGRESS_TIMEOUT = 10.0
+
+# arXiv search results are reused for this many seconds (0 disables the cache)
+ARXIV_SEARCH_CACHE_TTL = float(os.getenv("ARXIV_SEARCH_CACHE_TTL", "43200"))
+ARXIV_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("ARXIV_SEARCH_CACHE_MAX_ENTRIES", "1000"))
+
+# PDF downloads: concurrent workers, and requests per second shared by all of them
+# (arXiv asks bulk clients for at most 4 requests per second, in bursts of up to 4)
+ARXIV_DOWNLOAD_WORKERS = int(os.getenv("ARXIV_DOWNLOAD_WORKERS", "4"))
+ARXIV_DOWNLOAD_RATE = float(os.getenv("ARXIV_DOWNLOAD_RATE", "1"))
+ARXIV_DOWNLOAD_BURST = float(os.getenv("ARXIV_DOWNLOAD_BURST", "4"))
+
+download_limiter = TokenBucket(ARXIV_DOWNLOAD_RATE, ARXIV_DOWNLOAD_BURST)
+_download_pool = None
+
+# Similarity search: hashed dimensions, and corpus size from which queries use the approximate index
+PAPER_VECTOR_DIM = int(os.getenv("PAPER_VECTOR_DIM", "2048"))
+PAPER_VECTOR_ANN_THRESHOLD = int(os.getenv("PAPER_VECTOR_ANN_THRESHOLD", "20000"))
+
+_paper_store = None
+_paper_store_lock = threading.Lock()
+_paper_vectors = None
+_paper_vectors_lock = threading.Lock()
+_paper_vectors_rowid = 0  # papers table rowid up to which the index is known to be complete
+
+
+def get_paper_store() -> PaperStore:
+    """
+    Return the paper metadata store, opening it on first use.
+
+    Opening it imports papers saved by earlier versions in
+    PAPER_DIR/<topic>/papers_info.json.
+    """
+    global _paper_store
+    if _paper_store is None:
+        with _paper_store_lock:
+            if _paper_store is None:
+                store = PaperStore(PAPER_DB_PATH or os.path.join(PAPER_DIR, "papers.db"), PAPER_DB_BUSY_TIMEOUT)
+                store.sync_json(PAPER_DIR)
+                store.start_compactor(PAPER_DB_CHECKPOINT_INTERVAL, PAPER_DB_CHECKPOINT_ROWS)
+                _paper_store = store
+    return _paper_store
+
+
+def get_paper_vectors() -> PaperVectors:
+    """
+    Return the similarity index of saved papers, opening it on first use.
+
+    Papers saved since it was last used (by other processes or imported
+    JSON files) are vectorized first; only rows newer than the last call
+    are read from the store.
+    """
+    global _paper_vectors, _paper_vectors_rowid
+    store = get_paper_store()
+    with _paper_vectors_lock:
+        if _paper_vectors is None:
+            _paper_vectors = PaperVectors(os.path.join(PAPER_DIR, "vectors"), PAPER_VECTOR_DIM,
+                                          PAPER_VECTOR_ANN_THRESHOLD)
+            _paper_vectors_rowid = 0
+        new_ids, rowid = store.paper_ids_since(_paper_vectors_rowid)
+        missing = [paper_id for paper_id in new_ids if paper_id not in _paper_vectors]
+        _paper_vectors.add(store.get_many(missing))
+        # Only advanced once the papers are in the index, so a failed add is retried
+        _paper_vectors_rowid = rowid
+    return _paper_vectors
+
+
+def normalize_query(topic: str) -> str:
+    """Normalize a search topic for caching: lowercase with single spaces."""
+    return " ".join(topic.lower().split())
+
+
+def topic_key(topic: str) -> str:
+    """Normalize a topic the way saved papers are grouped ("Machine Learning" -> "machine_learning")."""
+    return topic.lower().replace(" ", "_")
+
+# arXiv health settings: probe at most every INTERVAL seconds, open the circuit after
+# THRESHOLD consecutive failures and let a trial request through after RESET seconds
+ARXIV_PROBE_URL = "https://export.arxiv.org/api/query?search_query=test&max_results=1"
+ARXIV_HEALTH_INTERVAL = float(os.getenv("ARXIV_HEALTH_INTERVAL", "300"))
+ARXIV_BREAKER_THRESHOLD = int(os.getenv("ARXIV_BREAKER_THRESHOLD", "3"))
+ARXIV_BREAKER_RESET = float(os.getenv("ARXIV_BREAKER_RESET", "60"))
+
+
+class ArxivHealthMonitor:
+    """
+    Cached view of arXiv availability.
+
+    Real requests report their outcome here, so searches never need a separate
+    connection test. A circuit breaker refuses searches after repeated
+    failures; the health probe only runs when the status is asked for and the
+    cached result is older than the probe interval.
+    """
+
+    def __init__(self, probe_url: str = ARXIV_PROBE_URL, interval: float = ARXIV_HEALTH_INTERVAL,
+                 breaker: CircuitBreaker = None):
+        self.probe_url = probe_url
+        self.interval = interval
+        self.breaker = breaker or CircuitBreaker("arXiv", ARXIV_BREAKER_THRESHOLD, ARXIV_BREAKER_RESET)
+        self._lock = threading.Lock()
+        self._healthy = None
+        self._checked_at = None
+        self._last_error = None
+        self._probing = False
+
+    def check(self) -> None:
+        """
+        Raise if requests to arXiv should not be attempted now.
+
+        Raises:
+            CircuitOpenError: If arXiv failed repeatedly and the reset timeout has not passed
+        """
+        self.breaker.check()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._healthy, self._checked_at, self._last_error = True, time.time(), None
+        self.breaker.record_success()
+
+    def record_failure(self, error: Exception) -> None:
+        with self._lock:
+            self._healthy, self._checked_at, self._last_error = False, time.time(), f"{type(error).__name__}: {error}"
+        self.breaker.record_failure()
+
+    def probe(self) -> bool:
+        """Send one lightweight query to arXiv and record the outcome."""
+        try:
+            get_session().get(self.probe_url, timeout=10).raise_for_status()
+        except Exception as e:
+            self.record_failure(e)
+            return False
+        self.record_success()
+        return True
+
+    def status(self) -> dict:
+        """Return the cached health state, probing first if it is older than the probe interval."""
+        with self._lock:
+            due = not self._probing and (self._checked_at is None or time.time() - self._checked_at >= self.interval)
+            self._probing = self._probing or due
+        if due:
+            try:
+                self.probe()
+            finally:
+                with self._lock:
+                    self._probing = False
+        with self._lock:
+            return {
+                "healthy": self._healthy,
+                "checked_at": self._checked_at,
+                "last_error": self._last_error,
+                "circuit": self.breaker.stats(),
+                "retry_after_seconds": round(self.breaker.retry_after(), 1)
+            }
+
+
+arxiv_health = ArxivHealthMonitor()
 
 # Initialize FastMCP server
 mcp = FastMCP("research")
 
+def run_search(topic: str, max_results: int, on_page=None, stop: threading.Event = None) -> List[str]:
+    """
+    Search arXiv for a topic, saving each page of results as it arrives.
+
+    Args:
+        topic: The topic to search for
+        max_results: Maximum number of results to retrieve
+        on_page: Optional callback receiving the paper IDs of each saved page
+        stop: Optional event; once set, no further pages are fetched
+
+    Returns:
+        List of paper IDs found in the search
+
+    Raises:
+        CircuitOpenError: If arXiv is known to be down
+        Exception: Whatever the arxiv client raised
+    """
+    store = get_paper_store()
+    query = normalize_query(topic)
+    if ARXIV_SEARCH_CACHE_TTL > 0:
+        paper_ids = store.cached_search(query, "relevance", max_results, ARXIV_SEARCH_CACHE_TTL)
+        if paper_ids is not None:
+            store.link_topic(topic_key(topic), paper_ids)
+            print(f"Found {len(paper_ids)} papers in the search cache")
+            if on_page:
+                on_page(paper_ids)
+            return paper_ids
+
+    # Fail fast while arXiv is known to be down instead of waiting on timeouts and retries
+    arxiv_health.check()
+
+    # The arxiv client's session picks up the CA bundle from the environment
+    configure_ssl()
+
+    # Use arxiv to find the papers with custom configuration
+    page_size = min(max_results, ARXIV_PAGE_SIZE)
+    client = arxiv.Client(
+        page_size=page_size,
+        delay_seconds=3.0,  # Increase delay to be more respectful
+        num_retries=3       # Reduce retries to fail faster
+    )
+
+    # Search for the most relevant articles matching the queried topic
+    search = arxiv.Search(
+        query=topic,
+        max_results=max_results,
+        sort_by=arxiv.SortCriterion.Relevance
+    )
+
+    paper_ids = []
+    papers_info = {}
+
+    def save_page():
+        # Only the papers from this page are written
+        store.add_papers(topic_key(topic), papers_info)
+        if _paper_vectors is not None:
+            _paper_vectors.add(papers_info)
+        if on_page:
+            on_page(list(papers_info))
+        papers_info.clear()
+
+    # The client fetches the next page (after its delay) only when the previous one is used up.
+    # Only errors from arXiv itself count against its health; saving and reporting are ours.
+    results = client.results(search)
+    while True:
+        try:
+            paper = next(results, None)
+        except Exception as search_e:
+            arxiv_health.record_failure(search_e)
+            raise
+        if paper is None:
+            break
+        paper_ids.append(paper.get_short_id())
+        papers_info[paper.get_short_id()] = {
+            'title': paper.title,
+            'authors': [author.name for author in paper.authors],
+            'summary': paper.summary,
+            'pdf_url': paper.pdf_url,
+            'published': str(paper.published.date())
+        }
+        if len(papers_info) == page_size:
+            save_page()
+            if stop is not None and stop.is_set():
+                results.close()
+                break
+    arxiv_health.record_success()
+    if papers_info:
+        save_page()
+    print(f"Found {len(paper_ids)} papers; results are saved in: {store.path}")
+
+    if ARXIV_SEARCH_CACHE_TTL > 0 and not (stop is not None and stop.is_set()):
+        store.cache_search(query, "relevance", max_results, paper_ids, ARXIV_SEARCH_CACHE_MAX_ENTRIES)
+    return paper_ids
+
+
 @mcp.tool()
-def search_papers(topic: str, max_results: int = 5) -> List[str]:
+async def search_papers(topic: str, max_results: int = 5, ctx: Context = None) -> List[str]:
     """
     Search for papers on arXiv based on a topic and store their information.
     
+    Each page of results is saved as soon as it arrives and reported as a
+    progress notification listing its paper IDs, so the first results can
+    be used before the search completes.
+    
     Args:
         topic: The topic to search for
         max_results: Maximum number of results to retrieve (default: 5)
@@ -43,86 +342,77 @@ def search_papers(topic: str, max_results: int = 5) -> List[str]:
         List of paper IDs found in the search
     """
     print(f"Searching for papers on topic: {topic} with max results: {max_results}")
-    try:
-        # Try to use requests to test the connection first
-        print("Testing connection to arXiv...")
-        test_url = "https://export.arxiv.org/api/query?search_query=test&max_results=1"
-        
-        try:
-            response = session.get(test_url, timeout=10)
-            print(f"Connection test successful: {response.status_code}")
-        except Exception as conn_e:
-            print(f"Connection test failed: {conn_e}")
-            # Fall back to insecure connection
-            session.verify = False
-        
-        # Configure SSL context to handle SSL issues on macOS
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-        ssl_context.verify_mode = ssl.CERT_NONE
-        
-        # Use arxiv to find the papers with custom configuration
-        client = arxiv.Client(
-            page_size=max_results,
-            delay_seconds=3.0,  # Increase delay to be more respectful
-            num_retries=3       # Reduce retries to fail faster
-        )
-
-        # Search for the most relevant articles matching the queried topic
-        search = arxiv.Search(
-            query=topic,
-            max_results=max_results,
-            sort_by=arxiv.SortCriterion.Relevance
-        )
-
-        # Convert to list to handle the generator and potential SSL timeouts
-        print(f"Searching for papers on topic: {topic}")
-        papers_list = list(client.results(search))
-        print(f"Found {len(papers_list)} papers")
-        
-        # Create directory for this topic
-        path = os.path.join(PAPER_DIR, topic.lower().replace(" ", "_"))
-        os.makedirs(path, exist_ok=True)
-        
-        file_path = os.path.join(path, "papers_info.json")
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    found = []
+    notify_failed = []
 
-        # Try to load existing papers info
+    def on_page(page_ids):
+        found.extend(page_ids)
+        if ctx is None or notify_failed:
+            return
         try:
-            with open(file_path, "r") as json_file:
-                papers_info = json.load(json_file)
-        except (FileNotFoundError, json.JSONDecodeError):
-            papers_info = {}
-
-        # Process each paper and add to papers_info  
-        paper_ids = []
-        for paper in papers_list:
-            paper_ids.append(paper.get_short_id())
-            paper_info = {
-                'title': paper.title,
-                'authors': [author.name for author in paper.authors],
-                'summary': paper.summary,
-                'pdf_url': paper.pdf_url,
-                'published': str(paper.published.date())
-            }
-            papers_info[paper.get_short_id()] = paper_info
-        
-        # Save updated papers_info to json file
-        with open(file_path, "w") as json_file:
-            json.dump(papers_info, json_file, indent=2)
-        
-        print(f"Results are saved in: {file_path}")
-        
-        return paper_ids
-        
+            asyncio.run_coroutine_threadsafe(
+                report_page(ctx, page_ids, len(found), max_results), loop
+            ).result(timeout=PROGRESS_TIMEOUT)
+        except Exception as e:
+            # The client may be gone; finish the search without further notifications
+            notify_failed.append(e)
+            print(f"Could not report search progress: {e!r}", file=sys.stderr)
+
+    try:
+        return await asyncio.to_thread(run_search, topic, max_results, on_page, stop)
+    except asyncio.CancelledError:
+        # Let the worker finish its current page, then stop
+        stop.set()
+        raise
     except Exception as e:
         error_msg = f"Error searching papers: {str(e)}"
         print(error_msg)
         return [error_msg]
 
+
+async def report_page(ctx: Context, page_ids: List[str], found: int, max_results: int) -> None:
+    await ctx.report_progress(found, max_results)
+    await ctx.info(json.dumps({"paper_ids": page_ids}))
+
+@mcp.tool()
+def find_similar_papers(paper_id: str = None, text: str = None, k: int = 5) -> str:
+    """
+    Find saved papers similar to a saved paper or to a description, without contacting arXiv.
+    
+    Args:
+        paper_id: ID of a saved paper to find related work for
+        text: Free text (e.g. an abstract) to match instead of a paper
+        k: Maximum number of papers to return (default: 5)
+        
+    Returns:
+        JSON list of the most similar saved papers with their cosine similarity
+    """
+    if (paper_id is None) == (text is None):
+        return "Provide either a paper_id or a text to compare with."
+    vectors = get_paper_vectors()
+    if paper_id is not None and paper_id not in vectors:
+        return f"There's no saved information related to paper {paper_id}."
+
+    matches = vectors.similar(paper_id=paper_id, text=text, k=k)
+    papers = get_paper_store().get_many([match_id for match_id, _ in matches])
+    results = []
+    for match_id, score in matches:
+        info = papers.get(match_id)
+        if info is None:
+            # Vectors are shared with other processes and may name papers this store does not have
+            continue
+        results.append({"paper_id": match_id, "similarity": round(score, 3), "title": info["title"],
+                        "authors": info["authors"], "published": info["published"], "pdf_url": info["pdf_url"]})
+    if not results:
+        return "No similar saved papers found."
+    return json.dumps(results, indent=2)
+
 @mcp.tool()
 def extract_info(paper_id: str) -> str:
     """
-    Search for information about a specific paper across all topic directories.
+    Look up the saved information about a specific paper.
     
     Args:
         paper_id: The ID of the paper to look for
@@ -130,27 +420,138 @@ def extract_info(paper_id: str) -> str:
     Returns:
         JSON string with paper information if found, error message if not found
     """
- 
-    for item in os.listdir(PAPER_DIR):
-        item_path = os.path.join(PAPER_DIR, item)
-        if os.path.isdir(item_path):
-            file_path = os.path.join(item_path, "papers_info.json")
-            if os.path.isfile(file_path):
-                try:
-                    with open(file_path, "r") as json_file:
-                        papers_info = json.load(json_file)
-                        if paper_id in papers_info:
-                            return json.dumps(papers_info[paper_id], indent=2)
-                except (FileNotFoundError, json.JSONDecodeError) as e:
-                    print(f"Error reading {file_path}: {str(e)}")
-                    continue
-    
+    store = get_paper_store()
+    paper_info = store.get(paper_id)
+    # Pick up papers_info.json files changed since the store was opened
+    if paper_info is None and store.sync_json(PAPER_DIR):
+        paper_info = store.get(paper_id)
+    if paper_info is not None:
+        return json.dumps(paper_info, indent=2)
+
     return f"There's no saved information related to paper {paper_id}."
+
+@mcp.tool()
+def extract_info_many(paper_ids: List[str]) -> str:
+    """
+    Look up the saved information about several papers at once.
+    
+    Args:
+        paper_ids: The IDs of the papers to look for
+        
+    Returns:
+        JSON object mapping each paper ID to its information, or null if it is not saved
+    """
+    store = get_paper_store()
+    found = store.get_many(list(paper_ids))
+    missing = [paper_id for paper_id in paper_ids if paper_id not in found]
+    if missing and store.sync_json(PAPER_DIR):
+        found.update(store.get_many(missing))
+    return json.dumps({paper_id: found.get(paper_id) for paper_id in paper_ids}, indent=2)
+
+@mcp.tool()
+def search_saved_papers(query: str, k: int = 5) -> str:
+    """
+    Search the papers saved by earlier searches, without contacting arXiv.
+    
+    Args:
+        query: Words to look for in paper titles, authors and summaries
+        k: Maximum number of papers to return (default: 5)
+        
+    Returns:
+        JSON list of matching papers, best match first, with their BM25 score
+    """
+    store = get_paper_store()
+    matches = store.search(query, k)
+    papers = store.get_many([paper_id for paper_id, _ in matches])
+    results = []
+    for paper_id, score in matches:
+        info = papers[paper_id]
+        results.append({"paper_id": paper_id, "score": round(score, 3), "title": info["title"],
+                        "authors": info["authors"], "published": info["published"], "pdf_url": info["pdf_url"]})
+    if not results:
+        return f"No saved papers match '{query}'."
+    return json.dumps(results, indent=2)
+
+def fetch_pdf(paper_id: str, filename: str = None) -> dict:
+    """
+    Download the PDF of a paper into PAPER_DIR unless it is already complete.
+
+    Streams to a temporary file and resumes interrupted downloads. Requests
+    go through download_limiter.
+
+    Args:
+        paper_id: arXiv paper ID
+        filename: Optional filename for the PDF
+
+    Returns:
+        Dictionary with the paper ID, status ("downloaded", "skipped" or
+        "failed"), path and size, or the error
+    """
+    pdf_url = f"https://arxiv.org/pdf/{paper_id}.pdf"
+
+    if not filename:
+        filename = f"arxiv_{paper_id}.pdf"
+
+    # Create full file path under PAPER_DIR
+    full_file_path = os.path.join(PAPER_DIR, filename)
+
+    try:
+        # Ensure the PAPER_DIR exists
+        os.makedirs(PAPER_DIR, exist_ok=True)
+        store = get_paper_store()
+        if os.path.exists(full_file_path) and is_complete_download(store, paper_id, pdf_url, full_file_path):
+            print(f"Already downloaded: {full_file_path}")
+            return {"paper_id": paper_id, "status": "skipped", "path": full_file_path,
+                    "bytes": os.path.getsize(full_file_path)}
+
+        download_limiter.acquire()
+        result = download_file(get_session(), pdf_url, full_file_path)
+        store.record_download(paper_id, full_file_path, result["bytes"], result["sha256"])
+
+        print(f"Downloaded: {full_file_path}")
+        return {"paper_id": paper_id, "status": "downloaded", "path": full_file_path, "bytes": result["bytes"]}
+
+    except Exception as e:
+        # Any error fails only this paper, so a batch still reports every paper
+        print(f"Error downloading PDF: {e}")
+        return {"paper_id": paper_id, "status": "failed", "error": str(e)}
+
+
+def is_complete_download(store: PaperStore, paper_id: str, pdf_url: str, path: str) -> bool:
+    """
+    Return whether an existing file is a complete download of the paper.
+
+    Files this server downloaded are checked against the recorded size. Older
+    files are compared with the size arXiv reports and recorded when they match.
+    """
+    size = os.path.getsize(path)
+    record = store.download_record(path)
+    if record is not None:
+        return record["paper_id"] == paper_id and record["size"] == size
+    download_limiter.acquire()
+    response = get_session().head(pdf_url, allow_redirects=True, timeout=30)
+    response.raise_for_status()
+    if response.headers.get("Content-Length") != str(size):
+        return False
+    store.record_download(paper_id, path, size, file_sha256(path))
+    return True
+
+
+def get_download_pool() -> ThreadPoolExecutor:
+    global _download_pool
+    if _download_pool is None:
+        _download_pool = ThreadPoolExecutor(max_workers=ARXIV_DOWNLOAD_WORKERS, thread_name_prefix="pdf-download")
+    return _download_pool
+
+
 @mcp.tool()
 def download_paper_pdf(paper_id: str, filename: str = None) -> bool:
         """
         Download PDF of a paper
         
+        Streams to a temporary file, resumes interrupted downloads and skips
+        files that are already complete.
+        
         Args:
             paper_id: arXiv paper ID
             filename: Optional filename for the PDF
@@ -158,31 +559,47 @@ def download_paper_pdf(paper_id: str, filename: str = None) -> bool:
         Returns:
             True if successful, False otherwise
         """
-        pdf_url = f"https://arxiv.org/pdf/{paper_id}.pdf"
-        
-        if not filename:
-            filename = f"arxiv_{paper_id}.pdf"
-        
-        # Ensure the PAPER_DIR exists
-        os.makedirs(PAPER_DIR, exist_ok=True)
-        
-        # Create full file path under PAPER_DIR
-        full_file_path = os.path.join(PAPER_DIR, filename)
-        
+        return fetch_pdf(paper_id, filename)["status"] != "failed"
+
+@mcp.tool()
+async def download_papers(paper_ids: List[str], ctx: Context = None) -> str:
+    """
+    Download the PDFs of several papers concurrently.
+
+    Downloads run on a small worker pool and share one rate limit, so a
+    whole search result can be fetched in one call without hammering arXiv.
+    Progress is reported as each paper finishes.
+
+    Args:
+        paper_ids: arXiv paper IDs
+
+    Returns:
+        JSON list with one result per paper: status ("downloaded", "skipped"
+        or "failed"), path and size, or the error
+    """
+    paper_ids = list(dict.fromkeys(paper_ids))
+    loop = asyncio.get_running_loop()
+    pending = [loop.run_in_executor(get_download_pool(), fetch_pdf, paper_id) for paper_id in paper_ids]
+    results = {}
+    notify = ctx is not None
+    for finished in asyncio.as_completed(pending):
+        result = await finished
+        results[result["paper_id"]] = result
+        if not notify:
+            continue
         try:
-            response = requests.get(pdf_url)
-            response.raise_for_status()
-            
-            with open(full_file_path, 'wb') as f:
-                f.write(response.content)
-            
-            print(f"Downloaded: {full_file_path}")
-            return True
-            
-        except requests.RequestException as e:
-            print(f"Error downloading PDF: {e}")
-            return False
+            await ctx.report_progress(len(results), len(paper_ids))
+            await ctx.info(f"{result['paper_id']}: {result['status']}")
+        except Exception as e:
+            # The client may be gone; finish the downloads without further notifications
+            notify = False
+            print(f"Could not report download progress: {e!r}", file=sys.stderr)
+    return json.dumps([results[paper_id] for paper_id in paper_ids], indent=2)
 
+@mcp.resource("research://health")
+def arxiv_health_status() -> str:
+    """Cached arXiv availability and circuit breaker state."""
+    return json.dumps(arxiv_health.status(), indent=2)
 
 
 if __name__ == "__main__":
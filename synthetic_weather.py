@@ -0,0 +1,94 @@
+"""
+Synthetic Open-Meteo responses for offline tests and benchmarks.
+
+build_weather_payload() writes the same length-prefixed flatbuffer message
+the API returns, with random values for the requested variables.
+"""
+
+import flatbuffers
+import numpy as np
+from openmeteo_sdk.WeatherApiResponse import WeatherApiResponse
+
+import weather_mcp_server
+
+HOURS = 168
+DAYS = 7
+START = 1_750_000_000 - (1_750_000_000 % 86400)
+
+
+def _variable(builder, value=None, values=None, values_int64=None):
+    """Build one VariableWithValues table and return its offset."""
+    values_vector = builder.CreateNumpyVector(np.asarray(values, dtype=np.float32)) if values is not None else None
+    int64_vector = builder.CreateNumpyVector(np.asarray(values_int64, dtype=np.int64)) if values_int64 is not None else None
+    builder.StartObject(5)
+    if value is not None:
+        builder.PrependFloat32Slot(2, value, 0.0)
+    if values_vector is not None:
+        builder.PrependUOffsetTRelativeSlot(3, values_vector, 0)
+    if int64_vector is not None:
+        builder.PrependUOffsetTRelativeSlot(4, int64_vector, 0)
+    return builder.EndObject()
+
+
+def _variables_with_time(builder, time, time_end, interval, variables):
+    """Build one VariablesWithTime table from already built variable offsets."""
+    builder.StartVector(4, len(variables), 4)
+    for variable in reversed(variables):
+        builder.PrependUOffsetTRelative(variable)
+    vector = builder.EndVector()
+    builder.StartObject(4)
+    builder.PrependInt64Slot(0, time, 0)
+    builder.PrependInt64Slot(1, time_end, 0)
+    builder.PrependInt32Slot(2, interval, 0)
+    builder.PrependUOffsetTRelativeSlot(3, vector, 0)
+    return builder.EndObject()
+
+
+def build_weather_payload(latitude=45.42, longitude=-75.7, hours=HOURS, days=DAYS, seed=0,
+                          hourly=None, daily=None, current=None):
+    """
+    Build a length-prefixed Open-Meteo flatbuffer message for the given
+    variables (the server's defaults when omitted).
+    """
+    hourly = weather_mcp_server.HOURLY_VARIABLES if hourly is None else hourly
+    daily = weather_mcp_server.DAILY_VARIABLES if daily is None else daily
+    current = weather_mcp_server.CURRENT_VARIABLES if current is None else current
+    rng = np.random.default_rng(seed)
+    builder = flatbuffers.Builder(4096)
+    timezone_name = builder.CreateString("America/New_York")
+    abbreviation = builder.CreateString("GMT-4")
+
+    blocks = {}
+    if current:
+        blocks[9] = _variables_with_time(builder, START, START + 900, 900, [
+            _variable(builder, value=float(v)) for v in rng.uniform(0, 30, len(current))
+        ])
+    if daily:
+        day_starts = START + 86400 * np.arange(days, dtype=np.int64)
+        blocks[10] = _variables_with_time(builder, START, START + days * 86400, 86400, [
+            _variable(builder, values_int64=day_starts + 36000) if name in weather_mcp_server.TIMESTAMP_DAILY_VARIABLES
+            else _variable(builder, values=rng.uniform(0, 8, days))
+            for name in daily
+        ])
+    if hourly:
+        blocks[11] = _variables_with_time(builder, START, START + hours * 3600, 3600, [
+            _variable(builder, values=rng.uniform(0, 30, hours)) for _ in hourly
+        ])
+
+    builder.StartObject(12)
+    builder.PrependFloat32Slot(0, latitude, 0.0)
+    builder.PrependFloat32Slot(1, longitude, 0.0)
+    builder.PrependFloat32Slot(2, 70.0, 0.0)
+    builder.PrependInt32Slot(6, -14400, 0)
+    builder.PrependUOffsetTRelativeSlot(7, timezone_name, 0)
+    builder.PrependUOffsetTRelativeSlot(8, abbreviation, 0)
+    for slot, block in blocks.items():
+        builder.PrependUOffsetTRelativeSlot(slot, block, 0)
+    builder.Finish(builder.EndObject())
+    message = bytes(builder.Output())
+    return len(message).to_bytes(4, "little") + message
+
+
+def build_weather_response(**kwargs):
+    """Decode a synthetic payload into a WeatherApiResponse."""
+    return WeatherApiResponse.GetRootAs(build_weather_payload(**kwargs), 4)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline gazetteer and its use in weather location lookups.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+import weather_mcp_server
+from gazetteer import FUZZY_MIN_SCORE, _unit_vectors, get_gazetteer, normalize_name, parse_coordinates
+
+
+def test_normalize_name():
+    assert normalize_name("St. John's") == "st johns"
+    assert normalize_name("  Montréal ") == "montreal"
+    assert normalize_name("Sault Ste. Marie") == "sault ste marie"
+
+
+def test_parse_coordinates():
+    assert parse_coordinates("45.42, -75.7") == (45.42, -75.7)
+    assert parse_coordinates("45.42 -75.7") == (45.42, -75.7)
+    assert parse_coordinates("ottawa") is None
+    assert parse_coordinates("95, 10") is None
+
+
+def test_lookup_prefers_largest_place_and_country_filter():
+    gazetteer = get_gazetteer()
+
+    assert gazetteer.lookup("Kelowna")["country_code"] == "CA"
+    assert gazetteer.lookup("montreal")["name"] == "Montréal"
+    assert gazetteer.lookup("London")["country_code"] == "GB"
+    assert gazetteer.lookup("London, CA")["admin1_code"] == "08"
+    assert gazetteer.lookup("Nowhereville") is None
+
+
+def test_qualifier_falls_back_to_division_then_name():
+    gazetteer = get_gazetteer()
+
+    # Two-letter codes that are not the place's country may be its state or province
+    assert gazetteer.lookup("Portland, ME")["admin1_code"] == "ME"
+    assert gazetteer.lookup("Portland, OR")["admin1_code"] == "OR"
+    assert gazetteer.search_prefix("New York, NY")[0]["name"] == "New York City"
+    assert weather_mcp_server.get_coordinates("New York, NY")["name"] == "New York City, US"
+    # A code matching nothing is ignored
+    assert gazetteer.lookup("Kelowna, ZZ")["country_code"] == "CA"
+
+
+def test_prefix_and_fuzzy_search():
+    gazetteer = get_gazetteer()
+
+    assert "Saskatoon" in [place["name"] for place in gazetteer.search_prefix("saskat")]
+    best = gazetteer.fuzzy("Edmontn")[0]
+    assert (best["name"], best["country_code"]) == ("Edmonton", "CA")
+
+
+def test_fuzzy_matches_respect_the_minimum_score():
+    gazetteer = get_gazetteer()
+
+    assert all(place["score"] >= FUZZY_MIN_SCORE for place in gazetteer.fuzzy("Atlantys", limit=20))
+    assert gazetteer.fuzzy("Qqxzzv") == []
+    with pytest.raises(ValueError):
+        weather_mcp_server.get_coordinates("Qqxzzv")
+
+
+def test_nearest_matches_brute_force():
+    gazetteer = get_gazetteer()
+    points = _unit_vectors(gazetteer.latitudes.astype(np.float64), gazetteer.longitudes.astype(np.float64))
+    rng = np.random.default_rng(7)
+
+    for latitude, longitude in zip(rng.uniform(-60, 75, 50), rng.uniform(-180, 180, 50)):
+        expected = int(np.argmin(((points - _unit_vectors(latitude, longitude)) ** 2).sum(axis=1)))
+        nearest = gazetteer.nearest(latitude, longitude)[0]
+        assert nearest["name"] == gazetteer.names[expected]
+
+    assert gazetteer.nearest(45.4112, -75.6981, k=3)[0]["distance_km"] < 1
+    assert gazetteer.nearest(45.4112, -75.6981, k=0) == []
+    assert len(json.loads(weather_mcp_server.find_location("45.4112, -75.6981", limit=0))) == 1
+
+
+def test_get_coordinates_uses_gazetteer():
+    assert weather_mcp_server.get_coordinates("ottawa") == weather_mcp_server.locattion_to_coordinates["ottawa"]
+    assert weather_mcp_server.get_coordinates("45.5, -73.6") == {"latitude": 45.5, "longitude": -73.6}
+    assert weather_mcp_server.get_coordinates("Kelowma")["name"] == "Kelowna, CA"
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for deferred imports in the MCP servers.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from lazy_imports import lazy_import
+
+LOADED_MODULES = """
+import json, sys, importlib.util
+import {server}
+print(json.dumps({{name: not isinstance(module, importlib.util._LazyModule)
+                  for name, module in sys.modules.items() if name in {names!r}}}))
+"""
+
+
+def loaded_after_import(server: str, names: list, lazy: bool = True) -> dict:
+    """Import a server in a fresh interpreter and report which of the named modules really executed."""
+    env = dict(os.environ, MCP_LAZY_IMPORTS="true" if lazy else "false")
+    output = subprocess.run(
+        [sys.executable, "-c", LOADED_MODULES.format(server=server, names=names)],
+        capture_output=True, text=True, check=True, env=env
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_servers_defer_heavy_imports():
+    weather = ["numpy", "openmeteo_requests", "requests_cache", "niquests"]
+    assert loaded_after_import("weather_mcp_server", weather) == dict.fromkeys(weather, False)
+    assert loaded_after_import("pilot_mcp_server", ["arxiv"]) == {"arxiv": False}
+    assert loaded_after_import("weather_mcp_server", weather, lazy=False) == dict.fromkeys(weather, True)
+
+
+def test_lazy_import_loads_on_first_use():
+    module = lazy_import("colorsys")
+    assert module.rgb_to_hls(1.0, 0.0, 0.0) == (0.0, 0.5, 1.0)
+
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import("no_such_module_anywhere")
@@ -0,0 +1,554 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the research MCP server using a fake arXiv client.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import pilot_mcp_server
+from circuit_breaker import CircuitBreaker
+from paper_downloads import TokenBucket
+from paper_store import PaperStore
+from paper_vectors import PaperVectors, paper_text
+
+
+def make_paper(paper_id, title="A paper", published="2024-01-15"):
+    """Build an object shaped like arxiv.Result."""
+    return SimpleNamespace(
+        get_short_id=lambda: paper_id,
+        title=title,
+        authors=[SimpleNamespace(name="Ada Lovelace"), SimpleNamespace(name="Alan Turing")],
+        summary=f"Summary of {title}",
+        pdf_url=f"http://arxiv.org/pdf/{paper_id}",
+        published=datetime.fromisoformat(published)
+    )
+
+
+class FakeArxiv:
+    """Stands in for the arxiv module: records searches and returns canned papers (or raises)."""
+
+    class SortCriterion:
+        Relevance = "relevance"
+        SubmittedDate = "submittedDate"
+
+    def __init__(self, papers=None):
+        self.papers = papers if papers is not None else [make_paper(f"2401.{i:05d}v1", f"Paper {i}") for i in range(10)]
+        self.searches = []
+        self.error = None
+        fake = self
+
+        class Search:
+            def __init__(self, query, max_results=10, sort_by=None, **kwargs):
+                self.query, self.max_results, self.sort_by = query, max_results, sort_by
+
+        class Client:
+            def __init__(self, page_size=100, delay_seconds=3.0, num_retries=3):
+                self.page_size = page_size
+                fake.ca_bundle = os.environ.get("REQUESTS_CA_BUNDLE")
+
+            def results(self, search, offset=0):
+                fake.searches.append(search)
+                if fake.error:
+                    raise fake.error
+                yield from fake.papers[offset:search.max_results]
+
+        self.Search = Search
+        self.Client = Client
+
+
+def search(topic, max_results=5, ctx=None):
+    return asyncio.run(pilot_mcp_server.search_papers(topic, max_results, ctx))
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=b"", headers=None, fail_after=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = dict(headers or {}, **{"Content-Length": str(len(body))})
+        self.fail_after = fail_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            if self.fail_after is not None and start >= self.fail_after:
+                raise requests.ConnectionError("connection reset")
+            yield self.body[start:start + chunk_size]
+
+
+class FakeSession:
+    """Serves one file with Range support; can drop the connection after a number of bytes."""
+
+    def __init__(self, body):
+        self.body = body
+        self.requests = []
+        self.fail_after = None
+        self.missing = set()
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        headers = headers or {}
+        self.requests.append(("GET", headers.get("Range")))
+        if url in self.missing:
+            return FakeResponse(404)
+        fail_after, self.fail_after = self.fail_after, None
+        if "Range" in headers:
+            start = int(headers["Range"][len("bytes="):-1])
+            return FakeResponse(206, self.body[start:], fail_after=fail_after)
+        return FakeResponse(200, self.body, fail_after=fail_after)
+
+    def head(self, url, allow_redirects=False, timeout=None):
+        self.requests.append(("HEAD", None))
+        return FakeResponse(200, self.body)
+
+
+@pytest.fixture(autouse=True)
+def research_env(monkeypatch, tmp_path):
+    fake = FakeArxiv()
+    monkeypatch.setattr(pilot_mcp_server, "arxiv", fake)
+    monkeypatch.setattr(pilot_mcp_server, "PAPER_DIR", str(tmp_path / "papers"))
+    monkeypatch.setattr(pilot_mcp_server, "PAPER_DB_PATH", None)
+    monkeypatch.setattr(pilot_mcp_server, "_paper_store", None)
+    monkeypatch.setattr(pilot_mcp_server, "_paper_vectors", None)
+    monkeypatch.setattr(pilot_mcp_server, "arxiv_health",
+                        pilot_mcp_server.ArxivHealthMonitor(breaker=CircuitBreaker("arXiv", 2, 60)))
+    yield fake
+    if pilot_mcp_server._paper_store is not None:
+        pilot_mcp_server._paper_store.close()
+
+
+def test_search_makes_one_request_and_saves_papers(research_env):
+    paper_ids = search("Machine Learning", max_results=3)
+
+    assert paper_ids == ["2401.00000v1", "2401.00001v1", "2401.00002v1"]
+    assert len(research_env.searches) == 1
+    info = json.loads(pilot_mcp_server.extract_info("2401.00001v1"))
+    assert info["title"] == "Paper 1" and info["published"] == "2024-01-15"
+
+
+def test_arxiv_client_gets_the_ca_bundle_before_any_download(research_env, monkeypatch):
+    monkeypatch.setattr(pilot_mcp_server, "_ssl_configured", False)
+    monkeypatch.delenv("REQUESTS_CA_BUNDLE", raising=False)
+    monkeypatch.delenv("SSL_CERT_FILE", raising=False)
+
+    search("Machine Learning", max_results=1)
+    assert research_env.ca_bundle == pilot_mcp_server.certifi.where()
+
+def test_failing_arxiv_opens_circuit(research_env, monkeypatch):
+    research_env.error = ConnectionError("arXiv unreachable")
+    probes = []
+    monkeypatch.setattr(pilot_mcp_server.ArxivHealthMonitor, "probe", lambda self: probes.append(1))
+
+    for _ in range(2):
+        assert "arXiv unreachable" in search("agents")[0]
+    refused = search("agents")[0]
+
+    assert "unavailable" in refused and len(research_env.searches) == 2
+    status = pilot_mcp_server.arxiv_health.status()
+    assert status["healthy"] is False and status["circuit"]["state"] == "open"
+    # The cached failure is recent, so asking for the status does not probe again
+    assert probes == []
+
+
+def test_store_links_papers_to_every_topic(research_env):
+    search("Machine Learning", max_results=2)
+    research_env.papers = [make_paper("2401.00001v1", "Paper 1", "2024-03-01"), make_paper("2402.00000v1", "Newer")]
+    search("agents", max_results=2)
+
+    store = pilot_mcp_server.get_paper_store()
+    assert store.count() == 3
+    assert store.topics() == ["agents", "machine_learning"]
+    # Papers are stored once; the latest search refreshes their details
+    assert list(store.topic_papers("machine_learning")) == ["2401.00001v1", "2401.00000v1"]
+    assert store.get_many(["2401.00001v1", "missing"])["2401.00001v1"]["published"] == "2024-03-01"
+
+
+def test_legacy_json_files_are_synced_incrementally(tmp_path):
+    topic_dir = tmp_path / "papers" / "transformers"
+    topic_dir.mkdir(parents=True)
+    legacy = {"1706.03762v7": {"title": "Attention Is All You Need", "authors": ["Ashish Vaswani"],
+                               "summary": "The dominant sequence transduction models...",
+                               "pdf_url": "http://arxiv.org/pdf/1706.03762v7", "published": "2017-06-12"}}
+    (topic_dir / "papers_info.json").write_text(json.dumps(legacy))
+
+    info = json.loads(pilot_mcp_server.extract_info("1706.03762v7"))
+    assert info == legacy["1706.03762v7"]
+    assert "no saved information" in pilot_mcp_server.extract_info("0000.00000")
+    store = pilot_mcp_server.get_paper_store()
+    assert store.sync_json(str(tmp_path / "papers")) == 0
+
+    # A file written after the store was opened is picked up on the next miss
+    legacy["2000.00001v1"] = dict(legacy["1706.03762v7"], title="Written by another tool")
+    (topic_dir / "papers_info.json").write_text(json.dumps(legacy))
+    papers = json.loads(pilot_mcp_server.extract_info_many(["2000.00001v1", "1706.03762v7", "0000.00000"]))
+    assert papers["2000.00001v1"]["title"] == "Written by another tool"
+    assert papers["1706.03762v7"]["title"] == "Attention Is All You Need"
+    assert papers["0000.00000"] is None
+
+
+def test_search_saved_papers_ranks_with_bm25(research_env):
+    research_env.papers = [
+        make_paper("2401.00001v1", "Sparse mixture of experts for language models"),
+        make_paper("2401.00002v1", "Reinforcement learning agents"),
+        make_paper("2401.00003v1", "Routing in mixture models")
+    ]
+    search("moe", max_results=3)
+
+    results = json.loads(pilot_mcp_server.search_saved_papers("mixture of experts", k=2))
+    assert [result["paper_id"] for result in results] == ["2401.00001v1", "2401.00003v1"]
+    assert results[0]["score"] > results[1]["score"] > 0
+    assert "No saved papers" in pilot_mcp_server.search_saved_papers("quantum chromodynamics")
+
+    # Re-saving a paper replaces its postings
+    research_env.papers = [make_paper("2401.00002v1", "Quantum chromodynamics on the lattice")]
+    search("physics", max_results=1)
+    assert pilot_mcp_server.get_paper_store().search("reinforcement") == []
+    assert pilot_mcp_server.get_paper_store().search("chromodynamics")[0][0] == "2401.00002v1"
+
+
+def test_pdf_download_resumes_and_skips_complete_files(monkeypatch, tmp_path):
+    session = FakeSession(bytes(range(256)) * 1024)
+    monkeypatch.setattr(pilot_mcp_server, "get_session", lambda: session)
+    pdf_path = tmp_path / "papers" / "arxiv_2401.00001v1.pdf"
+
+    session.fail_after = 128 * 1024
+    assert pilot_mcp_server.download_paper_pdf("2401.00001v1") is False
+    assert not pdf_path.exists()
+    assert (tmp_path / "papers" / "arxiv_2401.00001v1.pdf.part").stat().st_size == 128 * 1024
+
+    assert pilot_mcp_server.download_paper_pdf("2401.00001v1") is True
+    assert pdf_path.read_bytes() == session.body
+    assert session.requests == [("GET", None), ("GET", "bytes=131072-")]
+
+    # Complete files are skipped without any request
+    assert pilot_mcp_server.download_paper_pdf("2401.00001v1") is True
+    assert len(session.requests) == 2
+
+    # Files from before downloads were recorded are checked against the remote size once
+    pilot_mcp_server.get_paper_store().close()
+    (tmp_path / "papers" / "papers.db").unlink()
+    monkeypatch.setattr(pilot_mcp_server, "_paper_store", None)
+    assert pilot_mcp_server.download_paper_pdf("2401.00001v1") is True
+    assert pilot_mcp_server.download_paper_pdf("2401.00001v1") is True
+    assert session.requests[2:] == [("HEAD", None)]
+
+
+def test_download_papers_shares_the_rate_limit(monkeypatch):
+    session = FakeSession(b"%PDF-1.7 tiny")
+    session.missing.add("https://arxiv.org/pdf/2401.00003v1.pdf")
+    monkeypatch.setattr(pilot_mcp_server, "get_session", lambda: session)
+    acquired = []
+    monkeypatch.setattr(pilot_mcp_server.download_limiter, "acquire", lambda: acquired.append(1))
+
+    ids = ["2401.00001v1", "2401.00002v1", "2401.00003v1", "2401.00001v1"]
+    results = json.loads(asyncio.run(pilot_mcp_server.download_papers(ids)))
+
+    assert [result["paper_id"] for result in results] == ids[:3]
+    assert [result["status"] for result in results] == ["downloaded", "downloaded", "failed"]
+    assert "404" in results[2]["error"]
+    assert len(acquired) == len(session.requests) == 3
+
+    results = json.loads(asyncio.run(pilot_mcp_server.download_papers(ids[:2])))
+    assert [result["status"] for result in results] == ["skipped", "skipped"]
+    assert len(acquired) == 3
+
+
+def test_download_errors_fail_only_their_paper(monkeypatch):
+    monkeypatch.setattr(pilot_mcp_server, "get_session", lambda: FakeSession(b"%PDF-1.7 tiny"))
+    monkeypatch.setattr(pilot_mcp_server.download_limiter, "acquire", lambda: 0.0)
+    store = pilot_mcp_server.get_paper_store()
+    record_download = store.record_download
+
+    def locked_database(paper_id, *args):
+        if paper_id == "2401.00002v1":
+            raise sqlite3.OperationalError("database is locked")
+        return record_download(paper_id, *args)
+
+    monkeypatch.setattr(store, "record_download", locked_database)
+    ids = ["2401.00001v1", "2401.00002v1", "2401.00003v1"]
+    results = json.loads(asyncio.run(pilot_mcp_server.download_papers(ids)))
+
+    assert [result["status"] for result in results] == ["downloaded", "failed", "downloaded"]
+    assert results[1]["error"] == "database is locked"
+
+def test_token_bucket_spaces_out_requests():
+    bucket = TokenBucket(rate=50, capacity=2)
+    start = time.monotonic()
+    waits = [bucket.acquire() for _ in range(5)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert time.monotonic() - start >= 3 / 50 * 0.9
+
+
+def test_repeat_searches_are_served_from_the_cache(research_env, monkeypatch):
+    first = search("Large  Language Models", max_results=5)
+
+    # Same normalized query: a smaller request is a prefix of the cached results
+    assert search("large language models", max_results=3) == first[:3]
+    assert len(research_env.searches) == 1
+    # More results than were cached go to arXiv again
+    assert len(search("large language models", max_results=8)) == 8
+    assert len(research_env.searches) == 2
+
+    # A search that ran out of results answers any larger request
+    research_env.papers = research_env.papers[:2]
+    search("niche topic", max_results=5)
+    assert len(search("Niche Topic", max_results=10)) == 2
+    assert len(research_env.searches) == 3
+    assert "niche_topic" in pilot_mcp_server.get_paper_store().topics()
+
+    monkeypatch.setattr(pilot_mcp_server, "ARXIV_SEARCH_CACHE_TTL", 1e-9)
+    search("niche topic", max_results=2)
+    assert len(research_env.searches) == 4
+
+
+def test_search_cache_evicts_the_oldest_entries(research_env, monkeypatch):
+    monkeypatch.setattr(pilot_mcp_server, "ARXIV_SEARCH_CACHE_MAX_ENTRIES", 2)
+    for topic in ("first", "second", "third"):
+        search(topic, max_results=1)
+
+    store = pilot_mcp_server.get_paper_store()
+    assert store.cached_search("first", "relevance", 1, 3600) is None
+    assert store.cached_search("third", "relevance", 1, 3600) == ["2401.00000v1"]
+
+
+class FakeContext:
+    def __init__(self):
+        self.progress = []
+        self.messages = []
+
+    async def report_progress(self, progress, total=None):
+        self.progress.append((progress, total))
+
+    async def info(self, message):
+        self.messages.append(json.loads(message))
+
+
+def test_search_reports_and_saves_each_page(research_env, monkeypatch):
+    monkeypatch.setattr(pilot_mcp_server, "ARXIV_PAGE_SIZE", 2)
+    ctx = FakeContext()
+
+    paper_ids = search("graph neural networks", max_results=5, ctx=ctx)
+
+    assert ctx.progress == [(2, 5), (4, 5), (5, 5)]
+    assert [message["paper_ids"] for message in ctx.messages] == [paper_ids[:2], paper_ids[2:4], paper_ids[4:]]
+    # A cached answer arrives as a single page
+    ctx = FakeContext()
+    assert search("graph neural networks", max_results=3, ctx=ctx) == paper_ids[:3]
+    assert ctx.progress == [(3, 3)]
+
+
+def test_failed_progress_notifications_do_not_count_against_arxiv(research_env, monkeypatch):
+    monkeypatch.setattr(pilot_mcp_server, "ARXIV_PAGE_SIZE", 2)
+
+    class GoneContext(FakeContext):
+        async def report_progress(self, progress, total=None):
+            self.progress.append((progress, total))
+            raise ConnectionResetError("client went away")
+
+    ctx = GoneContext()
+    paper_ids = search("graph neural networks", max_results=5, ctx=ctx)
+
+    assert len(paper_ids) == 5 and len(ctx.progress) == 1
+    assert len(pilot_mcp_server.get_paper_store().topic_papers("graph_neural_networks")) == 5
+    assert pilot_mcp_server.arxiv_health.status()["circuit"]["consecutive_failures"] == 0
+
+
+def test_failed_download_notifications_keep_every_result(monkeypatch):
+    monkeypatch.setattr(pilot_mcp_server, "get_session", lambda: FakeSession(b"%PDF-1.7 tiny"))
+    monkeypatch.setattr(pilot_mcp_server.download_limiter, "acquire", lambda: 0.0)
+
+    class GoneContext(FakeContext):
+        async def report_progress(self, progress, total=None):
+            self.progress.append((progress, total))
+            raise ConnectionResetError("client went away")
+
+    ctx = GoneContext()
+    ids = ["2401.00001v1", "2401.00002v1", "2401.00003v1"]
+    results = json.loads(asyncio.run(pilot_mcp_server.download_papers(ids, ctx=ctx)))
+
+    assert [result["paper_id"] for result in results] == ids
+    assert [result["status"] for result in results] == ["downloaded"] * 3
+    assert len(ctx.progress) == 1 and ctx.messages == []
+
+
+def test_stopped_search_keeps_saved_pages(research_env, monkeypatch):
+    monkeypatch.setattr(pilot_mcp_server, "ARXIV_PAGE_SIZE", 2)
+    stop = threading.Event()
+    pages = []
+
+    def on_page(page_ids):
+        pages.append(page_ids)
+        stop.set()
+
+    paper_ids = pilot_mcp_server.run_search("graph neural networks", 6, on_page, stop)
+
+    assert paper_ids == ["2401.00000v1", "2401.00001v1"] and pages == [paper_ids]
+    store = pilot_mcp_server.get_paper_store()
+    assert list(store.topic_papers("graph_neural_networks")) == paper_ids
+    # An incomplete search is not cached
+    assert store.cached_search("graph neural networks", "relevance", 2, 3600) is None
+
+
+def test_concurrent_writers_and_background_checkpoints(tmp_path):
+    path = str(tmp_path / "papers.db")
+    stores = [PaperStore(path), PaperStore(path)]
+    compactor = stores[0].start_compactor(interval=0.01, min_changes=1)
+
+    def write(store, start):
+        for i in range(start, start + 50):
+            store.add_papers("shared", {f"2401.{i:05d}v1": {"title": f"Paper {i}", "authors": ["Ada Lovelace"],
+                                                             "summary": "Concurrent writes", "published": "2024-01-15"}})
+
+    threads = [threading.Thread(target=write, args=(store, index * 50)) for index, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(stores[1].topic_papers("shared")) == 100
+    deadline = time.monotonic() + 5
+    while compactor.checkpoints == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert compactor.checkpoints > 0
+    for store in stores:
+        store.close()
+    reopened = PaperStore(path)
+    assert reopened.count() == 100
+    reopened.close()
+
+
+def test_compactor_idles_once_the_log_is_checkpointed(tmp_path):
+    store = PaperStore(str(tmp_path / "papers.db"))
+    compactor = store.start_compactor(interval=0.01, min_changes=1)
+    store.add_papers("idle", {"2401.00001v1": {"title": "Paper", "authors": ["Ada Lovelace"], "summary": "Once",
+                                               "published": "2024-01-15"}})
+    deadline = time.monotonic() + 5
+    while compactor.checkpoints == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    checkpoints = compactor.checkpoints
+
+    # The log file keeps its size after a checkpoint; with nothing new written there is nothing to do
+    time.sleep(0.2)
+    assert checkpoints > 0 and compactor.checkpoints == checkpoints
+    store.close()
+
+
+SIMILARITY_PAPERS = {
+    "2401.00001v1": ("Sparse mixture of experts language models", "Routing tokens to expert feed-forward layers"),
+    "2401.00002v1": ("Scaling mixture of experts", "Expert routing and load balancing for sparse language models"),
+    "2401.00003v1": ("Protein folding with diffusion", "Generating protein backbones with denoising diffusion"),
+    "2401.00004v1": ("Diffusion models for molecules", "Denoising diffusion generates protein and molecule structures"),
+}
+
+
+def similarity_info(title, summary):
+    return {"title": title, "authors": ["Ada Lovelace"], "summary": summary, "pdf_url": None,
+            "published": "2024-01-15"}
+
+
+def test_find_similar_papers_by_id_and_text(research_env):
+    research_env.papers = [make_paper(paper_id, title) for paper_id, (title, _) in SIMILARITY_PAPERS.items()]
+    search("moe and diffusion", max_results=4)
+    assert "Provide either" in pilot_mcp_server.find_similar_papers()
+
+    results = json.loads(pilot_mcp_server.find_similar_papers(paper_id="2401.00001v1", k=1))
+    assert [result["paper_id"] for result in results] == ["2401.00002v1"]
+    results = json.loads(pilot_mcp_server.find_similar_papers(text="protein diffusion", k=2))
+    assert {result["paper_id"] for result in results} == {"2401.00003v1", "2401.00004v1"}
+
+    # Papers saved later are added to the open index
+    research_env.papers = [make_paper("2401.00005v1", "Protein diffusion revisited")]
+    search("proteins", max_results=1)
+    results = json.loads(pilot_mcp_server.find_similar_papers(text="protein diffusion revisited", k=1))
+    assert results[0]["paper_id"] == "2401.00005v1"
+
+
+def test_similarity_index_reads_only_newly_saved_papers(research_env, monkeypatch):
+    research_env.papers = [make_paper(paper_id, title) for paper_id, (title, _) in SIMILARITY_PAPERS.items()]
+    search("moe and diffusion", max_results=4)
+    pilot_mcp_server.get_paper_vectors()
+    store = pilot_mcp_server.get_paper_store()
+    requested = []
+    get_many = store.get_many
+    monkeypatch.setattr(store, "get_many", lambda paper_ids: requested.append(paper_ids) or get_many(paper_ids))
+
+    pilot_mcp_server.get_paper_vectors()
+    store.add_papers("later", {"2401.00005v1": similarity_info("Protein diffusion revisited", "Folding")})
+    assert "2401.00005v1" in pilot_mcp_server.get_paper_vectors()
+    assert requested == [[], ["2401.00005v1"]]
+
+
+def test_similar_papers_missing_from_the_store_are_skipped(research_env):
+    research_env.papers = [make_paper(paper_id, title) for paper_id, (title, _) in SIMILARITY_PAPERS.items()]
+    search("moe and diffusion", max_results=4)
+    # Another process's paper, in the shared vectors but not in this store
+    pilot_mcp_server.get_paper_vectors().add(
+        {"2401.00009v1": similarity_info("Protein diffusion folding", "Denoising diffusion for protein folding")})
+
+    results = json.loads(pilot_mcp_server.find_similar_papers(text="protein diffusion folding", k=3))
+    assert {result["paper_id"] for result in results} == {"2401.00003v1", "2401.00004v1"}
+
+def test_paper_vectors_persist_and_update_in_place(tmp_path):
+    papers = {paper_id: similarity_info(title, summary) for paper_id, (title, summary) in SIMILARITY_PAPERS.items()}
+    vectors = PaperVectors(str(tmp_path), dim=256)
+    vectors.add(papers)
+    exact = vectors.similar(paper_id="2401.00003v1", k=1)
+    assert exact[0][0] == "2401.00004v1"
+
+    reopened = PaperVectors(str(tmp_path), dim=256)
+    assert len(reopened) == 4
+    assert reopened.similar(paper_id="2401.00003v1", k=1) == exact
+    # Replacing a paper updates its vector in place
+    reopened.add({"2401.00004v1": similarity_info("Sparse experts", "Mixture of experts routing")})
+    assert len(reopened) == 4
+    assert reopened.similar(text="expert routing", k=3)[0][0] in {"2401.00001v1", "2401.00002v1", "2401.00004v1"}
+    assert "2401.00004v1" not in [paper_id for paper_id, _ in reopened.similar(text="protein diffusion", k=4)]
+
+
+def test_large_corpus_queries_use_the_approximate_index(tmp_path, monkeypatch):
+    vectors = PaperVectors(str(tmp_path), dim=512, ann_threshold=100)
+    words = [f"term{i}" for i in range(400)]
+    vectors.add({f"2401.{i:05d}v1": similarity_info(" ".join(words[i:i + 4]), " ".join(words[i + 4:i + 12]))
+                 for i in range(300)})
+    duplicate = similarity_info("Attention is all you need", "Transformers replace recurrence with attention")
+    vectors.add({"1706.03762v1": duplicate, "1706.03762v7": duplicate})
+
+    # Only LSH candidates are scored: the full scan (and its row norms) is never computed
+    monkeypatch.setattr(PaperVectors, "_row_norms", lambda self, idf_squared: pytest.fail("full scan"))
+    matches = vectors.similar(paper_id="1706.03762v1", k=1)
+    assert matches[0][0] == "1706.03762v7" and matches[0][1] == pytest.approx(1.0)
+
+
+def test_processes_sharing_vectors_do_not_overwrite_each_other(tmp_path):
+    papers = {paper_id: similarity_info(title, summary) for paper_id, (title, summary) in SIMILARITY_PAPERS.items()}
+    first, second = PaperVectors(str(tmp_path), dim=256), PaperVectors(str(tmp_path), dim=256)
+    first.add({"2401.00001v1": papers["2401.00001v1"]})
+    second.add({"2401.00003v1": papers["2401.00003v1"]})
+    first.add({"2401.00002v1": papers["2401.00002v1"]})
+    second.add({"2401.00004v1": papers["2401.00004v1"]})
+
+    # Each instance sees the other's papers
+    assert first.similar(text="protein diffusion", k=1)[0][0] in {"2401.00003v1", "2401.00004v1"}
+    reopened = PaperVectors(str(tmp_path), dim=256)
+    assert len(reopened) == 4
+    for paper_id, info in papers.items():
+        assert reopened.similar(text=paper_text(info), k=1)[0] == (paper_id, pytest.approx(1.0))
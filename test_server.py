@@ -3,6 +3,7 @@
 Test script for the MCP server to verify the search_papers and extract_info tools work correctly.
 """
 
+import asyncio
 import json
 import subprocess
 import sys
@@ -157,7 +158,7 @@ def test_direct_function_call():
         print("\n1. Testing search_papers function directly...")
         
         # Test search_papers
-        result = search_papers("mixture of experts", 2)
+        result = asyncio.run(search_papers("mixture of experts", 2))
         print(f"✅ Direct search completed")
         print(f"   Paper IDs found: {result}")
         
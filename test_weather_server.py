@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the weather MCP server using synthetic Open-Meteo responses.
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+import weather_mcp_server
+import weather_compact
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from gazetteer import Gazetteer
+import weather_summary
+from synthetic_weather import DAYS, HOURS, START, build_weather_response
+from weather_cell_store import WeatherCellStore
+from weather_history import WeatherHistoryStore
+
+
+class FakeOpenMeteoClient:
+    """
+    Records weather_api calls and answers with one synthetic response per
+    location, snapped to a grid of the given size like the real API.
+    """
+
+    def __init__(self, grid=None):
+        self.calls = []
+        self.grid = grid
+        self.failing = False
+        self.seed = 0
+
+    def weather_api(self, url, params, **kwargs):
+        self.calls.append(params)
+        if isinstance(self.failing, Exception):
+            raise self.failing
+        if self.failing:
+            raise ConnectionError("upstream unavailable")
+        latitudes = np.atleast_1d(params["latitude"])
+        longitudes = np.atleast_1d(params["longitude"])
+        if self.grid:
+            latitudes = np.round(latitudes / self.grid) * self.grid
+            longitudes = np.round(longitudes / self.grid) * self.grid
+        return [build_weather_response(latitude=float(lat), longitude=float(lon), seed=self.seed,
+                                       hourly=params.get("hourly", []),
+                                       daily=params.get("daily", []), current=params.get("current", []))
+                for lat, lon in zip(latitudes, longitudes)]
+
+
+class FakeAsyncOpenMeteoClient(FakeOpenMeteoClient):
+    """Async fake that takes `delay` seconds per call and tracks peak concurrency."""
+
+    def __init__(self, grid=None, delay=0.0):
+        super().__init__(grid)
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+
+    async def weather_api(self, url, params, **kwargs):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            return super().weather_api(url, params)
+        finally:
+            self.active -= 1
+
+
+def use_fake_client(monkeypatch, **kwargs):
+    client = FakeAsyncOpenMeteoClient(**kwargs)
+    monkeypatch.setattr(weather_mcp_server, "get_async_openmeteo_client", lambda: client)
+    return client
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture(autouse=True)
+def fresh_weather_cache(monkeypatch, tmp_path):
+    cache = weather_mcp_server.WeatherCellCache(resolution=0.1, ttl=60)
+    monkeypatch.setattr(weather_mcp_server, "weather_cache", cache)
+    monkeypatch.setattr(weather_mcp_server, "prefetch_scheduler", weather_mcp_server.RefreshAheadScheduler(cache))
+    monkeypatch.setattr(weather_mcp_server, "result_cache", weather_mcp_server.WeatherResultCache(max_bytes=10**6, ttl=60))
+    monkeypatch.setattr(weather_mcp_server, "_upstream_semaphore", None)
+    monkeypatch.setattr(weather_mcp_server, "history_store", WeatherHistoryStore(str(tmp_path / "history")))
+    monkeypatch.setattr(weather_mcp_server, "upstream_breaker", CircuitBreaker("Open-Meteo", 2, 60))
+    monkeypatch.setattr(weather_mcp_server, "_revalidating", set())
+    monkeypatch.setattr(weather_mcp_server, "cell_store", None)
+
+
+def test_decode_weather_response():
+    weather = weather_mcp_server.decode_weather_response(build_weather_response())
+
+    assert abs(weather["location"]["latitude"] - 45.42) < 1e-4
+    assert weather["location"]["timezone"] == "America/New_York"
+    assert len(weather["hourly"]["data"]["temperature_2m"]) == HOURS
+    assert len(weather["daily"]["data"]["sunrise"]) == DAYS
+    assert weather["hourly"]["date_range"]["interval_seconds"] == 3600
+    assert isinstance(weather["hourly"]["data"]["rain"], np.ndarray)
+
+
+def test_format_timestamps_matches_isoformat():
+    expected = datetime.fromtimestamp(START + 3661, tz=timezone.utc).isoformat()
+
+    assert str(weather_mcp_server.format_timestamps(START + 3661)) == expected
+    assert weather_mcp_server.format_timestamps([START, START + 3661]).tolist()[1] == expected
+
+
+def test_encode_weather_json_with_and_without_orjson(monkeypatch):
+    weather = weather_mcp_server.decode_weather_response(build_weather_response())
+    fast = json.loads(weather_mcp_server.encode_weather_json(weather))
+    monkeypatch.setattr(weather_mcp_server, "orjson", None)
+    fallback = json.loads(weather_mcp_server.encode_weather_json(weather))
+
+    for decoded in (fast, fallback):
+        assert len(decoded["hourly"]["data"]["temperature_2m"]) == HOURS
+        assert decoded["daily"]["data"]["sunrise"][0] == datetime.fromtimestamp(START + 36000, tz=timezone.utc).isoformat()
+    np.testing.assert_allclose(fast["hourly"]["data"]["rain"], fallback["hourly"]["data"]["rain"], rtol=1e-6)
+
+
+def test_both_json_encoders_write_missing_values_as_null(monkeypatch):
+    def reject(constant):
+        raise ValueError(f"invalid JSON constant {constant}")
+
+    data = {"rain": np.array([0.5, np.nan], dtype=np.float32), "gust": np.float32("nan"), "uv": np.float32(2.5)}
+    fast = weather_mcp_server.encode_weather_json(data)
+    monkeypatch.setattr(weather_mcp_server, "orjson", None)
+    fallback = weather_mcp_server.encode_weather_json(data)
+
+    for encoded in (fast, fallback):
+        assert json.loads(encoded, parse_constant=reject) == {"rain": [0.5, None], "gust": None, "uv": 2.5}
+
+def test_get_weather_batch_single_request(monkeypatch, tmp_path):
+    client = use_fake_client(monkeypatch)
+    # A gazetteer without Atlantis (the bundled one has the town in South Africa)
+    path = tmp_path / "gazetteer.tsv.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as gazetteer_file:
+        gazetteer_file.write("Kelowna\tCA\t02\t49.88\t-119.49\t125109\n")
+    monkeypatch.setattr(weather_mcp_server, "get_gazetteer", lambda: Gazetteer(str(path)))
+
+    results = json.loads(run(weather_mcp_server.get_weather_batch(["Ottawa", "toronto", "Atlantis", "Ottawa"])))
+
+    assert len(client.calls) == 1
+    assert list(results) == ["Ottawa", "toronto", "Atlantis"]
+    assert abs(results["toronto"]["location"]["latitude"] - 43.7) < 1e-4
+    assert "error" in results["Atlantis"]
+
+
+def test_get_weather_data_projection_and_window(monkeypatch):
+    client = use_fake_client(monkeypatch)
+    day = datetime.fromtimestamp(START, tz=timezone.utc).date().isoformat()
+
+    weather = json.loads(run(weather_mcp_server.get_weather_data(
+        "Ottawa", hourly=["rain"], daily=["uv_index_max"], current=[], start=f"{day}T14:00", end=f"{day}T18:00")))
+
+    assert client.calls[0]["hourly"] == ["rain"]
+    assert client.calls[0]["daily"] == ["uv_index_max"]
+    assert "current" not in client.calls[0] and "current" not in weather
+    assert list(weather["hourly"]["data"]) == ["rain"]
+    assert len(weather["hourly"]["data"]["rain"]) == 4
+    # 14:00 local (UTC-4) is 18:00 UTC
+    assert weather["hourly"]["date_range"]["start"] == datetime.fromtimestamp(START + 18 * 3600, tz=timezone.utc).isoformat()
+    assert len(weather["daily"]["data"]["uv_index_max"]) == 1
+
+
+def test_window_covers_whole_days():
+    response = build_weather_response()
+    day = datetime.fromtimestamp(START + 86400, tz=timezone.utc).date().isoformat()
+
+    weather = weather_mcp_server.decode_weather_response(response, start=day, end=day)
+
+    # synthetic days start at UTC midnight, so one local (UTC-4) day overlaps two of them
+    assert len(weather["daily"]["data"]["sunrise"]) == 2
+    assert len(weather["hourly"]["data"]["rain"]) == 24
+
+
+def test_nearby_locations_share_grid_cell(monkeypatch):
+    client = use_fake_client(monkeypatch, grid=0.25)
+
+    run(weather_mcp_server.get_weather_data("43.45, -80.49"))
+    run(weather_mcp_server.get_weather_data("43.47, -80.51"))  # snaps to the same 43.5, -80.5 grid point
+    run(weather_mcp_server.get_weather_data("43.45, -80.49", hourly=["rain"]))  # different variable set
+
+    assert len(client.calls) == 2
+
+
+def test_batch_only_fetches_uncached_cells(monkeypatch):
+    client = use_fake_client(monkeypatch)
+
+    run(weather_mcp_server.get_weather_data("Ottawa"))
+    results = json.loads(run(weather_mcp_server.get_weather_batch(["Ottawa", "Toronto"])))
+
+    assert len(client.calls) == 2
+    assert client.calls[1]["latitude"] == [43.7]
+    assert set(results) == {"Ottawa", "Toronto"}
+
+
+def test_cell_cache_expires():
+    cache = weather_mcp_server.WeatherCellCache(resolution=0.1, ttl=0)
+    cache.put(45.42, -75.7, ("v",), build_weather_response())
+
+    assert cache.get(45.42, -75.7, ("v",)) is None
+
+
+def test_cell_cache_is_shared_with_new_processes(monkeypatch, tmp_path):
+    client = use_fake_client(monkeypatch)
+    store = WeatherCellStore(str(tmp_path / "cells.sqlite"), max_age=120)
+    monkeypatch.setattr(weather_mcp_server, "cell_store", store)
+
+    first = json.loads(run(weather_mcp_server.get_weather_data("Ottawa")))
+    weather_mcp_server.background_writer.flush()
+    # A new server process starts with empty memory caches
+    weather_mcp_server.weather_cache.clear()
+    weather_mcp_server.result_cache.clear()
+
+    second = json.loads(run(weather_mcp_server.get_weather_data("Ottawa")))
+    assert second["hourly"] == first["hourly"] and "stale" not in second
+    assert len(client.calls) == 1
+    store.close()
+
+
+def test_async_upstream_calls_time_out(monkeypatch):
+    client = use_fake_client(monkeypatch, delay=1.0)
+    monkeypatch.setattr(weather_mcp_server, "WEATHER_CALL_TIMEOUT", 0.05)
+
+    started = time.perf_counter()
+    for _ in range(2):
+        with pytest.raises(asyncio.TimeoutError):
+            run(weather_mcp_server.get_weather_data("Ottawa"))
+    assert time.perf_counter() - started < 0.5
+    # Timeouts count against the upstream like any other transport failure
+    with pytest.raises(CircuitOpenError):
+        run(weather_mcp_server.get_weather_data("Ottawa"))
+
+
+def test_sync_fetch_uses_pooled_client(monkeypatch):
+    client = FakeOpenMeteoClient()
+    monkeypatch.setattr(weather_mcp_server, "get_openmeteo_client", lambda: client)
+    points = [weather_mcp_server.locattion_to_coordinates["ottawa"]]
+    variables = (weather_mcp_server.HOURLY_VARIABLES, weather_mcp_server.DAILY_VARIABLES, weather_mcp_server.CURRENT_VARIABLES)
+
+    weather_mcp_server.fetch_weather_responses(points, *variables)
+    weather_mcp_server.fetch_weather_responses(points, *variables)
+
+    assert len(client.calls) == 1
+
+
+def test_async_tools_overlap_within_concurrency_limit(monkeypatch):
+    client = use_fake_client(monkeypatch, delay=0.1)
+    monkeypatch.setattr(weather_mcp_server, "WEATHER_MAX_CONCURRENT_REQUESTS", 3)
+    cities = ["ottawa", "toronto", "vancouver", "montreal", "calgary", "halifax"]
+
+    async def ask_all():
+        return await asyncio.gather(*(weather_mcp_server.get_weather_data(city) for city in cities))
+
+    started = time.perf_counter()
+    results = run(ask_all())
+    elapsed = time.perf_counter() - started
+
+    assert len(results) == len(cities) and len(client.calls) == len(cities)
+    assert client.peak == 3
+    assert elapsed < 0.1 * len(cities) * 0.75
+
+
+def test_refresh_ahead_follows_access_frequency(monkeypatch):
+    cache = weather_mcp_server.WeatherCellCache(resolution=0.1, ttl=100)
+    scheduler = weather_mcp_server.RefreshAheadScheduler(cache, top_k=5, min_hits=2, margin=200,
+                                                         requests_per_minute=60000, batch_size=10)
+    monkeypatch.setattr(weather_mcp_server, "weather_cache", cache)
+    monkeypatch.setattr(weather_mcp_server, "prefetch_scheduler", scheduler)
+    client = use_fake_client(monkeypatch)
+    sync_client = FakeOpenMeteoClient()
+    monkeypatch.setattr(weather_mcp_server, "get_openmeteo_client", lambda: sync_client)
+
+    for city in ["ottawa", "ottawa", "toronto", "toronto", "toronto", "iqaluit"]:
+        run(weather_mcp_server.get_weather_data(city))
+
+    # Entries expire within the margin, so both popular cells are due; iqaluit was asked once
+    assert scheduler.refresh_once() == 1
+    assert sorted(sync_client.calls[0]["latitude"]) == [43.7, 45.42]
+    assert len(client.calls) == 3
+
+    # Scores fade with a half-life of one TTL, so without new requests nothing stays popular for long
+    scheduler.decay(300)
+    assert scheduler.refresh_once() == 0
+
+
+def test_refresh_ahead_keeps_cells_requested_a_few_times_per_ttl():
+    # Default TTL and margin: a cell only becomes due shortly before its hour is up
+    scheduler = weather_mcp_server.RefreshAheadScheduler(weather_mcp_server.WeatherCellCache())
+    hourly = weather_mcp_server.locattion_to_coordinates["ottawa"]
+    rarely = weather_mcp_server.locattion_to_coordinates["toronto"]
+    variables = ((), (), ("temperature_2m",))
+
+    # Ottawa is asked for every 30 minutes, Toronto every 3 hours, over a day of refresh cycles
+    for minute in range(0, 24 * 60, 10):
+        if minute % 30 == 0:
+            scheduler.record(hourly, variables)
+        if minute % 180 == 0:
+            scheduler.record(rarely, variables)
+        scheduler.decay(600)
+
+    due = [point for point, _ in scheduler.due()]
+    assert hourly in due and rarely not in due
+
+
+def test_result_cache_serves_repeats_until_response_changes(monkeypatch):
+    client = use_fake_client(monkeypatch)
+
+    first = run(weather_mcp_server.get_weather_data("Ottawa"))
+    second = run(weather_mcp_server.get_weather_data("ottawa"))
+    assert second is first
+    assert weather_mcp_server.result_cache.stats()["hits"] == 1
+
+    # A refetched response with the same data still matches the finished result
+    weather_mcp_server.weather_cache.clear()
+    assert run(weather_mcp_server.get_weather_data("Ottawa")) is first
+    assert len(client.calls) == 2
+
+    # New data upstream replaces the cell entry, so the result is rebuilt
+    weather_mcp_server.weather_cache.clear()
+    client.seed = 1
+    third = run(weather_mcp_server.get_weather_data("Ottawa"))
+    assert third != first and len(client.calls) == 3
+    assert weather_mcp_server.result_cache.stats()["misses"] == 2
+
+
+def test_result_cache_evicts_by_size():
+    cache = weather_mcp_server.WeatherResultCache(max_bytes=25, ttl=60)
+    source = weather_mcp_server.response_token(build_weather_response())
+    for key in "abc":
+        cache.put(key, source, key * 10)
+
+    assert cache.get("a", source) is None
+    assert cache.get("c", source) == "c" * 10
+    assert cache.get("c", weather_mcp_server.response_token(build_weather_response(seed=1))) is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (1, 10, 1)
+
+    # The budget counts UTF-8 bytes, not characters
+    cache.put("d", source, "é" * 10)
+    assert cache.stats()["bytes"] == 20 and cache.get("b", source) is None
+
+
+def test_fetched_hours_are_answered_from_history(monkeypatch):
+    use_fake_client(monkeypatch)
+    live = json.loads(run(weather_mcp_server.get_weather_data("Ottawa", hourly=["temperature_2m", "rain"], daily=[], current=[])))
+    weather_mcp_server.background_writer.flush()
+
+    history = json.loads(run(weather_mcp_server.get_weather_history(
+        "Ottawa", "2025-06-16T00:00:00+00:00", "2025-06-17T00:00:00+00:00", hourly=["temperature_2m"])))
+
+    assert history["hourly"]["date_range"] == {
+        "start": "2025-06-16T00:00:00+00:00", "end": "2025-06-17T00:00:00+00:00", "interval_seconds": 3600
+    }
+    np.testing.assert_allclose(history["hourly"]["data"]["temperature_2m"], live["hourly"]["data"]["temperature_2m"][24:48], rtol=1e-6)
+    assert run(weather_mcp_server.get_weather_history("Toronto", "2025-06-16", "2025-06-16")).startswith("No weather history")
+
+
+def test_history_store_overwrites_and_trims(tmp_path):
+    store = WeatherHistoryStore(str(tmp_path))
+    hours = START + 3600 * np.arange(30, dtype=np.int64)
+    store.append(45.42, -75.7, hours, {"rain": np.zeros(30)})
+    store.append(45.43, -75.71, hours[10:12], {"rain": np.ones(2)}, {"utc_offset_seconds": -14400})
+
+    first, data = store.query(45.4, -75.7, START - 86400, START + 86400 * 3, ["rain", "snowfall"])
+    assert first == START
+    assert len(data["rain"]) == 30 and data["rain"][10:12].tolist() == [1.0, 1.0]
+    assert np.isnan(data["snowfall"]).all()
+    assert store.variables(45.4, -75.7) == ["rain"]
+    assert store.metadata(45.4, -75.7)["utc_offset_seconds"] == -14400
+    assert store.query(45.4, -75.7, START + 86400 * 5, START + 86400 * 6, ["rain"]) == (None, {})
+
+
+def test_history_reads_only_stored_days_and_runs_off_the_event_loop(monkeypatch, tmp_path):
+    use_fake_client(monkeypatch)
+    run(weather_mcp_server.get_weather_data("Ottawa", hourly=["rain"], daily=[], current=[]))
+    weather_mcp_server.background_writer.flush()
+    store = weather_mcp_server.history_store
+    threads = []
+    query = store.query
+    monkeypatch.setattr(store, "query", lambda *args: threads.append(threading.current_thread()) or query(*args))
+
+    started = time.perf_counter()
+    history = json.loads(run(weather_mcp_server.get_weather_history("Ottawa", "0001-01-01", "9999-12-31")))
+    assert time.perf_counter() - started < 1
+    assert len(history["hourly"]["data"]["rain"]) == HOURS
+    assert threads and threads[0] is not threading.main_thread()
+
+def test_history_is_written_off_the_request_path(tmp_path):
+    release = threading.Event()
+
+    class SlowStore(WeatherHistoryStore):
+        def append(self, *args, **kwargs):
+            release.wait(5)
+            return super().append(*args, **kwargs)
+
+    store = SlowStore(str(tmp_path))
+    hours = START + 3600 * np.arange(4, dtype=np.int64)
+    writer = weather_mcp_server.BackgroundWriter()
+    writer.submit(store.append, 45.42, -75.7, hours, {"rain": np.ones(4)})
+    assert store.variables(45.42, -75.7) == []
+
+    release.set()
+    writer.flush()
+    assert store.query(45.42, -75.7, START, START + 4 * 3600, ["rain"])[1]["rain"].tolist() == [1.0] * 4
+
+
+def test_history_column_created_by_another_process_is_kept(tmp_path, monkeypatch):
+    hours = START + 3600 * np.arange(2, dtype=np.int64)
+    ours, theirs = WeatherHistoryStore(str(tmp_path)), WeatherHistoryStore(str(tmp_path))
+    exists = os.path.exists
+    raced = []
+
+    def stale_exists(path):
+        # The other process writes its column right after our first existence check
+        if path.endswith("rain.npy") and not raced:
+            raced.append(path)
+            theirs.append(45.42, -75.7, hours, {"rain": np.full(2, 7.0)})
+            return False
+        return exists(path)
+
+    monkeypatch.setattr(os.path, "exists", stale_exists)
+    ours.append(45.42, -75.7, hours[1:], {"rain": np.ones(1)})
+    monkeypatch.setattr(os.path, "exists", exists)
+
+    assert ours.query(45.42, -75.7, START, START + 2 * 3600, ["rain"])[1]["rain"].tolist() == [7.0, 1.0]
+
+
+def test_summarize_weather_matches_brute_force(monkeypatch):
+    use_fake_client(monkeypatch)
+    metrics = ["min", "max", "mean", "total", "rolling_total_24h:rain", "first_above_25:temperature_2m"]
+    summary = json.loads(run(weather_mcp_server.summarize_weather("Ottawa", metrics=metrics)))
+    live = json.loads(run(weather_mcp_server.get_weather_data("Ottawa")))
+    temperature = np.array(live["hourly"]["data"]["temperature_2m"])
+    rain = np.array(live["hourly"]["data"]["rain"])
+
+    # Local days (UTC-4) start at 04:00 UTC, so the first bucket holds the 4 hours before local midnight
+    assert summary["buckets"]["hours"] == [4] + [24] * 6 + [20]
+    assert summary["buckets"]["start"][1] == "2025-06-15T04:00:00+00:00"
+    day = slice(4, 28)
+    assert summary["stats"]["temperature_2m"]["max"][1] == round(float(temperature[day].max()), 2)
+    assert summary["stats"]["temperature_2m"]["mean"][1] == pytest.approx(temperature[day].mean(), abs=0.01)
+    assert summary["stats"]["rain"]["total"][1] == pytest.approx(rain[day].sum(), abs=0.01)
+    assert "total" not in summary["stats"]["temperature_2m"]
+
+    windows = np.convolve(rain, np.ones(24), mode="valid")
+    assert summary["events"]["rolling_total_24h:rain"]["value"] == pytest.approx(windows.max(), abs=0.01)
+    first = int(np.argmax(temperature > 25))
+    assert summary["events"]["first_above_25:temperature_2m"]["value"] == round(float(temperature[first]), 2)
+
+
+def test_default_summary_shares_the_default_forecast_cache_entry(monkeypatch):
+    client = use_fake_client(monkeypatch)
+
+    run(weather_mcp_server.summarize_weather("Ottawa"))
+    run(weather_mcp_server.get_weather_data("Ottawa"))
+    assert len(client.calls) == 1
+
+def test_summary_reductions_skip_missing_values():
+    values = np.array([1.0, np.nan, 3.0, np.nan, np.nan, 10.0])
+    starts = np.array([0, 2, 4])
+
+    assert weather_summary.reduce_buckets(values, starts, "min").tolist() == [1.0, 3.0, 10.0]
+    assert weather_summary.reduce_buckets(values, starts, "mean").tolist() == [1.0, 3.0, 10.0]
+    np.testing.assert_array_equal(weather_summary.rolling(values, 2, "total"), [1.0, 3.0, 3.0, np.nan, 10.0])
+    assert weather_summary.first_crossing(values, 2.0) == 2
+    assert weather_summary.first_crossing(values, 0.0, above=False) is None
+    with pytest.raises(ValueError):
+        weather_summary.parse_metric("first_above_3")
+    assert weather_summary.parse_granularity("6h") == 21600
+
+
+def _expand_series(series):
+    """Decode a compact series back into a list of values."""
+    if isinstance(series, dict) and "rle" in series:
+        return [value for value, count in series["rle"] for _ in range(count)]
+    if isinstance(series, dict) and "delta" in series:
+        return (np.cumsum(series["delta"]["d"]) * series["delta"]["step"]).tolist()
+    return series
+
+
+def test_compact_encodings_round_trip():
+    rain = np.array([0, 0, 0, 0, 1.25, 1.25, 0, 0, 0, 0], dtype=np.float32)
+    assert weather_compact.encode_series(rain, 2, weather_mcp_server.encode_weather_json) == {
+        "rle": [[0.0, 4], [1.25, 2], [0.0, 4]]
+    }
+    smooth = 20 + 0.1 * np.arange(48)
+    encoded = weather_compact.encode_series(smooth, 1, weather_mcp_server.encode_weather_json)
+    assert "delta" in encoded
+    np.testing.assert_allclose(_expand_series(encoded), np.round(smooth, 1), atol=1e-9)
+
+
+def test_get_weather_data_fits_size_budget(monkeypatch):
+    use_fake_client(monkeypatch)
+    full = run(weather_mcp_server.get_weather_data("Ottawa"))
+
+    for budget in (len(full) // 2, len(full) // 5):
+        payload = run(weather_mcp_server.get_weather_data("Ottawa", max_chars=budget))
+        compact = json.loads(payload)
+        assert len(payload) <= budget and compact["compact"]["fits"]
+        step = compact["compact"]["hourly_step_hours"]
+        temperature = _expand_series(compact["hourly"]["data"]["temperature_2m"])
+        assert len(temperature) == HOURS // step
+        assert compact["hourly"]["date_range"]["interval_seconds"] == 3600 * step
+    assert compact["daily"]["data"]["sunrise"][0] == "06:00"
+
+
+def test_stale_entries_are_served_while_refreshing(monkeypatch):
+    client = use_fake_client(monkeypatch, delay=0.05)
+    cache = weather_mcp_server.WeatherCellCache(resolution=0.1, ttl=0.1, stale_ttl=60)
+    monkeypatch.setattr(weather_mcp_server, "weather_cache", cache)
+
+    async def scenario():
+        await weather_mcp_server.get_weather_data("Ottawa")
+        await asyncio.sleep(0.15)
+        started = time.perf_counter()
+        stale = json.loads(await weather_mcp_server.get_weather_data("Ottawa"))
+        # Answered from the expired entry without waiting for the upstream
+        assert time.perf_counter() - started < 0.05
+        await weather_mcp_server.get_weather_data("Ottawa")
+        await asyncio.sleep(0.1)
+        fresh = json.loads(await weather_mcp_server.get_weather_data("Ottawa"))
+        return stale, fresh
+
+    stale, fresh = run(scenario())
+    assert stale["stale"] is True and stale["age_seconds"] >= 0
+    assert "stale" not in fresh
+    # One foreground fetch and a single background refresh
+    assert len(client.calls) == 2
+
+
+def test_batch_and_summary_flag_stale_data(monkeypatch):
+    client = use_fake_client(monkeypatch)
+    cache = weather_mcp_server.WeatherCellCache(resolution=0.1, ttl=0.05, stale_ttl=60)
+    monkeypatch.setattr(weather_mcp_server, "weather_cache", cache)
+    run(weather_mcp_server.get_weather_batch(["Ottawa", "Toronto"]))
+    run(weather_mcp_server.summarize_weather("Ottawa"))
+    time.sleep(0.06)
+    client.failing = True
+
+    batch = json.loads(run(weather_mcp_server.get_weather_batch(["Ottawa", "Toronto"])))
+    summary = json.loads(run(weather_mcp_server.summarize_weather("Ottawa")))
+    assert all(batch[location]["stale"] is True for location in ("Ottawa", "Toronto"))
+    assert summary["stale"] is True and summary["age_seconds"] >= 0
+
+
+def test_circuit_breaker_stops_calling_failing_upstream(monkeypatch):
+    client = use_fake_client(monkeypatch)
+    client.failing = True
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            run(weather_mcp_server.get_weather_data("Ottawa"))
+    with pytest.raises(CircuitOpenError):
+        run(weather_mcp_server.get_weather_data("Ottawa"))
+    assert len(client.calls) == 2
+
+
+def test_rejected_requests_do_not_open_the_circuit(monkeypatch):
+    client = use_fake_client(monkeypatch)
+
+    # Unknown names never reach the upstream
+    with pytest.raises(ValueError, match="hourly:foo"):
+        run(weather_mcp_server.get_weather_data("Ottawa", hourly=["foo"]))
+    assert client.calls == []
+    run(weather_mcp_server.get_weather_data("Ottawa", hourly=["temperature_850hPa"], daily=[], current=[]))
+
+    # Open-Meteo raises its 400/429 answers with the JSON body, wrapped in a "failed to request" error
+    def upstream_error(reason):
+        error = RuntimeError("failed to request")
+        error.__cause__ = RuntimeError({"error": True, "reason": reason})
+        return error
+
+    client.failing = upstream_error("Cannot initialize WeatherVariable from invalid String value")
+    for _ in range(5):
+        with pytest.raises(RuntimeError):
+            run(weather_mcp_server.get_weather_data("Toronto"))
+    assert weather_mcp_server.upstream_breaker.state == "closed"
+
+    client.failing = upstream_error("Minutely API request limit exceeded. Please try again in one minute.")
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            run(weather_mcp_server.get_weather_data("Toronto"))
+    assert weather_mcp_server.upstream_breaker.state == "open"
+
+def test_sync_fetch_falls_back_to_stale_data(monkeypatch):
+    client = FakeOpenMeteoClient()
+    monkeypatch.setattr(weather_mcp_server, "get_openmeteo_client", lambda: client)
+    monkeypatch.setattr(weather_mcp_server, "weather_cache", weather_mcp_server.WeatherCellCache(ttl=0.05, stale_ttl=60))
+    point = weather_mcp_server.locattion_to_coordinates["ottawa"]
+    fetched = weather_mcp_server.fetch_weather_responses([point], ["rain"], [], [])
+
+    time.sleep(0.06)
+    client.failing = True
+    assert weather_mcp_server.fetch_weather_responses([point], ["rain"], [], []) == fetched
+    with pytest.raises(ConnectionError):
+        weather_mcp_server.fetch_weather_responses([point], ["rain"], [], [], refresh=True)
+
+
+def test_circuit_breaker_half_open_trial():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert not breaker.allow() and breaker.retry_after() > 0
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial call at a time
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_gazetteer_lookups_run_off_the_event_loop(monkeypatch):
+    use_fake_client(monkeypatch)
+    lookup_threads = []
+
+    class SlowGazetteer:
+        def lookup(self, name):
+            lookup_threads.append(threading.current_thread())
+            time.sleep(0.1)
+            return {"name": "Kanata", "country_code": "CA", "latitude": 45.3, "longitude": -75.9}
+
+    monkeypatch.setattr(weather_mcp_server, "get_gazetteer", lambda: SlowGazetteer())
+
+    async def scenario():
+        slow = asyncio.ensure_future(weather_mcp_server.get_weather_data("Kanata"))
+        await asyncio.sleep(0.01)
+        # A predefined location is answered while the gazetteer lookup is still running
+        await weather_mcp_server.get_weather_data("Ottawa")
+        assert not slow.done()
+        return json.loads(await slow)
+
+    assert run(scenario())["location"]["name"] == "Kanata, CA"
+    assert lookup_threads and lookup_threads[0] is not threading.main_thread()
+
+
+def test_cancelled_trial_call_does_not_lock_the_circuit(monkeypatch):
+    client = use_fake_client(monkeypatch, delay=1.0)
+    breaker = CircuitBreaker("Open-Meteo", failure_threshold=1, reset_timeout=0.0)
+    monkeypatch.setattr(weather_mcp_server, "upstream_breaker", breaker)
+    breaker.record_failure()
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(weather_mcp_server.get_weather_data("Ottawa"))
+        await asyncio.sleep(0.02)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(cancel_trial())
+    assert breaker.state == "half_open" and breaker.allow()
+
+    # A trial that never reports back is given up on after the trial timeout
+    lost = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.0, trial_timeout=0.05)
+    lost.record_failure()
+    assert lost.allow() and not lost.allow()
+    time.sleep(0.06)
+    assert lost.allow()
+
+
+def test_weather_benchmark_runs_on_synthetic_payloads():
+    import benchmark_weather
+
+    results = benchmark_weather.benchmark_case(24, 6, repeat=1, min_time=0.001)
+    assert {entry["step"] for entry in results} >= {"parse", "decode", "encode", "total"}
+    assert all(entry["median_us"] > 0 and entry["peak_alloc_bytes"] >= 0 for entry in results)
+    slower = [dict(entry, median_us=entry["median_us"] * 2) for entry in results]
+    assert len(benchmark_weather.compare(slower, results, tolerance=0.5)) == len(results)
@@ -0,0 +1,69 @@
+"""
+Persistent copy of the grid-cell weather cache.
+
+The weather server keeps fetched Open-Meteo responses in memory
+(WeatherCellCache). This SQLite table keeps their raw messages as well, so
+a freshly started server process (one per chatbot over stdio) answers from
+what earlier processes fetched instead of going upstream again. Entries are
+keyed by request cell and variable set, and dropped once they are too old
+to be served even as stale data.
+"""
+
+import sqlite3
+import threading
+import time
+
+
+class WeatherCellStore:
+    """SQLite table of raw Open-Meteo messages by cell key, shared between server processes."""
+
+    def __init__(self, path: str, max_age: float):
+        """
+        Args:
+            path: Database file, created on first use
+            max_age: Seconds after which an entry is no longer returned, and deleted
+        """
+        self.path = path
+        self.max_age = max_age
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use, so importing the server creates no file; the caller holds the lock
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS cells "
+                               "(key TEXT PRIMARY KEY, fetched_at REAL NOT NULL, message BLOB NOT NULL)")
+            self._connection = connection
+        return self._connection
+
+    def get(self, key: str):
+        """
+        Return a stored message.
+
+        Returns:
+            (age in seconds, message bytes), or None if there is no entry younger than max_age
+        """
+        with self._lock:
+            row = self._connect().execute("SELECT fetched_at, message FROM cells WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        age = max(time.time() - row[0], 0.0)
+        return (age, row[1]) if age < self.max_age else None
+
+    def put(self, key: str, message: bytes) -> None:
+        """Store a message fetched now, and delete entries past max_age."""
+        now = time.time()
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO cells (key, fetched_at, message) VALUES (?, ?, ?)",
+                                   (key, now, message))
+                connection.execute("DELETE FROM cells WHERE fetched_at < ?", (now - self.max_age,))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,123 @@
+"""
+Size-budgeted compact encoding of decoded weather data.
+
+compact_weather() shrinks the structure built by decode_weather_response
+until its JSON fits a character budget, trying in order of information lost:
+
+1. Round values (2, then 1, then 0 decimals).
+2. Encode each series in its shortest form: a plain list, run-length pairs
+   {"rle": [[value, count], ...]} or deltas {"delta": {"step", "d"}} where
+   value[i] = step * (d[0] + ... + d[i]).
+3. Downsample the hourly block into 2, 3, 6, 12 or 24 hour steps (totals for
+   accumulated variables, means for everything else).
+
+Daily timestamps (sunrise, sunset) become local "HH:MM" strings, since the
+day is already given by the daily date range.
+"""
+
+from lazy_imports import lazy_import
+from weather_summary import ACCUMULATED_VARIABLES, reduce_buckets
+
+np = lazy_import("numpy")
+
+DIGITS = (2, 1, 0)
+HOURLY_STEPS = (1, 2, 3, 6, 12, 24)
+
+COMPACT_FORMAT = ("series are lists, {rle:[[value,count],...]} or {delta:{step,d}} "
+                  "with value[i] = step*(d[0]+...+d[i]); null = missing")
+
+
+def round_series(values, digits: int) -> list:
+    """Round a series, writing whole numbers without a fractional part when digits is 0."""
+    values = np.round(np.asarray(values, dtype=np.float64), digits)
+    if np.isnan(values).any():
+        return [None if np.isnan(value) else value for value in values.tolist()]
+    return values.astype(np.int64).tolist() if digits == 0 else values.tolist()
+
+
+def run_length(values) -> list:
+    """Encode a series as [value, count] pairs."""
+    values = np.asarray(values)
+    if not len(values):
+        return []
+    starts = np.concatenate(([0], np.flatnonzero(values[1:] != values[:-1]) + 1))
+    counts = np.diff(np.concatenate((starts, [len(values)])))
+    return [[value, count] for value, count in zip(values[starts].tolist(), counts.tolist())]
+
+
+def delta(values, digits: int) -> dict:
+    """Encode a rounded series as integer steps of 10**-digits."""
+    quantized = np.rint(np.asarray(values, dtype=np.float64) * 10 ** digits).astype(np.int64)
+    return {"step": 10 ** -digits if digits else 1, "d": np.diff(np.concatenate(([0], quantized))).tolist()}
+
+
+def encode_series(values, digits: int, encode) -> object:
+    """Return the shortest of the plain, run-length and delta encodings of a numeric series."""
+    plain = round_series(values, digits)
+    if not plain or None in plain:
+        return plain
+    candidates = [plain, {"rle": run_length(np.asarray(plain))}, {"delta": delta(plain, digits)}]
+    return min(candidates, key=lambda candidate: len(encode(candidate)))
+
+
+def downsample(values, step: int, variable: str):
+    """Aggregate consecutive groups of step values (total for accumulated variables, mean otherwise)."""
+    starts = np.arange(0, len(values), step)
+    return reduce_buckets(values, starts, "total" if variable in ACCUMULATED_VARIABLES else "mean")
+
+
+def _local_clock(timestamps, utc_offset_seconds: int) -> list:
+    """Format ISO 8601 UTC strings as local "HH:MM"."""
+    instants = np.asarray(timestamps, dtype="datetime64[s]") + np.timedelta64(utc_offset_seconds, "s")
+    return [text[11:16] for text in np.datetime_as_string(instants, unit="m").tolist()]
+
+
+def _compact_block(block: dict, digits: int, encode, step: int = 1, utc_offset_seconds: int = 0) -> dict:
+    data = {}
+    for name, values in block["data"].items():
+        values = np.asarray(values)
+        if values.dtype.kind in "US":
+            data[name] = _local_clock(np.char.replace(values.astype(str), "+00:00", ""), utc_offset_seconds)
+            continue
+        if step > 1:
+            values = downsample(values, step, name)
+        data[name] = encode_series(values, digits, encode)
+    date_range = dict(block["date_range"], interval_seconds=block["date_range"]["interval_seconds"] * step)
+    return {"date_range": date_range, "data": data}
+
+
+def compact_weather(weather: dict, max_chars: int, encode) -> dict:
+    """
+    Shrink decoded weather data until its JSON fits a size budget.
+
+    Args:
+        weather: Dictionary built by decode_weather_response
+        max_chars: Target size of the encoded JSON in characters
+        encode: Function encoding a value as a JSON string
+
+    Returns:
+        Compact copy of the weather data with a "compact" entry describing
+        what was applied; when even the smallest form exceeds the budget it
+        is returned with "fits" set to false
+    """
+    utc_offset_seconds = weather.get("location", {}).get("utc_offset_seconds", 0)
+    hourly_steps = HOURLY_STEPS if "hourly" in weather else (1,)
+    result = None
+    for step in hourly_steps:
+        for digits in DIGITS:
+            result = dict(weather)
+            if "location" in weather:
+                result["location"] = {name: round(value, 4) if isinstance(value, float) else value
+                                      for name, value in weather["location"].items()}
+            if "current" in weather:
+                result["current"] = {name: round(value, digits) if isinstance(value, float) else value
+                                     for name, value in weather["current"].items()}
+            if "hourly" in weather:
+                result["hourly"] = _compact_block(weather["hourly"], digits, encode, step)
+            if "daily" in weather:
+                result["daily"] = _compact_block(weather["daily"], digits, encode, 1, utc_offset_seconds)
+            result["compact"] = {"format": COMPACT_FORMAT, "digits": digits, "hourly_step_hours": step, "fits": True}
+            if len(encode(result)) <= max_chars:
+                return result
+    result["compact"]["fits"] = False
+    return result
@@ -0,0 +1,213 @@
+"""
+Local, append-only history of hourly weather values.
+
+Every hourly block fetched from Open-Meteo is written to a columnar store on
+disk so questions about past days can be answered without new upstream
+calls. The layout is one directory per location (grid cell) and UTC day,
+with one fixed-size .npy column per variable:
+
+    <root>/<latitude>_<longitude>/meta.json
+    <root>/<latitude>_<longitude>/<YYYY-MM-DD>/<variable>.npy   (24 float32 slots, NaN = no data)
+
+Columns are memory-mapped for both writes and reads. Later fetches overwrite
+earlier values for the same hour, so each slot holds the most recent value
+seen for that hour (the latest forecast, which for past hours is close to
+the observation). Missing columns are created under a per-location file
+lock, so processes sharing the directory never replace each other's columns.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+from file_lock import file_lock
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+SECONDS_PER_DAY = 86400
+SECONDS_PER_HOUR = 3600
+SLOTS_PER_DAY = SECONDS_PER_DAY // SECONDS_PER_HOUR
+
+
+def _day_name(day: int) -> str:
+    return datetime.fromtimestamp(day * SECONDS_PER_DAY, timezone.utc).strftime("%Y-%m-%d")
+
+
+class WeatherHistoryStore:
+    """Day-partitioned, memory-mapped column store of hourly weather values per grid cell."""
+
+    def __init__(self, root: str, resolution: float = 0.1):
+        self.root = root
+        self.resolution = resolution
+        self._lock = threading.Lock()
+        self._meta = {}  # location key -> metadata last written to meta.json
+
+    def location_key(self, latitude: float, longitude: float) -> str:
+        """Name of the partition holding a coordinate, e.g. "45.40_-75.70"."""
+        return (f"{round(latitude / self.resolution) * self.resolution:.2f}_"
+                f"{round(longitude / self.resolution) * self.resolution:.2f}")
+
+    def _column_path(self, key: str, day: int, variable: str) -> str:
+        return os.path.join(self.root, key, _day_name(day), f"{variable}.npy")
+
+    def _open_column(self, key: str, day: int, variable: str):
+        """Open a day column for writing, creating it (all NaN) if needed."""
+        path = self._column_path(key, day, variable)
+        if not os.path.exists(path):
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            with file_lock(os.path.join(self.root, key, ".lock")):
+                # Another process may have created it (and written to it) since the check above
+                if not os.path.exists(path):
+                    # Create under a temporary name and rename, so other processes never see a partial file
+                    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+                    with os.fdopen(descriptor, "wb") as column:
+                        np.save(column, np.full(SLOTS_PER_DAY, np.nan, dtype=np.float32))
+                    os.replace(temporary, path)
+        return np.load(path, mmap_mode="r+")
+
+    def append(self, latitude: float, longitude: float, times, columns: dict, metadata: dict = None) -> int:
+        """
+        Write hourly values for a location.
+
+        Args:
+            latitude: Latitude of the location
+            longitude: Longitude of the location
+            times: Unix timestamps (seconds) of the hourly values
+            columns: Mapping of variable name to values aligned with times
+            metadata: Optional extra location details (timezone, utc offset) to keep with the partition
+
+        Returns:
+            Number of hourly rows written
+        """
+        times = np.asarray(times, dtype=np.int64)
+        # Only whole hours fit the slot layout
+        keep = times % SECONDS_PER_HOUR == 0
+        times = times[keep]
+        if not len(times):
+            return 0
+        columns = {variable: np.asarray(values, dtype=np.float32)[keep] for variable, values in columns.items()}
+        days = times // SECONDS_PER_DAY
+        slots = (times - days * SECONDS_PER_DAY) // SECONDS_PER_HOUR
+        key = self.location_key(latitude, longitude)
+
+        with self._lock:
+            self._write_metadata(key, latitude, longitude, metadata or {})
+            for day in np.unique(days).tolist():
+                in_day = days == day
+                for variable, values in columns.items():
+                    column = self._open_column(key, day, variable)
+                    column[slots[in_day]] = values[in_day]
+                    column.flush()
+                    del column
+        return len(times)
+
+    def _write_metadata(self, key: str, latitude: float, longitude: float, metadata: dict) -> None:
+        meta = dict(metadata, latitude=latitude, longitude=longitude)
+        if self._meta.get(key) == meta:
+            return
+        directory = os.path.join(self.root, key)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, "w") as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(temporary, os.path.join(directory, "meta.json"))
+        self._meta[key] = meta
+
+    def metadata(self, latitude: float, longitude: float):
+        """Return the stored details for a location, or None if it has no history."""
+        key = self.location_key(latitude, longitude)
+        try:
+            with open(os.path.join(self.root, key, "meta.json"), "r") as meta_file:
+                return json.load(meta_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def variables(self, latitude: float, longitude: float) -> list:
+        """Return the variables stored for a location, in first-seen order of the days on disk."""
+        directory = os.path.join(self.root, self.location_key(latitude, longitude))
+        if not os.path.isdir(directory):
+            return []
+        names = {}
+        for day in sorted(os.listdir(directory)):
+            day_path = os.path.join(directory, day)
+            if os.path.isdir(day_path):
+                for file_name in sorted(os.listdir(day_path)):
+                    if file_name.endswith(".npy"):
+                        names.setdefault(file_name[:-4], None)
+        return list(names)
+
+    def _stored_days(self, key: str, first_day: int, last_day: int) -> list:
+        """Return the days in [first_day, last_day] that have a directory for a location, in order."""
+        try:
+            names = os.listdir(os.path.join(self.root, key))
+        except FileNotFoundError:
+            return []
+        days = []
+        for name in names:
+            try:
+                moment = datetime.strptime(name, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            except ValueError:
+                continue
+            day = int(moment.timestamp()) // SECONDS_PER_DAY
+            if first_day <= day <= last_day:
+                days.append(day)
+        return sorted(days)
+
+    def query(self, latitude: float, longitude: float, start: int, end: int, variables: list) -> tuple:
+        """
+        Read hourly values in the window [start, end).
+
+        The result is trimmed to the first and last hour holding any data;
+        hours in between without data are NaN. Only days stored on disk are
+        read, so the cost does not depend on the width of the window.
+
+        Args:
+            latitude: Latitude of the location
+            longitude: Longitude of the location
+            start: Window start as a unix timestamp (inclusive)
+            end: Window end as a unix timestamp (exclusive)
+            variables: Variables to read
+
+        Returns:
+            (first timestamp, {variable: float32 array}) with one value per hour,
+            or (None, {}) if there is no data in the window
+        """
+        if end <= start:
+            return None, {}
+        key = self.location_key(latitude, longitude)
+        # Only days with a directory on disk are visited, however wide the window
+        stored = self._stored_days(key, start // SECONDS_PER_DAY, (end - 1) // SECONDS_PER_DAY)
+        if not stored:
+            return None, {}
+        first_day, last_day = stored[0], stored[-1]
+        start, end = max(start, first_day * SECONDS_PER_DAY), min(end, (last_day + 1) * SECONDS_PER_DAY)
+
+        # One row per day, read straight from the memory-mapped columns
+        day_count = last_day - first_day + 1
+        table = {variable: np.full((day_count, SLOTS_PER_DAY), np.nan, dtype=np.float32) for variable in variables}
+        for day in stored:
+            for variable in variables:
+                path = self._column_path(key, day, variable)
+                if os.path.exists(path):
+                    table[variable][day - first_day] = np.load(path, mmap_mode="r")
+
+        base = first_day * SECONDS_PER_DAY
+        lower = -(-(start - base) // SECONDS_PER_HOUR)
+        upper = -(-(end - base) // SECONDS_PER_HOUR)
+        columns = {variable: values.reshape(-1)[lower:upper] for variable, values in table.items()}
+        if not columns:
+            return None, {}
+
+        present = np.zeros(upper - lower, dtype=bool)
+        for values in columns.values():
+            present |= ~np.isnan(values)
+        rows = np.flatnonzero(present)
+        if not len(rows):
+            return None, {}
+        first, last = rows[0], rows[-1] + 1
+        return (base + (lower + int(first)) * SECONDS_PER_HOUR,
+                {variable: values[first:last] for variable, values in columns.items()})
@@ -1,16 +1,148 @@
+import asyncio
 import json
 import os
-import requests
+import queue
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
 from typing import List
 from mcp.server.fastmcp import FastMCP
-import openmeteo_requests
-import pandas as pd
-import requests_cache
-from retry_requests import retry
+from circuit_breaker import CircuitBreaker
+from gazetteer import get_gazetteer, parse_coordinates
+from lazy_imports import lazy_import
+from weather_compact import compact_weather
+from weather_cell_store import WeatherCellStore
+from weather_history import WeatherHistoryStore
+from weather_summary import DEFAULT_METRICS, parse_granularity, parse_metric, summarize
+from weather_variables import unknown_variables
+
+# The HTTP clients and numpy load on first tool use, not while the server starts
+np = lazy_import("numpy")
+niquests = lazy_import("niquests")
+requests = lazy_import("requests")
+openmeteo_requests = lazy_import("openmeteo_requests")
+requests_cache = lazy_import("requests_cache")
+retry_requests = lazy_import("retry_requests")
+openmeteo_response = lazy_import("openmeteo_sdk.WeatherApiResponse")
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library encoder is the fallback
+    orjson = None
 
 # Initialize FastMCP server
 mcp = FastMCP("weather_mcp")
 
+# Open-Meteo client settings, overridable through the environment
+WEATHER_CACHE_NAME = os.getenv("WEATHER_CACHE_NAME", ".cache")
+WEATHER_CACHE_EXPIRE_AFTER = int(os.getenv("WEATHER_CACHE_EXPIRE_AFTER", "3600"))
+WEATHER_POOL_SIZE = int(os.getenv("WEATHER_POOL_SIZE", "10"))
+WEATHER_RETRIES = int(os.getenv("WEATHER_RETRIES", "5"))
+WEATHER_BACKOFF_FACTOR = float(os.getenv("WEATHER_BACKOFF_FACTOR", "0.2"))
+# Seconds one upstream attempt may take, and one upstream call of the async tools including its retries
+WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", "10"))
+WEATHER_CALL_TIMEOUT = float(os.getenv("WEATHER_CALL_TIMEOUT", "20"))
+# Maximum number of upstream requests the async tools run at the same time
+WEATHER_MAX_CONCURRENT_REQUESTS = int(os.getenv("WEATHER_MAX_CONCURRENT_REQUESTS", "4"))
+# Grid-cell cache settings: cell size in degrees, entry lifetime in seconds and entry limit
+WEATHER_GRID_RESOLUTION = float(os.getenv("WEATHER_GRID_RESOLUTION", "0.1"))
+WEATHER_CELL_CACHE_TTL = float(os.getenv("WEATHER_CELL_CACHE_TTL", str(WEATHER_CACHE_EXPIRE_AFTER)))
+WEATHER_CELL_CACHE_SIZE = int(os.getenv("WEATHER_CELL_CACHE_SIZE", "256"))
+# Expired responses younger than this many seconds past expiry are served (flagged stale)
+# while a background refresh runs, or when the upstream is failing
+WEATHER_STALE_TTL = float(os.getenv("WEATHER_STALE_TTL", "21600"))
+# SQLite copy of the grid-cell cache shared by server processes (empty to disable)
+WEATHER_CELL_STORE_PATH = os.getenv("WEATHER_CELL_STORE_PATH", WEATHER_CACHE_NAME + "_cells.sqlite")
+# Circuit breaker: stop calling Open-Meteo after this many consecutive failures, try again after RESET seconds
+WEATHER_BREAKER_THRESHOLD = int(os.getenv("WEATHER_BREAKER_THRESHOLD", "5"))
+WEATHER_BREAKER_RESET = float(os.getenv("WEATHER_BREAKER_RESET", "30"))
+# Finished-result cache settings: entry lifetime in seconds and total size budget in bytes
+WEATHER_RESULT_CACHE_TTL = float(os.getenv("WEATHER_RESULT_CACHE_TTL", "300"))
+WEATHER_RESULT_CACHE_MAX_BYTES = int(os.getenv("WEATHER_RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+# Local history of fetched hourly values, answered by get_weather_history
+WEATHER_HISTORY_ENABLED = os.getenv("WEATHER_HISTORY_ENABLED", "true").lower() in ("1", "true", "yes")
+WEATHER_HISTORY_DIR = os.getenv("WEATHER_HISTORY_DIR", "weather_history")
+# Refresh-ahead settings: the K most requested cells (with at least MIN_HITS recent
+# requests) are refreshed once they have less than MARGIN seconds left, checking every
+# INTERVAL seconds and sending at most RATE upstream requests per minute
+WEATHER_PREFETCH_ENABLED = os.getenv("WEATHER_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+WEATHER_PREFETCH_TOP_K = int(os.getenv("WEATHER_PREFETCH_TOP_K", "20"))
+WEATHER_PREFETCH_MIN_HITS = float(os.getenv("WEATHER_PREFETCH_MIN_HITS", "2"))
+WEATHER_PREFETCH_MARGIN = float(os.getenv("WEATHER_PREFETCH_MARGIN", "300"))
+WEATHER_PREFETCH_INTERVAL = float(os.getenv("WEATHER_PREFETCH_INTERVAL", "60"))
+WEATHER_PREFETCH_RATE = float(os.getenv("WEATHER_PREFETCH_RATE", "10"))
+WEATHER_PREFETCH_BATCH_SIZE = int(os.getenv("WEATHER_PREFETCH_BATCH_SIZE", "10"))
+
+_openmeteo_client = None
+_openmeteo_lock = threading.Lock()
+
+
+def get_openmeteo_client() -> "openmeteo_requests.Client":
+    """
+    Return the process-wide Open-Meteo client, creating it on first use.
+
+    The client wraps a single cached session (one opened SQLite backend) whose
+    HTTP adapter keeps a pool of keep-alive connections, so warm calls only pay
+    for the cache lookup or the HTTP round trip.
+    """
+    global _openmeteo_client
+    if _openmeteo_client is None:
+        with _openmeteo_lock:
+            if _openmeteo_client is None:
+                cache_session = requests_cache.CachedSession(WEATHER_CACHE_NAME, expire_after = WEATHER_CACHE_EXPIRE_AFTER)
+                retry_session = retry_requests.retry(cache_session, retries = WEATHER_RETRIES, backoff_factor = WEATHER_BACKOFF_FACTOR)
+                # retry() mounts an adapter with the default pool size, swap in a sized one with the same policy
+                retry_policy = retry_session.get_adapter("https://").max_retries
+                adapter = requests.adapters.HTTPAdapter(pool_connections = WEATHER_POOL_SIZE, pool_maxsize = WEATHER_POOL_SIZE, max_retries = retry_policy)
+                retry_session.mount("http://", adapter)
+                retry_session.mount("https://", adapter)
+                _openmeteo_client = openmeteo_requests.Client(session = retry_session)
+    return _openmeteo_client
+
+
+_async_openmeteo_client = None
+_upstream_semaphore = None
+
+
+def get_async_openmeteo_client() -> "openmeteo_requests.AsyncClient":
+    """
+    Return the process-wide async Open-Meteo client, creating it on first use.
+
+    It shares the pool size and retry policy of the synchronous client but
+    runs on an async niquests session, so slow upstream calls and retry
+    backoff never block the server's event loop. It has no HTTP cache of its
+    own; responses are persisted per grid cell in cell_store instead.
+    """
+    global _async_openmeteo_client
+    if _async_openmeteo_client is None:
+        retry_policy = niquests.packages.urllib3.Retry(total = WEATHER_RETRIES, backoff_factor = WEATHER_BACKOFF_FACTOR, status_forcelist = (500, 502, 504))
+        session = niquests.AsyncSession(retries = retry_policy, pool_connections = WEATHER_POOL_SIZE, pool_maxsize = WEATHER_POOL_SIZE,
+                                        timeout = WEATHER_TIMEOUT)
+        _async_openmeteo_client = openmeteo_requests.AsyncClient(session = session)
+    return _async_openmeteo_client
+
+
+def get_upstream_semaphore() -> asyncio.Semaphore:
+    """Return the semaphore limiting concurrent upstream requests from the async tools."""
+    global _upstream_semaphore
+    if _upstream_semaphore is None:
+        _upstream_semaphore = asyncio.Semaphore(WEATHER_MAX_CONCURRENT_REQUESTS)
+    return _upstream_semaphore
+
+
+def close_openmeteo_client() -> None:
+    """Close the pooled Open-Meteo session and drop the shared client."""
+    global _openmeteo_client
+    with _openmeteo_lock:
+        if _openmeteo_client is not None:
+            _openmeteo_client._session.close()
+            _openmeteo_client = None
+
+
 locattion_to_coordinates = {
     "ottawa": {"latitude": 45.42, "longitude": -75.7},
     "toronto": {"latitude": 43.7, "longitude": -79.42},
@@ -60,184 +192,1123 @@ locattion_to_coordinates = {
     "chatham": {"latitude": 42.4, "longitude": -82.18},
     "stratford": {"latitude": 43.37, "longitude": -80.98}
 }
-@mcp.tool()
-def get_weather_data(location: str) -> json:
+# Make sure all required weather variables are listed here
+# The order of variables in hourly or daily is important to assign them correctly below
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+HOURLY_VARIABLES = ["temperature_2m", "relative_humidity_2m", "precipitation_probability", "rain", "snowfall", "uv_index"]
+DAILY_VARIABLES = ["sunset", "sunrise", "uv_index_max"]
+TIMESTAMP_DAILY_VARIABLES = {"sunset", "sunrise"}
+CURRENT_VARIABLES = ["temperature_2m", "rain", "precipitation", "apparent_temperature", "wind_gusts_10m", "wind_direction_10m", "wind_speed_10m"]
+
+
+def get_coordinates(location: str) -> dict:
     """
-    Fetch weather data for a given location and number of days.
-    
+    Resolve a location to its coordinates.
+
+    Raw "latitude, longitude" text is used as is. Names are looked up in the
+    predefined locations first, then in the offline gazetteer by exact name and
+    finally by fuzzy match, so small typos still resolve.
+
     Args:
-        location: The location to fetch weather data for
+        location: The location name (case-insensitive, optionally "Name, CC"
+            with a country or state/province code) or "latitude, longitude"
 
-        
     Returns:
-        List of weather data dictionaries
+        Dictionary with latitude and longitude, plus the matched place name
+        when it came from the gazetteer
     """
-    # Setup the Open-Meteo API client with cache and retry on error
-    cache_session = requests_cache.CachedSession('.cache', expire_after = 3600)
-    retry_session = retry(cache_session, retries = 5, backoff_factor = 0.2)
-    openmeteo = openmeteo_requests.Client(session = retry_session)
+    point = parse_coordinates(location)
+    if point:
+        return {"latitude": point[0], "longitude": point[1]}
     coordinates = locattion_to_coordinates.get(location.lower(), None)
-    if not coordinates:
-        raise ValueError(f"Location '{location}' not found in predefined locations.")
-    print(f"Fetching weather data for {location} at coordinates {coordinates['latitude']}, {coordinates['longitude']}")
+    if coordinates:
+        return coordinates
+
+    gazetteer = get_gazetteer()
+    place = gazetteer.lookup(location)
+    if not place:
+        matches = gazetteer.fuzzy(location, limit=1)
+        place = matches[0] if matches else None
+    if not place:
+        raise ValueError(f"Location '{location}' not found in predefined locations or the gazetteer.")
+    return {
+        "latitude": place["latitude"],
+        "longitude": place["longitude"],
+        "name": f"{place['name']}, {place['country_code']}"
+    }
+
+
+async def get_coordinates_async(location: str) -> dict:
+    """
+    get_coordinates for the async tools.
+
+    Coordinates and predefined locations resolve inline; gazetteer lookups
+    run in a worker thread, since the first one loads the gazetteer and
+    builds its fuzzy index, which would otherwise stall every request on
+    the event loop.
+    """
+    if parse_coordinates(location) or location.lower() in locattion_to_coordinates:
+        return get_coordinates(location)
+    return await asyncio.to_thread(get_coordinates, location)
+
+
+def format_timestamps(seconds) -> "np.ndarray":
+    """
+    Format unix timestamps as ISO 8601 UTC strings in a single vectorized pass.
+
+    Args:
+        seconds: Scalar or array of unix timestamps in seconds
+
+    Returns:
+        Numpy string array (0-d for scalars) like "2025-06-15T00:00:00+00:00"
+    """
+    instants = np.asarray(seconds, dtype=np.int64).astype("datetime64[s]")
+    return np.char.add(np.datetime_as_string(instants, unit="s"), "+00:00")
+
+
+def parse_time_bound(value: str, utc_offset_seconds: int = 0, end: bool = False) -> int:
+    """
+    Parse an ISO 8601 date or datetime into a unix timestamp.
+
+    Naive values are read in the forecast's local time. A bare date used as an
+    end bound covers the whole day.
+
+    Args:
+        value: ISO 8601 date ("2025-06-15") or datetime ("2025-06-15T14:00")
+        utc_offset_seconds: Offset of the forecast's local time from UTC
+        end: Whether the value is the (exclusive) end of a window
+
+    Returns:
+        Unix timestamp in seconds
+    """
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        seconds = int(moment.replace(tzinfo=timezone.utc).timestamp()) - utc_offset_seconds
+    else:
+        seconds = int(moment.timestamp())
+    if end and len(value) == 10:
+        seconds += 86400
+    return seconds
+
+
+def _window_indices(variables, count: int, start=None, end=None, overlap: bool = False) -> tuple:
+    """
+    Map a [start, end) window onto indices of a variable block's time axis.
+
+    Hourly values are instants and are kept when they fall inside the window.
+    With overlap=True (daily values) a step is kept when its interval overlaps
+    the window.
+    """
+    first, interval = variables.Time(), variables.Interval()
+    lower, upper = 0, count
+    if start is not None:
+        offset = (start - first) // interval if overlap else -((first - start) // interval)
+        lower = min(max(offset, 0), count)
+    if end is not None:
+        upper = min(max(-((first - end) // interval), lower), count)
+    return lower, upper
+
+
+def _date_range(variables, lower: int, upper: int) -> dict:
+    """Describe the (possibly sliced) time axis of an hourly or daily variable block."""
+    first, interval = variables.Time(), variables.Interval()
+    bounds = format_timestamps([first + lower * interval, first + upper * interval])
+    return {
+        "start": str(bounds[0]),
+        "end": str(bounds[1]),
+        "interval_seconds": interval
+    }
+
+
+def _decode_string(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def decode_weather_response(response, hourly: List[str] = HOURLY_VARIABLES, daily: List[str] = DAILY_VARIABLES,
+                            current: List[str] = CURRENT_VARIABLES, start: str = None, end: str = None) -> dict:
+    """
+    Decode a single Open-Meteo response into the unified weather JSON structure.
+
+    Hourly and daily series stay numpy arrays (views on the flatbuffer where
+    possible) and are only turned into JSON by encode_weather_json. Blocks
+    whose variable list is empty are left out.
+
+    Args:
+        response: One WeatherApiResponse returned by the Open-Meteo client
+        hourly: Hourly variables, in the order they were requested
+        daily: Daily variables, in the order they were requested
+        current: Current variables, in the order they were requested
+        start: Optional ISO 8601 start of the hourly/daily window (inclusive)
+        end: Optional ISO 8601 end of the hourly/daily window (exclusive)
+
+    Returns:
+        Dictionary with location, current, hourly and daily weather data
+    """
+    utc_offset_seconds = response.UtcOffsetSeconds()
+    start_seconds = parse_time_bound(start, utc_offset_seconds) if start else None
+    end_seconds = parse_time_bound(end, utc_offset_seconds, end=True) if end else None
+
+    weather = {
+        "location": {
+            "latitude": response.Latitude(),
+            "longitude": response.Longitude(),
+            "elevation": response.Elevation(),
+            "timezone": _decode_string(response.Timezone()),
+            "timezone_abbreviation": _decode_string(response.TimezoneAbbreviation()),
+            "utc_offset_seconds": utc_offset_seconds
+        }
+    }
+
+    # The order of variables needs to be the same as requested.
+    if current:
+        block = response.Current()
+        weather["current"] = {"time": str(format_timestamps(block.Time()))}
+        for index, name in enumerate(current):
+            value = block.Variables(index).Value()
+            # Missing values are null, as in the hourly and daily arrays
+            weather["current"][name] = None if value != value else value
+
+    if hourly:
+        block = response.Hourly()
+        lower, upper = _window_indices(block, block.Variables(0).ValuesLength(), start_seconds, end_seconds)
+        data = {}
+        for index, name in enumerate(hourly):
+            data[name] = block.Variables(index).ValuesAsNumpy()[lower:upper]
+        weather["hourly"] = {"date_range": _date_range(block, lower, upper), "data": data}
+
+    if daily:
+        block = response.Daily()
+        first = block.Variables(0)
+        count = first.ValuesInt64Length() if daily[0] in TIMESTAMP_DAILY_VARIABLES else first.ValuesLength()
+        lower, upper = _window_indices(block, count, start_seconds, end_seconds, overlap=True)
+        # sunrise and sunset come back as int64 unix timestamps, everything else as float32
+        data = {}
+        for index, name in enumerate(daily):
+            if name in TIMESTAMP_DAILY_VARIABLES:
+                data[name] = format_timestamps(block.Variables(index).ValuesInt64AsNumpy()[lower:upper])
+            else:
+                data[name] = block.Variables(index).ValuesAsNumpy()[lower:upper]
+        weather["daily"] = {"date_range": _date_range(block, lower, upper), "data": data}
+
+    weather["generated_at"] = datetime.now(timezone.utc).isoformat()
+    return weather
+
+
+def check_weather_variables(hourly: List[str], daily: List[str], current: List[str]) -> None:
+    """
+    Reject variable names Open-Meteo does not know before anything is sent upstream.
+
+    Raises:
+        ValueError: If any name is unknown
+    """
+    unknown = unknown_variables(hourly, daily, current)
+    if unknown:
+        raise ValueError(f"Unknown weather variables: {', '.join(unknown)}")
+
+
+def rejected_request(error: Exception) -> bool:
+    """
+    Whether an upstream error is Open-Meteo rejecting the request (HTTP 400).
+
+    The client raises its error with the JSON body of 400 and 429 answers;
+    429 (request limit exceeded) is a failure to serve, a 400 is about the
+    request itself and says nothing about the upstream's health.
+    """
+    while error is not None:
+        if error.args and isinstance(error.args[0], dict):
+            return "limit exceeded" not in str(error.args[0].get("reason", "")).lower()
+        error = error.__cause__
+    return False
+
 
-    # Make sure all required weather variables are listed here
-    # The order of variables in hourly or daily is important to assign them correctly below
-    url = "https://api.open-meteo.com/v1/forecast"
+def build_weather_params(coordinates: List[dict], hourly: List[str], daily: List[str], current: List[str]) -> dict:
+    """
+    Build Open-Meteo query parameters requesting only the given variables.
+
+    Args:
+        coordinates: One latitude/longitude dictionary per location
+        hourly: Hourly variables to request
+        daily: Daily variables to request
+        current: Current variables to request
+
+    Returns:
+        Query parameters for the forecast endpoint
+    """
+    # Open-Meteo takes coordinate lists and answers with one response per location, in order
     params = {
-        "location": location,
-        "latitude": coordinates["latitude"],
-        "longitude": coordinates["longitude"],
-        "daily": ["sunset", "sunrise", "uv_index_max"],
-        "hourly": ["temperature_2m", "relative_humidity_2m", "precipitation_probability", "rain", "snowfall", "uv_index"],
-        "current": ["temperature_2m", "rain", "precipitation", "apparent_temperature", "wind_gusts_10m", "wind_direction_10m", "wind_speed_10m"],
+        "latitude": [point["latitude"] for point in coordinates],
+        "longitude": [point["longitude"] for point in coordinates],
         "timezone": "America/New_York"
     }
-    responses = openmeteo.weather_api(url, params=params)
-
-    # Process first location. Add a for-loop for multiple locations or weather models
-    response = responses[0]
-    # Current values. The order of variables needs to be the same as requested.
-    current = response.Current()
-    current_temperature_2m = current.Variables(0).Value()
-    current_rain = current.Variables(1).Value()
-    current_precipitation = current.Variables(2).Value()
-    current_apparent_temperature = current.Variables(3).Value()
-    current_wind_gusts_10m = current.Variables(4).Value()
-    current_wind_direction_10m = current.Variables(5).Value()
-    current_wind_speed_10m = current.Variables(6).Value()
-
-    # Process hourly data. The order of variables needs to be the same as requested.
-    hourly = response.Hourly()
-    hourly_temperature_2m = hourly.Variables(0).ValuesAsNumpy()
-    hourly_relative_humidity_2m = hourly.Variables(1).ValuesAsNumpy()
-    hourly_precipitation_probability = hourly.Variables(2).ValuesAsNumpy()
-    hourly_rain = hourly.Variables(3).ValuesAsNumpy()
-    hourly_snowfall = hourly.Variables(4).ValuesAsNumpy()
-    hourly_uv_index = hourly.Variables(5).ValuesAsNumpy()
-
-    hourly_data = {"date": pd.date_range(
-        start = pd.to_datetime(hourly.Time(), unit = "s", utc = True),
-        end = pd.to_datetime(hourly.TimeEnd(), unit = "s", utc = True),
-        freq = pd.Timedelta(seconds = hourly.Interval()),
-        inclusive = "left"
-    )}
-
-    hourly_data["temperature_2m"] = hourly_temperature_2m
-    hourly_data["relative_humidity_2m"] = hourly_relative_humidity_2m
-    hourly_data["precipitation_probability"] = hourly_precipitation_probability
-    hourly_data["rain"] = hourly_rain
-    hourly_data["snowfall"] = hourly_snowfall
-    hourly_data["uv_index"] = hourly_uv_index
-
-    hourly_dataframe = pd.DataFrame(data = hourly_data)
-    # print(hourly_dataframe)
-    # print(hourly_dataframe.to_json(orient = "records", date_format = "iso"))
-
-    # Process daily data. The order of variables needs to be the same as requested.
-    daily = response.Daily()
-    daily_sunset = daily.Variables(0).ValuesInt64AsNumpy()
-    daily_sunrise = daily.Variables(1).ValuesInt64AsNumpy()
-    daily_uv_index_max = daily.Variables(2).ValuesAsNumpy()
-
-    daily_data = {"date": pd.date_range(
-        start = pd.to_datetime(daily.Time(), unit = "s", utc = True),
-        end = pd.to_datetime(daily.TimeEnd(), unit = "s", utc = True),
-        freq = pd.Timedelta(seconds = daily.Interval()),
-        inclusive = "left"
-    )}
-
-    daily_data["sunset"] = daily_sunset
-    daily_data["sunrise"] = daily_sunrise
-    daily_data["uv_index_max"] = daily_uv_index_max
-
-    daily_dataframe = pd.DataFrame(data = daily_data)
-    # print(daily_dataframe)
-    # print(daily_dataframe.to_json(orient = "records", date_format = "iso"))
-
-    # Create unified JSON data structure
-    def create_unified_weather_json():
-        # Helper function to safely convert values
-        def safe_convert(value):
-            if isinstance(value, bytes):
-                return value.decode('utf-8')
-            elif hasattr(value, 'tolist'):  # numpy array
-                return value.tolist()
-            elif hasattr(value, 'item') and value.size == 1:  # numpy scalar
-                return value.item()
-            else:
-                return value
-        
-        # Location information
-        location_info = {
-            "latitude": safe_convert(response.Latitude()),
-            "longitude": safe_convert(response.Longitude()),
-            "elevation": safe_convert(response.Elevation()),
-            "timezone": safe_convert(response.Timezone()),
-            "timezone_abbreviation": safe_convert(response.TimezoneAbbreviation()),
-            "utc_offset_seconds": safe_convert(response.UtcOffsetSeconds())
-        }
-        
-        # Current weather data
-        current_weather = {
-            "time": pd.to_datetime(current.Time(), unit="s", utc=True).isoformat(),
-            "temperature_2m": safe_convert(current_temperature_2m),
-            "rain": safe_convert(current_rain),
-            "precipitation": safe_convert(current_precipitation),
-            "apparent_temperature": safe_convert(current_apparent_temperature),
-            "wind_gusts_10m": safe_convert(current_wind_gusts_10m),
-            "wind_direction_10m": safe_convert(current_wind_direction_10m),
-            "wind_speed_10m": safe_convert(current_wind_speed_10m)
-        }
-        
-        # Hourly weather data
-        hourly_weather = {
-            "date_range": {
-                "start": pd.to_datetime(hourly.Time(), unit="s", utc=True).isoformat(),
-                "end": pd.to_datetime(hourly.TimeEnd(), unit="s", utc=True).isoformat(),
-                "interval_seconds": hourly.Interval()
-            },
-            "data": {
-                "temperature_2m": safe_convert(hourly_temperature_2m),
-                "relative_humidity_2m": safe_convert(hourly_relative_humidity_2m),
-                "precipitation_probability": safe_convert(hourly_precipitation_probability),
-                "rain": safe_convert(hourly_rain),
-                "snowfall": safe_convert(hourly_snowfall),
-                "uv_index": safe_convert(hourly_uv_index)
-            }
-        }
-        
-        # Daily weather data
-        daily_weather = {
-            "date_range": {
-                "start": pd.to_datetime(daily.Time(), unit="s", utc=True).isoformat(),
-                "end": pd.to_datetime(daily.TimeEnd(), unit="s", utc=True).isoformat(),
-                "interval_seconds": daily.Interval()
-            },
-            "data": {
-                "sunset": [pd.to_datetime(ts, unit="s", utc=True).isoformat() for ts in daily_sunset],
-                "sunrise": [pd.to_datetime(ts, unit="s", utc=True).isoformat() for ts in daily_sunrise],
-                "uv_index_max": safe_convert(daily_uv_index_max)
+    for block, variables in (("hourly", hourly), ("daily", daily), ("current", current)):
+        if variables:
+            params[block] = list(variables)
+    return params
+
+
+class WeatherCellCache:
+    """
+    In-memory cache of Open-Meteo responses keyed by grid cell and variable set.
+
+    Open-Meteo answers from the model grid point nearest to the request, so
+    entries are stored under the cell of the snapped coordinates it returns.
+    The request's own cell is remembered as an alias of that grid cell, and
+    any later request falling into either cell is served from memory while the
+    entry is fresh. Expired entries are kept for another stale_ttl seconds so
+    they can be served stale while a refresh runs or the upstream is down.
+    """
+
+    def __init__(self, resolution: float = WEATHER_GRID_RESOLUTION, ttl: float = WEATHER_CELL_CACHE_TTL,
+                 max_entries: int = WEATHER_CELL_CACHE_SIZE, stale_ttl: float = WEATHER_STALE_TTL):
+        self.resolution = resolution
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # (cell, variables) -> (expires_at, response)
+        self._aliases = OrderedDict()  # request cell -> grid cell it was snapped to
+        self._lock = threading.Lock()
+
+    def cell(self, latitude: float, longitude: float) -> tuple:
+        """Quantize coordinates to a grid cell."""
+        return round(latitude / self.resolution), round(longitude / self.resolution)
+
+    def get(self, latitude: float, longitude: float, variables: tuple):
+        """
+        Return the cached response for a location and variable set, or None.
+
+        Args:
+            latitude: Requested latitude
+            longitude: Requested longitude
+            variables: Hashable description of the requested variables
+        """
+        request_cell = self.cell(latitude, longitude)
+        with self._lock:
+            key = (self._aliases.get(request_cell, request_cell), variables)
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            now = time.monotonic()
+            if entry[0] <= now:
+                if entry[0] + self.stale_ttl <= now:
+                    del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def get_stale(self, latitude: float, longitude: float, variables: tuple):
+        """Return an expired response that is still within the stale window, or None."""
+        request_cell = self.cell(latitude, longitude)
+        with self._lock:
+            entry = self._entries.get((self._aliases.get(request_cell, request_cell), variables))
+        if entry is None or not (entry[0] <= time.monotonic() < entry[0] + self.stale_ttl):
+            return None
+        return entry[1]
+
+    def age(self, latitude: float, longitude: float, variables: tuple):
+        """Return the seconds since the cached entry was fetched, or None if there is no entry."""
+        remaining = self.time_to_live(latitude, longitude, variables)
+        return None if remaining is None else self.ttl - remaining
+
+    def time_to_live(self, latitude: float, longitude: float, variables: tuple):
+        """Return the seconds left before the cached entry expires, or None if there is no entry."""
+        request_cell = self.cell(latitude, longitude)
+        with self._lock:
+            entry = self._entries.get((self._aliases.get(request_cell, request_cell), variables))
+        return None if entry is None else entry[0] - time.monotonic()
+
+    def put(self, latitude: float, longitude: float, variables: tuple, response, age: float = 0.0) -> None:
+        """
+        Store a response fetched for a location and variable set.
+
+        Args:
+            latitude: Requested latitude
+            longitude: Requested longitude
+            variables: Hashable description of the requested variables
+            response: The WeatherApiResponse returned for that request
+            age: Seconds since the response was fetched (for responses loaded from disk)
+        """
+        request_cell = self.cell(latitude, longitude)
+        grid_cell = self.cell(response.Latitude(), response.Longitude())
+        with self._lock:
+            self._aliases[request_cell] = grid_cell
+            self._aliases.move_to_end(request_cell)
+            self._entries[(grid_cell, variables)] = (time.monotonic() + self.ttl - age, response)
+            self._entries.move_to_end((grid_cell, variables))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            while len(self._aliases) > 4 * self.max_entries:
+                self._aliases.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._aliases.clear()
+
+
+weather_cache = WeatherCellCache()
+
+
+class WeatherResultCache:
+    """
+    Bounded LRU of finished (encoded) weather results.
+
+    Each entry remembers a token of the upstream response it was built from
+    (see response_token) and is only served while the grid-cell cache hands
+    out a response with the same token, so a refresh with new data upstream
+    invalidates it. Entries also expire after a TTL, and least recently used
+    entries are evicted once the results exceed the budget in UTF-8 bytes.
+    """
+
+    def __init__(self, max_bytes: int = WEATHER_RESULT_CACHE_MAX_BYTES, ttl: float = WEATHER_RESULT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, source token, payload, UTF-8 size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, source: tuple):
+        """Return the cached payload for key if it is fresh and was built from the source token, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic() and entry[1] == source:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, source: tuple, payload: str) -> None:
+        """Store a payload built from the upstream response with the given token."""
+        size = len(payload) if payload.isascii() else len(payload.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, source, payload, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key) -> None:
+        self._bytes -= self._entries.pop(key)[3]
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
             }
-        }
-        
-        # Unified JSON structure
-        unified_weather_data = {
-            "location": location_info,
-            "current": current_weather,
-            "hourly": hourly_weather,
-            "daily": daily_weather,
-            "generated_at": pd.Timestamp.now(tz='UTC').isoformat()
-        }
-        
-        return unified_weather_data
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+def response_token(response) -> tuple:
+    """
+    Identify an upstream response by its content, without keeping it alive.
+
+    Responses are views into the message bytes the client received; bytes
+    objects cache their hash, so this is cheap after the first call.
+    """
+    buffer = response._tab.Bytes
+    return hash(buffer), len(buffer), response._tab.Pos
+
+
+result_cache = WeatherResultCache()
+history_store = WeatherHistoryStore(WEATHER_HISTORY_DIR, resolution=WEATHER_GRID_RESOLUTION)
+
+
+def _cached_responses(points: List[dict], variables: tuple) -> tuple:
+    """Look points up in the grid-cell cache, returning the responses and the indices that missed."""
+    for point in points:
+        prefetch_scheduler.record(point, variables)
+    responses = [weather_cache.get(point["latitude"], point["longitude"], variables) for point in points]
+    missing = [index for index, response in enumerate(responses) if response is None]
+    return responses, missing
+
+
+class BackgroundWriter:
+    """Background thread running disk writes (history, persisted cells) off the request path."""
+
+    def __init__(self, max_pending: int = 256):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, write, *args) -> None:
+        """Queue a write(*args) call; dropped (with a warning) if the writer is too far behind."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="weather-writer", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait((write, args))
+        except queue.Full:
+            print("Weather disk writer is behind, skipping a write", file=sys.stderr)
+
+    def flush(self) -> None:
+        """Wait until every queued write has finished."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            write, args = self._queue.get()
+            try:
+                write(*args)
+            except Exception as e:
+                # Disk copies are best effort, never fail the request over them
+                print(f"Weather disk write failed: {e}", file=sys.stderr)
+            finally:
+                self._queue.task_done()
+
+
+background_writer = BackgroundWriter()
+cell_store = WeatherCellStore(WEATHER_CELL_STORE_PATH, WEATHER_CELL_CACHE_TTL + WEATHER_STALE_TTL) if WEATHER_CELL_STORE_PATH else None
+
+
+def _cell_store_key(point: dict, variables: tuple) -> str:
+    latitude, longitude = weather_cache.cell(point["latitude"], point["longitude"])
+    return f"{latitude},{longitude}:{variables!r}"
+
+
+def response_message(response) -> bytes:
+    """Return the length-prefixed message a response was parsed from, as the client received it."""
+    buffer, position = response._tab.Bytes, response._tab.Pos
+    offset = 0
+    while offset < len(buffer):
+        length = int.from_bytes(buffer[offset:offset + 4], "little")
+        if offset + 4 <= position < offset + 4 + length:
+            return bytes(buffer[offset:offset + 4 + length])
+        offset += length + 4
+    raise ValueError("Response is not part of its buffer")
+
+
+def _load_stored_cells(points: List[dict], variables: tuple, missing: List[int]) -> None:
+    """Seed the memory cache with persisted responses fetched (maybe by another process) more recently."""
+    for index in missing:
+        point = points[index]
+        try:
+            stored = cell_store.get(_cell_store_key(point, variables))
+        except sqlite3.Error as e:
+            print(f"Could not read stored weather: {e}", file=sys.stderr)
+            return
+        if stored is None:
+            continue
+        age, message = stored
+        cached_age = weather_cache.age(point["latitude"], point["longitude"], variables)
+        if cached_age is None or age < cached_age:
+            response = openmeteo_response.WeatherApiResponse.GetRootAs(message, 4)
+            weather_cache.put(point["latitude"], point["longitude"], variables, response, age=age)
+
+
+def record_history(point: dict, hourly: List[str], response) -> None:
+    """Queue the hourly block of a freshly fetched response for the local history store."""
+    if not (WEATHER_HISTORY_ENABLED and hourly):
+        return
+    block = response.Hourly()
+    count = block.Variables(0).ValuesLength()
+    times = block.Time() + block.Interval() * np.arange(count, dtype=np.int64)
+    columns = {name: block.Variables(index).ValuesAsNumpy() for index, name in enumerate(hourly)}
+    metadata = {
+        "timezone": _decode_string(response.Timezone()),
+        "utc_offset_seconds": response.UtcOffsetSeconds()
+    }
+    # The memory-mapped writes take tens of milliseconds, too long for the request path
+    background_writer.submit(history_store.append, point["latitude"], point["longitude"], times, columns, metadata)
+
+
+def _store_responses(points: List[dict], variables: tuple, responses: list, missing: List[int], fetched: list) -> None:
+    """Fill the missed slots with fetched responses, cache (and persist) them and record their history."""
+    for index, response in zip(missing, fetched):
+        weather_cache.put(points[index]["latitude"], points[index]["longitude"], variables, response)
+        if cell_store is not None:
+            background_writer.submit(cell_store.put, _cell_store_key(points[index], variables), response_message(response))
+        record_history(points[index], list(variables[0]), response)
+        responses[index] = response
+
+
+upstream_breaker = CircuitBreaker("Open-Meteo", WEATHER_BREAKER_THRESHOLD, WEATHER_BREAKER_RESET)
+
+
+def _serve_stale(points: List[dict], variables: tuple, responses: list, missing: List[int]) -> List[int]:
+    """Fill missed slots from stale cache entries, returning the indices that are still missing."""
+    still_missing = []
+    for index in missing:
+        response = weather_cache.get_stale(points[index]["latitude"], points[index]["longitude"], variables)
+        if response is None:
+            still_missing.append(index)
+        else:
+            responses[index] = response
+    return still_missing
+
+
+def fetch_weather_responses(points: List[dict], hourly: List[str], daily: List[str], current: List[str],
+                            refresh: bool = False) -> list:
+    """
+    Return one Open-Meteo response per point, fetching cache misses in a single request.
+
+    If the upstream request fails or its circuit is open, recently expired
+    responses are served instead (unless refresh is set).
+
+    Args:
+        points: One latitude/longitude dictionary per location
+        hourly: Hourly variables to request
+        daily: Daily variables to request
+        current: Current variables to request
+        refresh: Skip both caches and fetch every point from upstream
+
+    Returns:
+        List of WeatherApiResponse objects in the order of points
+    """
+    check_weather_variables(hourly, daily, current)
+    variables = (tuple(hourly), tuple(daily), tuple(current))
+    if refresh:
+        responses, missing = [None] * len(points), list(range(len(points)))
+    else:
+        responses, missing = _cached_responses(points, variables)
+    if missing:
+        params = build_weather_params([points[index] for index in missing], hourly, daily, current)
+        try:
+            upstream_breaker.check()
+            try:
+                # Reuse the pooled Open-Meteo client (cache and retry on error)
+                fetched = get_openmeteo_client().weather_api(OPEN_METEO_URL, params=params, force_refresh=refresh,
+                                                             timeout=WEATHER_TIMEOUT)
+            except Exception as e:
+                if rejected_request(e):
+                    upstream_breaker.release()
+                else:
+                    upstream_breaker.record_failure()
+                raise
+            upstream_breaker.record_success()
+        except Exception as e:
+            if refresh or rejected_request(e) or _serve_stale(points, variables, responses, missing):
+                raise
+            return responses
+        _store_responses(points, variables, responses, missing, fetched)
+    return responses
+
+
+_revalidating = set()  # (cell, variables) with a background refresh in flight
+_background_tasks = set()
+
+
+async def _revalidate(points: List[dict], hourly: List[str], daily: List[str], current: List[str], keys: list) -> None:
+    """Refresh stale cache entries in the background."""
+    variables = (tuple(hourly), tuple(daily), tuple(current))
+    try:
+        if not upstream_breaker.allow():
+            return
+        params = build_weather_params(points, hourly, daily, current)
+        try:
+            fetched = await _fetch_upstream_async(params)
+        except asyncio.CancelledError:
+            upstream_breaker.release()
+            raise
+        except Exception as e:
+            if rejected_request(e):
+                upstream_breaker.release()
+            else:
+                upstream_breaker.record_failure()
+            print(f"Background weather refresh failed: {e}", file=sys.stderr)
+            return
+        upstream_breaker.record_success()
+        _store_responses(points, variables, [None] * len(points), list(range(len(points))), fetched)
+    finally:
+        _revalidating.difference_update(keys)
+
+
+def _schedule_revalidation(points: List[dict], hourly: List[str], daily: List[str], current: List[str]) -> None:
+    """Start one background refresh for the stale points that are not already being refreshed."""
+    variables = (tuple(hourly), tuple(daily), tuple(current))
+    pending, keys = [], []
+    for point in points:
+        key = (weather_cache.cell(point["latitude"], point["longitude"]), variables)
+        if key not in _revalidating:
+            _revalidating.add(key)
+            pending.append(point)
+            keys.append(key)
+    if pending:
+        task = asyncio.get_running_loop().create_task(_revalidate(pending, hourly, daily, current, keys))
+        # Keep a reference so the task is not garbage collected before it finishes
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+
+async def _fetch_upstream_async(params: dict) -> list:
+    """Call Open-Meteo with the async client, holding an upstream slot for at most WEATHER_CALL_TIMEOUT seconds."""
+    async with get_upstream_semaphore():
+        return await asyncio.wait_for(get_async_openmeteo_client().weather_api(OPEN_METEO_URL, params=params),
+                                      WEATHER_CALL_TIMEOUT)
+
+
+def staleness(point: dict, hourly: List[str], daily: List[str], current: List[str]) -> dict:
+    """
+    Flag data served from an expired cache entry while a refresh runs (or the upstream is down).
+
+    Returns:
+        {"stale": True, "age_seconds": age} if the point's cached entry is past its TTL, else {}
+    """
+    age = weather_cache.age(point["latitude"], point["longitude"], (tuple(hourly), tuple(daily), tuple(current)))
+    if age is None or age <= weather_cache.ttl:
+        return {}
+    return {"stale": True, "age_seconds": int(age)}
+
+
+async def fetch_weather_responses_async(points: List[dict], hourly: List[str], daily: List[str], current: List[str]) -> list:
+    """
+    Async variant of fetch_weather_responses.
+
+    Cache hits return without touching the network. Recently expired entries
+    are returned immediately (stale-while-revalidate) while one background
+    task refreshes them; only points with nothing cached wait for the
+    upstream, which is fetched with the async client while holding the
+    upstream concurrency limit and skipped while its circuit is open.
+    """
+    check_weather_variables(hourly, daily, current)
+    variables = (tuple(hourly), tuple(daily), tuple(current))
+    responses, missing = _cached_responses(points, variables)
+    if missing and cell_store is not None:
+        # A new server process starts with an empty memory cache; pick up what earlier ones fetched
+        await asyncio.to_thread(_load_stored_cells, points, variables, missing)
+        for index in missing:
+            responses[index] = weather_cache.get(points[index]["latitude"], points[index]["longitude"], variables)
+        missing = [index for index in missing if responses[index] is None]
+    if not missing:
+        return responses
+
+    remaining = _serve_stale(points, variables, responses, missing)
+    if len(remaining) < len(missing):
+        _schedule_revalidation([points[index] for index in missing if index not in remaining], hourly, daily, current)
+    if remaining:
+        upstream_breaker.check()
+        params = build_weather_params([points[index] for index in remaining], hourly, daily, current)
+        try:
+            fetched = await _fetch_upstream_async(params)
+        except asyncio.CancelledError:
+            # The client gave up; that says nothing about the upstream, but the trial slot must be freed
+            upstream_breaker.release()
+            raise
+        except Exception as e:
+            # A rejected request (HTTP 400) is the caller's problem, not an upstream failure
+            if rejected_request(e):
+                upstream_breaker.release()
+            else:
+                upstream_breaker.record_failure()
+            raise
+        upstream_breaker.record_success()
+        _store_responses(points, variables, responses, remaining, fetched)
+    return responses
+
+
+class RefreshAheadScheduler:
+    """
+    Background refresher that keeps the most requested grid cells warm.
+
+    Every request is counted per cell and variable set. Scores decay with a
+    half-life of one cache TTL, so a cell asked for a few times per TTL stays
+    popular until its entry is due, and interest fades after that. Cells in
+    the top K with enough recent requests are re-fetched shortly before their
+    cache entry expires, grouped into multi-location requests, with jittered
+    timing and a request rate limit.
+    """
+
+    def __init__(self, cache: WeatherCellCache, top_k: int = WEATHER_PREFETCH_TOP_K,
+                 min_hits: float = WEATHER_PREFETCH_MIN_HITS, margin: float = WEATHER_PREFETCH_MARGIN,
+                 interval: float = WEATHER_PREFETCH_INTERVAL, requests_per_minute: float = WEATHER_PREFETCH_RATE,
+                 batch_size: int = WEATHER_PREFETCH_BATCH_SIZE, half_life: float = None):
+        self.cache = cache
+        self.half_life = half_life or cache.ttl
+        self.top_k = top_k
+        self.min_hits = min_hits
+        self.margin = margin
+        self.interval = interval
+        self.request_spacing = 60.0 / requests_per_minute
+        self.batch_size = batch_size
+        self._scores = {}  # (cell, variables) -> decayed request count
+        self._points = {}  # (cell, variables) -> last requested point in that cell
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._next_request_at = 0.0
+        self._decayed_at = time.monotonic()
+
+    def record(self, point: dict, variables: tuple) -> None:
+        """Count one request for a point and variable set."""
+        key = (self.cache.cell(point["latitude"], point["longitude"]), variables)
+        with self._lock:
+            self._scores[key] = self._scores.get(key, 0.0) + 1.0
+            self._points[key] = point
+
+    def due(self) -> list:
+        """Return (point, variables) pairs among the top K cells that need refreshing now."""
+        with self._lock:
+            ranked = sorted(self._scores.items(), key=lambda item: item[1], reverse=True)[:self.top_k]
+            candidates = [(self._points[key], key[1]) for key, score in ranked if score >= self.min_hits]
+        due = []
+        for point, variables in candidates:
+            remaining = self.cache.time_to_live(point["latitude"], point["longitude"], variables)
+            if remaining is None or remaining < self.margin:
+                due.append((point, variables))
+        return due
+
+    def decay(self, elapsed: float) -> None:
+        """Fade the request counts by the given number of seconds, dropping cells nobody asks for anymore."""
+        factor = 0.5 ** (elapsed / self.half_life)
+        with self._lock:
+            for key in list(self._scores):
+                self._scores[key] *= factor
+                if self._scores[key] < 0.25:
+                    del self._scores[key]
+                    del self._points[key]
+
+    def _throttle(self) -> None:
+        """Sleep until the rate limit allows the next upstream request."""
+        delay = self._next_request_at - time.monotonic()
+        if delay > 0:
+            self._stop.wait(delay)
+        self._next_request_at = time.monotonic() + self.request_spacing * random.uniform(1.0, 1.5)
+
+    def refresh_once(self) -> int:
+        """
+        Refresh every due cell, batching locations that share a variable set.
+
+        Returns:
+            Number of upstream requests made
+        """
+        groups = {}
+        for point, variables in self.due():
+            groups.setdefault(variables, []).append(point)
+
+        requests_made = 0
+        for variables, points in groups.items():
+            for offset in range(0, len(points), self.batch_size):
+                if self._stop.is_set():
+                    return requests_made
+                self._throttle()
+                fetch_weather_responses(points[offset:offset + self.batch_size], *variables, refresh=True)
+                requests_made += 1
+        now = time.monotonic()
+        self.decay(now - self._decayed_at)
+        self._decayed_at = now
+        return requests_made
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval * random.uniform(0.8, 1.2)):
+            try:
+                self.refresh_once()
+            except Exception as e:
+                print(f"Weather prefetch failed: {e}", file=sys.stderr)
+
+    def start(self) -> None:
+        """Start the background refresh thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="weather-prefetch", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+prefetch_scheduler = RefreshAheadScheduler(weather_cache)
+
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "f" and np.isnan(value).any():
+            # Write missing values as null, like orjson does
+            return np.where(np.isnan(value), None, value.astype(object)).tolist()
+        return value.tolist()
+    if isinstance(value, np.generic):
+        value = value.item()
+        # The standard library would write NaN, which is not valid JSON
+        return None if value != value else value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_weather_json(data) -> str:
+    """
+    Encode decoded weather data as compact JSON.
+
+    Uses orjson's native numpy support when it is installed and falls back to
+    the standard library encoder otherwise.
+
+    Args:
+        data: Weather data as returned by decode_weather_response, or a mapping of them
+
+    Returns:
+        JSON string
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+    return json.dumps(data, default=_json_default, separators=(",", ":"))
+
+
+@mcp.tool()
+async def get_weather_data(location: str, hourly: List[str] = None, daily: List[str] = None, current: List[str] = None,
+                     start: str = None, end: str = None, max_chars: int = None) -> str:
+    """
+    Fetch weather data for a given location and number of days.
     
-    # Generate and print the unified JSON
-    weather_json = create_unified_weather_json()
-    # print("\n=== UNIFIED WEATHER JSON DATA ===")
-    # print(json.dumps(weather_json, indent=2, ensure_ascii=False))
-    return weather_json
+    Args:
+        location: The location to fetch weather data for
+        hourly: Hourly variables to return (default: temperature_2m, relative_humidity_2m,
+            precipitation_probability, rain, snowfall, uv_index); pass [] to skip hourly data
+        daily: Daily variables to return (default: sunset, sunrise, uv_index_max); pass [] to skip
+        current: Current variables to return (default: temperature_2m, rain, precipitation,
+            apparent_temperature, wind_gusts_10m, wind_direction_10m, wind_speed_10m); pass [] to skip
+        start: Optional ISO 8601 date or local datetime where hourly/daily data should start
+        end: Optional ISO 8601 date or local datetime where hourly/daily data should end
+        max_chars: Optional size budget for the answer in characters. Values are rounded, series
+            may be run-length or delta encoded and hourly data averaged into longer steps until
+            it fits; the "compact" field describes the encoding
+
+    Returns:
+        JSON string with the location, current, hourly and daily weather data; "stale" is
+        true (with "age_seconds") when older cached data is returned because fresh data is
+        being fetched or the weather service is unavailable
+    """
+    hourly = HOURLY_VARIABLES if hourly is None else hourly
+    daily = DAILY_VARIABLES if daily is None else daily
+    current = CURRENT_VARIABLES if current is None else current
+
+    coordinates = await get_coordinates_async(location)
+    print(f"Fetching weather data for {location} at coordinates {coordinates['latitude']}, {coordinates['longitude']}")
+    responses = await fetch_weather_responses_async([coordinates], hourly, daily, current)
+
+    stale = staleness(coordinates, hourly, daily, current)
+
+    # Repeated questions reuse the finished JSON as long as the upstream response is unchanged
+    key = (tuple(sorted(coordinates.items())), tuple(hourly), tuple(daily), tuple(current), start, end, max_chars,
+           bool(stale))
+    source = response_token(responses[0])
+    payload = result_cache.get(key, source)
+    if payload is not None:
+        return payload
+
+    # Process first location
+    weather = decode_weather_response(responses[0], hourly, daily, current, start, end)
+    if "name" in coordinates:
+        weather["location"]["name"] = coordinates["name"]
+    weather.update(stale)
+    if max_chars:
+        weather = compact_weather(weather, max_chars, encode_weather_json)
+    payload = encode_weather_json(weather)
+    result_cache.put(key, source, payload)
+    return payload
+
+
+@mcp.tool()
+async def get_weather_batch(locations: List[str], hourly: List[str] = None, daily: List[str] = None,
+                      current: List[str] = None, start: str = None, end: str = None) -> str:
+    """
+    Fetch weather data for several locations with a single upstream request.
+
+    Locations whose grid cell is already cached are served from memory; only
+    the rest are requested upstream.
+
+    Args:
+        locations: The location names to fetch weather data for
+        hourly: Hourly variables to return (default as in get_weather_data); pass [] to skip
+        daily: Daily variables to return (default as in get_weather_data); pass [] to skip
+        current: Current variables to return (default as in get_weather_data); pass [] to skip
+        start: Optional ISO 8601 date or local datetime where hourly/daily data should start
+        end: Optional ISO 8601 date or local datetime where hourly/daily data should end
+
+    Returns:
+        JSON object mapping each location to its weather data (flagged "stale"
+        with "age_seconds" as in get_weather_data), or to an error message if
+        the location is unknown
+    """
+    hourly = HOURLY_VARIABLES if hourly is None else hourly
+    daily = DAILY_VARIABLES if daily is None else daily
+    current = CURRENT_VARIABLES if current is None else current
+
+    results = dict.fromkeys(locations)
+    resolved = {}
+    for location in results:
+        try:
+            resolved[location] = await get_coordinates_async(location)
+        except ValueError as e:
+            results[location] = {"error": str(e)}
+
+    if not resolved:
+        return encode_weather_json(results)
+
+    print(f"Fetching weather data for {len(resolved)} locations: {', '.join(resolved)}")
+    responses = await fetch_weather_responses_async(list(resolved.values()), hourly, daily, current)
+
+    for (location, coordinates), response in zip(resolved.items(), responses):
+        results[location] = decode_weather_response(response, hourly, daily, current, start, end)
+        if "name" in coordinates:
+            results[location]["location"]["name"] = coordinates["name"]
+        results[location].update(staleness(coordinates, hourly, daily, current))
+    return encode_weather_json(results)
+
+@mcp.tool()
+async def summarize_weather(location: str, granularity: str = "daily", metrics: List[str] = None,
+                            start: str = None, end: str = None) -> str:
+    """
+    Summarize the hourly forecast for a location instead of returning every hourly value.
+
+    Args:
+        location: The location to summarize the weather for
+        granularity: Bucket size: "daily" (local days, default), "<N>h" such as "6h", or "total" for the whole window
+        metrics: What to compute (default: min, max, mean of every variable and totals of rain/snowfall).
+            Each entry is one of:
+            - "min", "max", "mean", "total": per bucket, for every variable or one variable as "max:temperature_2m"
+            - "rolling_<stat>_<N>h:<variable>": most extreme N-hour window, e.g. "rolling_total_24h:rain"
+            - "first_above_<value>:<variable>" / "first_below_<value>:<variable>": first hour crossing a threshold
+        start: Optional ISO 8601 date or local datetime where the summary should start
+        end: Optional ISO 8601 date or local datetime where the summary should end
+
+    Returns:
+        JSON with bucket start times, per-bucket statistics per variable and window-wide events,
+        flagged "stale" with "age_seconds" when computed from older cached data
+    """
+    metrics = DEFAULT_METRICS if not metrics else metrics
+    bucket_seconds = parse_granularity(granularity)
+    parsed = [parse_metric(spec) for spec in metrics]
+    # Metrics without a variable cover the default variables
+    hourly = list(HOURLY_VARIABLES) if any(metric["variable"] is None for metric in parsed) else []
+    for metric in parsed:
+        if metric["variable"] and metric["variable"] not in hourly:
+            hourly.append(metric["variable"])
+    # Cache entries are keyed by the full variable set, so ask for the same one as
+    # get_weather_data's defaults to share its cached (and prefetched) responses
+    daily, current = (DAILY_VARIABLES, CURRENT_VARIABLES) if hourly == HOURLY_VARIABLES else ([], [])
+
+    coordinates = await get_coordinates_async(location)
+    print(f"Summarizing weather for {location} at coordinates {coordinates['latitude']}, {coordinates['longitude']}")
+    responses = await fetch_weather_responses_async([coordinates], hourly, daily, current)
+    weather = decode_weather_response(responses[0], hourly, [], [], start, end)
+
+    date_range = weather["hourly"]["date_range"]
+    summary = summarize(
+        parse_time_bound(date_range["start"]),
+        date_range["interval_seconds"],
+        weather["hourly"]["data"],
+        metrics,
+        bucket_seconds,
+        weather["location"]["utc_offset_seconds"],
+        format_times=format_timestamps
+    )
+    summary = dict(location=weather["location"], granularity=granularity, **summary)
+    if "name" in coordinates:
+        summary["location"]["name"] = coordinates["name"]
+    summary.update(staleness(coordinates, hourly, daily, current))
+    return encode_weather_json(summary)
+
+@mcp.tool()
+async def get_weather_history(location: str, start: str, end: str, hourly: List[str] = None) -> str:
+    """
+    Look up hourly weather recorded locally for a location, without calling the weather service.
+
+    Every forecast fetched by the other weather tools is kept, so this answers
+    questions like "how warm was it last week" for places asked about before.
+
+    Args:
+        location: The location to look up
+        start: ISO 8601 date or local datetime where the history should start
+        end: ISO 8601 date or local datetime where the history should end (a date includes that whole day)
+        hourly: Hourly variables to return (default: all recorded variables)
+
+    Returns:
+        JSON with the location and the hourly values in the window (null where
+        nothing was recorded), or an error message if there is no history
+    """
+    coordinates = await get_coordinates_async(location)
+    # The store reads files and memory-maps columns, so it runs off the event loop
+    meta = await asyncio.to_thread(history_store.metadata, coordinates["latitude"], coordinates["longitude"])
+    if meta is None:
+        return f"No weather history recorded for {location}."
+
+    utc_offset_seconds = meta.get("utc_offset_seconds", 0)
+    start_seconds = parse_time_bound(start, utc_offset_seconds)
+    end_seconds = parse_time_bound(end, utc_offset_seconds, end=True)
+    if hourly is None:
+        hourly = await asyncio.to_thread(history_store.variables, coordinates["latitude"], coordinates["longitude"])
+    unknown = [name for name in hourly if not name.replace("_", "").isalnum()]
+    if unknown:
+        raise ValueError(f"Invalid variable names: {', '.join(unknown)}")
+
+    first, data = await asyncio.to_thread(history_store.query, coordinates["latitude"], coordinates["longitude"],
+                                          start_seconds, end_seconds, hourly)
+    if first is None:
+        return f"No weather history recorded for {location} between {start} and {end}."
+
+    count = len(next(iter(data.values())))
+    bounds = format_timestamps([first, first + count * 3600])
+    history = {
+        "location": {
+            "latitude": coordinates["latitude"],
+            "longitude": coordinates["longitude"],
+            "timezone": meta.get("timezone"),
+            "utc_offset_seconds": utc_offset_seconds
+        },
+        "hourly": {
+            "date_range": {"start": str(bounds[0]), "end": str(bounds[1]), "interval_seconds": 3600},
+            "data": data
+        }
+    }
+    if "name" in coordinates:
+        history["location"]["name"] = coordinates["name"]
+    return encode_weather_json(history)
+
+@mcp.tool()
+def find_location(query: str, limit: int = 5) -> str:
+    """
+    Look up places in the offline gazetteer.
+
+    Args:
+        query: A place name or prefix (typos are tolerated, "Name, CC" narrows by
+            country or state/province code), or "latitude, longitude" to find the nearest named places
+        limit: Maximum number of places to return (default: 5, at most 50)
+
+    Returns:
+        JSON list of places with name, country_code, admin1_code, latitude,
+        longitude and population
+    """
+    limit = min(max(limit, 1), 50)
+    gazetteer = get_gazetteer()
+    point = parse_coordinates(query)
+    if point:
+        return encode_weather_json(gazetteer.nearest(point[0], point[1], k=limit))
+
+    places = gazetteer.search_prefix(query, limit=limit)
+    if not places:
+        places = gazetteer.fuzzy(query, limit=limit)
+    return encode_weather_json(places)
+
+@mcp.resource("weather://cache/stats")
+def weather_cache_stats() -> str:
+    """Hit/miss counters and size of the finished weather result cache, and the upstream circuit state."""
+    return encode_weather_json(dict(result_cache.stats(), upstream=upstream_breaker.stats()))
 
 if __name__ == "__main__":
+    # Keep popular locations warm in the background
+    if WEATHER_PREFETCH_ENABLED:
+        prefetch_scheduler.start()
     # Initialize and run the server
     mcp.run(transport='stdio')
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""
+Vectorized aggregates over hourly weather series.
+
+summarize() turns decoded hourly arrays into a compact summary: per-bucket
+min/max/mean/total (daily, N-hourly or over the whole window), extreme
+rolling-window values and first threshold crossings. Everything is computed
+with numpy reductions over the whole series; missing values (NaN) are
+skipped.
+
+Metrics are short strings so they are easy to pass through a tool call:
+
+    "max"                              max of every variable per bucket
+    "total:rain"                       rain total per bucket
+    "rolling_total_24h:rain"           wettest 24 hour window and when it ended
+    "first_above_30:temperature_2m"    first hour warmer than 30
+"""
+
+import re
+
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+# Variables measured per hour that add up over time; "total" applies to these by default
+ACCUMULATED_VARIABLES = {"precipitation", "rain", "showers", "snowfall"}
+DEFAULT_METRICS = ["min", "max", "mean", "total"]
+
+_METRIC_PATTERN = re.compile(
+    r"^(?:(?P<stat>min|max|mean|total)"
+    r"|rolling_(?P<rolling_stat>min|max|mean|total)_(?P<hours>\d+)h"
+    r"|first_(?P<direction>above|below)_(?P<threshold>-?\d+(?:\.\d+)?))"
+    r"(?::(?P<variable>\w+))?$"
+)
+
+
+def parse_metric(spec: str) -> dict:
+    """
+    Parse a metric string such as "max", "total:rain" or "rolling_mean_6h:temperature_2m".
+
+    Returns:
+        Dictionary with the metric kind ("bucket", "rolling" or "first") and its parameters
+
+    Raises:
+        ValueError: If the metric is not recognized
+    """
+    match = _METRIC_PATTERN.match(spec.strip())
+    if not match:
+        raise ValueError(f"Unknown metric '{spec}'. Use min, max, mean, total, rolling_<stat>_<N>h or "
+                         f"first_above_<value>/first_below_<value>, optionally followed by :<variable>.")
+    groups = match.groupdict()
+    if groups["stat"]:
+        return {"kind": "bucket", "stat": groups["stat"], "variable": groups["variable"]}
+    if groups["rolling_stat"]:
+        hours = int(groups["hours"])
+        if hours < 1:
+            raise ValueError(f"Rolling window must be at least one hour: '{spec}'")
+        return {"kind": "rolling", "stat": groups["rolling_stat"], "hours": hours, "variable": groups["variable"]}
+    if not groups["variable"]:
+        raise ValueError(f"Threshold metrics need a variable, e.g. '{spec}:temperature_2m'")
+    return {"kind": "first", "above": groups["direction"] == "above", "threshold": float(groups["threshold"]),
+            "variable": groups["variable"]}
+
+
+def parse_granularity(granularity: str):
+    """
+    Parse a bucket size: "daily", "total" (one bucket) or a number of hours such as "6h".
+
+    Returns:
+        Bucket length in seconds, or None for a single bucket
+
+    Raises:
+        ValueError: If the granularity is not recognized
+    """
+    value = granularity.strip().lower()
+    if value in ("daily", "day", "1d"):
+        return 86400
+    if value in ("total", "all", "none"):
+        return None
+    match = re.fullmatch(r"(\d+)h", value)
+    if match and int(match.group(1)) >= 1:
+        return int(match.group(1)) * 3600
+    raise ValueError(f"Unknown granularity '{granularity}'. Use daily, total or <N>h (e.g. 6h).")
+
+
+def bucket_starts(times, bucket_seconds, utc_offset_seconds: int = 0):
+    """
+    Split a sorted time axis into buckets aligned to local time.
+
+    Args:
+        times: Unix timestamps of the series
+        bucket_seconds: Bucket length in seconds, or None for a single bucket
+        utc_offset_seconds: Offset of local time from UTC, so daily buckets start at local midnight
+
+    Returns:
+        (index of the first element of each bucket, bucket start timestamps)
+    """
+    if bucket_seconds is None:
+        return np.zeros(1, dtype=np.int64), np.asarray(times[:1], dtype=np.int64)
+    ids = (np.asarray(times, dtype=np.int64) + utc_offset_seconds) // bucket_seconds
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+    return starts, ids[starts] * bucket_seconds - utc_offset_seconds
+
+
+def reduce_buckets(values, starts, stat: str):
+    """Reduce each bucket of a series with min, max, mean or total, ignoring NaN."""
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if stat == "min":
+        return np.fmin.reduceat(values, starts)
+    if stat == "max":
+        return np.fmax.reduceat(values, starts)
+    totals = np.add.reduceat(np.where(missing, 0.0, values), starts)
+    counts = np.add.reduceat(~missing, starts)
+    if stat == "total":
+        return np.where(counts > 0, totals, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return totals / counts
+
+
+def rolling(values, steps: int, stat: str):
+    """
+    Compute a statistic over every window of a given number of steps.
+
+    Returns:
+        Array with one value per complete window (ending at index steps - 1 onwards)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if steps > len(values):
+        return np.empty(0)
+    if stat in ("total", "mean"):
+        filled = np.concatenate(([0.0], np.cumsum(np.where(np.isnan(values), 0.0, values))))
+        counts = np.concatenate(([0], np.cumsum(~np.isnan(values))))
+        totals = filled[steps:] - filled[:-steps]
+        present = counts[steps:] - counts[:-steps]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result = totals if stat == "total" else totals / present
+        return np.where(present > 0, result, np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(values, steps)
+    with np.errstate(invalid="ignore"):
+        return np.nanmin(windows, axis=1) if stat == "min" else np.nanmax(windows, axis=1)
+
+
+def first_crossing(values, threshold: float, above: bool = True):
+    """Return the index of the first value above (or below) a threshold, or None."""
+    values = np.asarray(values)
+    hits = np.flatnonzero(values > threshold if above else values < threshold)
+    return int(hits[0]) if len(hits) else None
+
+
+def summarize(first_time: int, interval: int, data: dict, metrics: list, bucket_seconds=86400,
+              utc_offset_seconds: int = 0, digits: int = 2, format_times=None) -> dict:
+    """
+    Summarize hourly series.
+
+    Args:
+        first_time: Unix timestamp of the first value
+        interval: Seconds between values
+        data: Mapping of variable name to values
+        metrics: Metric strings (see module docstring)
+        bucket_seconds: Bucket length in seconds, or None for one bucket over the whole window
+        utc_offset_seconds: Offset of local time from UTC for bucket alignment
+        digits: Decimal places to round results to
+        format_times: Callable turning an array of timestamps into strings (default: leave as numbers)
+
+    Returns:
+        Dictionary with bucket start times, per-bucket statistics and window-wide events
+    """
+    format_times = format_times or (lambda seconds: np.asarray(seconds))
+    count = len(next(iter(data.values()))) if data else 0
+    summary = {"buckets": {"start": [], "hours": []}, "stats": {}, "events": {}}
+    if not count:
+        return summary
+
+    times = first_time + interval * np.arange(count, dtype=np.int64)
+    starts, bucket_times = bucket_starts(times, bucket_seconds, utc_offset_seconds)
+    summary["buckets"] = {
+        "start": format_times(bucket_times),
+        "hours": np.diff(np.concatenate((starts, [count]))) * interval // 3600
+    }
+
+    for spec in metrics:
+        metric = parse_metric(spec)
+        variables = [metric["variable"]] if metric["variable"] else list(data)
+        for variable in variables:
+            if variable not in data:
+                raise ValueError(f"Metric '{spec}' refers to '{variable}', which was not fetched")
+            values = data[variable]
+
+            if metric["kind"] == "bucket":
+                # Without an explicit variable, totals only make sense for accumulated quantities
+                if metric["stat"] == "total" and not metric["variable"] and variable not in ACCUMULATED_VARIABLES:
+                    continue
+                stats = summary["stats"].setdefault(variable, {})
+                stats[metric["stat"]] = np.round(reduce_buckets(values, starts, metric["stat"]), digits)
+
+            elif metric["kind"] == "rolling":
+                name = spec if metric["variable"] else f"{spec}:{variable}"
+                steps = max(1, metric["hours"] * 3600 // interval)
+                windows = rolling(values, steps, metric["stat"])
+                if not len(windows) or np.isnan(windows).all():
+                    summary["events"][name] = None
+                    continue
+                # Report the most extreme window: lowest for min, highest otherwise
+                best = int(np.nanargmin(windows) if metric["stat"] == "min" else np.nanargmax(windows))
+                summary["events"][name] = {
+                    "value": round(float(windows[best]), digits),
+                    "start": str(format_times(times[best])),
+                    "end": str(format_times(times[best + steps - 1] + interval))
+                }
+
+            else:
+                index = first_crossing(values, metric["threshold"], metric["above"])
+                summary["events"][spec] = None if index is None else {
+                    "time": str(format_times(times[index])),
+                    "value": round(float(values[index]), digits)
+                }
+    return summary
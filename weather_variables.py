@@ -0,0 +1,56 @@
+"""
+Variable names accepted by the Open-Meteo forecast API.
+
+Open-Meteo answers an unknown variable name with HTTP 400 for the whole
+request, so names are checked here before anything is sent upstream.
+Current conditions accept the hourly variables. Pressure level variables
+follow the pattern "<variable>_<level>hPa".
+"""
+
+import re
+
+HOURLY = frozenset("""
+temperature_2m relative_humidity_2m dew_point_2m apparent_temperature wet_bulb_temperature_2m
+precipitation_probability precipitation rain showers snowfall snow_depth snowfall_height freezing_level_height
+weather_code pressure_msl surface_pressure cloud_cover cloud_cover_low cloud_cover_mid cloud_cover_high
+visibility evapotranspiration et0_fao_evapotranspiration vapour_pressure_deficit
+wind_speed_10m wind_speed_80m wind_speed_120m wind_speed_180m
+wind_direction_10m wind_direction_80m wind_direction_120m wind_direction_180m wind_gusts_10m
+temperature_80m temperature_120m temperature_180m
+soil_temperature_0cm soil_temperature_6cm soil_temperature_18cm soil_temperature_54cm
+soil_moisture_0_to_1cm soil_moisture_1_to_3cm soil_moisture_3_to_9cm soil_moisture_9_to_27cm soil_moisture_27_to_81cm
+uv_index uv_index_clear_sky is_day sunshine_duration
+cape lifted_index convective_inhibition boundary_layer_height total_column_integrated_water_vapour lightning_potential
+shortwave_radiation direct_radiation diffuse_radiation direct_normal_irradiance global_tilted_irradiance
+terrestrial_radiation shortwave_radiation_instant direct_radiation_instant diffuse_radiation_instant
+direct_normal_irradiance_instant global_tilted_irradiance_instant terrestrial_radiation_instant
+""".split())
+
+DAILY = frozenset("""
+weather_code temperature_2m_max temperature_2m_min temperature_2m_mean
+apparent_temperature_max apparent_temperature_min apparent_temperature_mean
+sunrise sunset daylight_duration sunshine_duration uv_index_max uv_index_clear_sky_max
+precipitation_sum rain_sum showers_sum snowfall_sum snowfall_water_equivalent_sum precipitation_hours
+precipitation_probability_max precipitation_probability_min precipitation_probability_mean
+wind_speed_10m_max wind_speed_10m_min wind_speed_10m_mean wind_gusts_10m_max wind_gusts_10m_min wind_gusts_10m_mean
+wind_direction_10m_dominant shortwave_radiation_sum et0_fao_evapotranspiration
+cloud_cover_max cloud_cover_min cloud_cover_mean dew_point_2m_max dew_point_2m_min dew_point_2m_mean
+relative_humidity_2m_max relative_humidity_2m_min relative_humidity_2m_mean
+pressure_msl_max pressure_msl_min pressure_msl_mean surface_pressure_max surface_pressure_min surface_pressure_mean
+visibility_max visibility_min visibility_mean cape_max cape_min cape_mean
+""".split())
+
+_PRESSURE_LEVEL_PATTERN = re.compile(
+    r"^(temperature|relative_humidity|dew_point|cloud_cover|wind_speed|wind_direction|geopotential_height"
+    r"|vertical_velocity)_\d+hPa$"
+)
+
+
+def unknown_variables(hourly: list, daily: list, current: list) -> list:
+    """Return the requested names Open-Meteo does not know, as "block:name"."""
+    unknown = []
+    for block, names, known in (("hourly", hourly, HOURLY), ("daily", daily, DAILY), ("current", current, HOURLY)):
+        for name in names:
+            if name not in known and (block == "daily" or not _PRESSURE_LEVEL_PATTERN.match(name)):
+                unknown.append(f"{block}:{name}")
+    return unknown